@@ -0,0 +1,9 @@
+"""
+MapMarkr :: Benchmarks
+
+-  a reproducible benchmark suite for the model layer & the ASGI app, run against the in-memory 
+   storage backend (a local stand-in for Deta Base, with a configurable simulated latency), on 
+   seeded, synthetic GeoJSON datasets.
+-  run it with `python -m benchmarks --help`; results are saved as JSON, and two result files
+   can be compared with `python -m benchmarks.compare old.json new.json`.
+"""
@@ -0,0 +1,92 @@
+"""
+MapMarkr :: Benchmarks :: command-line runner
+
+    python -m benchmarks --sizes 1000,10000,100000 --latency-ms 5 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from datetime import datetime, timezone
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks the MapMarkr API & model layer.")
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated dataset sizes, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--suites", default="model,asgi", help="comma-separated suites to run: model, asgi, serialization")
+    parser.add_argument("--ops", type=int, default=200, help="timed operations per benchmark")
+    parser.add_argument("--batch-size", type=int, default=500, help="Features per bulk-import request")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated round-trip time of each storage call")
+    parser.add_argument("--seed", type=int, default=42, help="seed for the synthetic datasets")
+    parser.add_argument("--no-cache", action="store_true", help="disable the read-through cache")
+    parser.add_argument("--output", default="bench_output.json", help="file to save the results to (JSON)")
+    return parser.parse_args(argv)
+
+
+def configure(args: argparse.Namespace) -> None:
+    """Points the app at the in-memory storage backend -- BEFORE it's first used (it reads settings once)."""
+    os.environ.setdefault("DETA_DB_NAME", "mapmarks-benchmark")
+    os.environ["DETA_STORAGE_BACKEND"] = "memory"
+    os.environ["DETA_STORAGE_MEMORY_LATENCY_MS"] = str(args.latency_ms)
+    if args.no_cache:
+        os.environ["DETA_CACHE_ENABLED"] = "false"
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import main
+    from benchmarks.suites import SUITES
+    
+    results = []
+    async with main.lifespan(main.app):
+        for size in (int(size) for size in args.sizes.split(",")):
+            for suite in args.suites.split(","):
+                print(f"-- {suite} suite, {size} features", file=sys.stderr)
+                for measurement in await SUITES[suite](size, args.ops, args.seed, args.batch_size):
+                    summary = measurement.summary()
+                    results.append(summary)
+                    print(
+                        f"{summary['name']:<28} n={summary['size']:<8} {summary['ops_per_s'] or 0:>10.1f} ops/s"
+                        f"  p50={summary['p50_ms']:.3f}ms  p95={summary['p95_ms']:.3f}ms  p99={summary['p99_ms']:.3f}ms",
+                        file=sys.stderr,
+                    )
+    
+    return {
+        "meta": {
+            "started": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+            "ops": args.ops,
+            "batch_size": args.batch_size,
+            "latency_ms": args.latency_ms,
+            "seed": args.seed,
+            "cache": not args.no_cache,
+        },
+        "results": results,
+    }
+
+
+def cli(argv=None) -> None:
+    args = parse_args(argv)
+    configure(args)
+    report = asyncio.run(run(args))
+    
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(report['results'])} results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,155 @@
+"""
+MapMarkr :: Benchmarks :: cold start
+
+    python -m benchmarks.coldstart --runs 5 [--lazy] --output coldstart.json
+
+-  starts the app in fresh interpreters (with `python -X importtime`), and times each one from process
+   launch to its first response -- split into import, startup (the lifespan handler) & first request.
+-  the import-time profile shows what each module adds to cold start: `self` is the time spent importing
+   the module itself; `cumulative` also includes the modules it was first to import.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from collections import defaultdict
+from typing import Any, Dict, List
+
+
+# Runs in the child interpreter; prints its timings as one line of JSON
+CHILD_SCRIPT = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def first_response():
+    from httpx import ASGITransport, AsyncClient
+    from mapmarks.api import metrics
+    async with main.lifespan(main.app):
+        ready = time.perf_counter()
+        async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://coldstart") as client:
+            response = await client.get("/features/")
+        responded = time.perf_counter()
+        print(json.dumps({
+            "status": response.status_code,
+            "import_ms": (imported - started) * 1000,
+            "startup_ms": (ready - imported) * 1000,
+            "first_request_ms": (responded - ready) * 1000,
+            "app_cold_start_ms": metrics.cold_start._values.get((), 0.0) * 1000,
+        }), flush=True)
+
+asyncio.run(first_response())
+"""
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.coldstart", description="Profiles the MapMarkr app's cold start.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start; timings are medians")
+    parser.add_argument("--lazy", action="store_true", help="start the app with DETA_LAZY_STARTUP=true")
+    parser.add_argument("--top", type=int, default=25, help="modules to list in the import-time profile")
+    parser.add_argument("--output", default="coldstart.json", help="file to save the results to (JSON)")
+    return parser.parse_args(argv)
+
+
+def child_env(args: argparse.Namespace) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("DETA_DB_NAME", "mapmarks-benchmark")
+    env["DETA_STORAGE_BACKEND"] = "memory"
+    env["DETA_LAZY_STARTUP"] = "true" if args.lazy else "false"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    return env
+
+
+def run_once(env: Dict[str, str]) -> Dict[str, Any]:
+    launched = time.perf_counter()
+    child = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, text=True,
+    )
+    line = child.stdout.readline()
+    first_response_ms = (time.perf_counter() - launched) * 1000
+    _, stderr = child.communicate()
+
+    if child.returncode != 0 or not line:
+        raise RuntimeError(f"The app failed to start:\n{stderr}")
+
+    timings = json.loads(line)
+    timings["process_to_first_response_ms"] = first_response_ms
+    timings["modules"] = parse_importtime(stderr)
+    return timings
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, float]]:
+    """Parses `-X importtime` output -- 'import time: <self us> | <cumulative us> | <module>' -- into ms per module"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name] = {"self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000}
+    return modules
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    timings = {
+        name: statistics.median(run[name] for run in runs)
+        for name in ("process_to_first_response_ms", "import_ms", "startup_ms", "first_request_ms", "app_cold_start_ms")
+    }
+
+    modules = defaultdict(lambda: defaultdict(list))
+    for run in runs:
+        for name, module in run["modules"].items():
+            for stat, value in module.items():
+                modules[name][stat].append(value)
+    profile = {
+        name: {stat: statistics.median(values) for stat, values in stats.items()}
+        for name, stats in modules.items()
+    }
+
+    # the time each top-level package adds, in total (e.g. all of fastapi.*, or all of mapmarks.*)
+    packages = defaultdict(float)
+    for name, module in profile.items():
+        packages[name.split(".")[0]] += module["self_ms"]
+
+    return {"timings": timings, "modules": profile, "packages": dict(packages)}
+
+
+def report(summary: Dict[str, Any], top: int) -> None:
+    print("-- cold start (median ms)", file=sys.stderr)
+    for name, value in summary["timings"].items():
+        print(f"{name:<32} {value:>10.1f}", file=sys.stderr)
+
+    print(f"\n-- app modules, by cumulative import time (ms)", file=sys.stderr)
+    app_modules = {name: m for name, m in summary["modules"].items() if name == "main" or name.split(".")[0] == "mapmarks"}
+    for name, module in sorted(app_modules.items(), key=lambda item: -item[1]["cumulative_ms"])[:top]:
+        print(f"{name:<48} self={module['self_ms']:>8.1f}  cumulative={module['cumulative_ms']:>8.1f}", file=sys.stderr)
+
+    print(f"\n-- packages, by total import time (ms)", file=sys.stderr)
+    for name, total in sorted(summary["packages"].items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:<48} {total:>8.1f}", file=sys.stderr)
+
+
+def cli(argv=None) -> None:
+    args = parse_args(argv)
+    env = child_env(args)
+
+    runs = []
+    for run in range(args.runs):
+        runs.append(run_once(env))
+        print(f"run {run + 1}/{args.runs}: first response after {runs[-1]['process_to_first_response_ms']:.1f}ms", file=sys.stderr)
+
+    summary = summarize(runs)
+    report(summary, args.top)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": {"runs": args.runs, "lazy": args.lazy, "python": sys.version.split()[0]}, **summary}, f, indent=2)
+    print(f"\nSaved the cold-start profile to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    cli()
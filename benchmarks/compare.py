@@ -0,0 +1,33 @@
+"""
+MapMarkr :: Benchmarks :: compare two result files
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import json
+import sys
+
+from typing import Dict, Tuple
+
+
+def load(path: str) -> Dict[Tuple[str, int], dict]:
+    with open(path, encoding="utf-8") as f:
+        return {(result["name"], result["size"]): result for result in json.load(f)["results"]}
+
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    baseline, candidate = load(baseline_path), load(candidate_path)
+    print(f"{'benchmark':<28} {'size':>8} {'p50 ms':>18} {'p95 ms':>18} {'ops/s':>10}")
+    
+    for name, size in sorted(baseline.keys() & candidate.keys(), key=lambda k: (k[1], k[0])):
+        old, new = baseline[(name, size)], candidate[(name, size)]
+        speedup = (new["ops_per_s"] or 0) / old["ops_per_s"] if old["ops_per_s"] else float("nan")
+        print(
+            f"{name:<28} {size:>8} {old['p50_ms']:>8.3f} -> {new['p50_ms']:<8.3f}"
+            f"{old['p95_ms']:>8.3f} -> {new['p95_ms']:<8.3f} {speedup:>9.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    compare(sys.argv[1], sys.argv[2])
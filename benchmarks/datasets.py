@@ -0,0 +1,54 @@
+"""
+MapMarkr :: Benchmarks :: synthetic datasets
+
+-  seeded, so the same (size, seed) always yields the same Features -- and runs can be compared.
+"""
+import random
+import uuid
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Tuple
+
+
+# The contiguous United States, roughly: minLon, minLat, maxLon, maxLat
+DEFAULT_BBOX = (-124.7, 24.5, -66.9, 49.4)
+
+CATEGORIES = ("Reefer", "Tobacco", "Other")
+CATEGORY_WEIGHTS = (0.45, 0.15, 0.40)
+WORDS = (
+    "truck", "stop", "lifeguard", "station", "diner", "fuel", "scale", "rest", "area", "depot",
+    "warehouse", "dock", "market", "plaza", "terminal", "yard", "south", "north", "beach", "county",
+)
+
+
+def synthetic_features(size: int, seed: int = 42, bbox: Tuple[float, float, float, float] = DEFAULT_BBOX) -> Iterator[Dict[str, Any]]:
+    """Yields `size` GeoJSON Feature dicts, with random (but seeded) keys, positions, titles & categories"""
+    rng = random.Random(seed)
+    epoch = datetime(2023, 1, 1)
+    min_lon, min_lat, max_lon, max_lat = bbox
+    
+    for _ in range(size):
+        created = epoch + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        yield {
+            "key": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [round(rng.uniform(min_lon, max_lon), 6), round(rng.uniform(min_lat, max_lat), 6)],
+            },
+            "properties": {
+                "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title(),
+                "note": " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 12))) or None,
+                "category": rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0],
+                "created": created.isoformat(),
+                "updated": created.isoformat(),
+                "version": 0,
+            },
+        }
+
+
+def random_points(count: int, seed: int = 7, bbox: Tuple[float, float, float, float] = DEFAULT_BBOX) -> Iterator[Tuple[float, float]]:
+    rng = random.Random(seed)
+    min_lon, min_lat, max_lon, max_lat = bbox
+    for _ in range(count):
+        yield rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat)
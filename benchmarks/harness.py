@@ -0,0 +1,57 @@
+"""
+MapMarkr :: Benchmarks :: timing harness
+"""
+import statistics
+import time
+
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+class Measurement:
+    """The latencies of `ops` runs of one benchmark -- and their throughput & percentiles"""
+    def __init__(self, name: str, size: int, latencies: List[float], elapsed: float, items_per_op: int = 1) -> None:
+        self.name = name
+        self.size = size
+        self.latencies = latencies
+        self.elapsed = elapsed
+        self.items_per_op = items_per_op
+        
+    def summary(self) -> Dict[str, Any]:
+        ms = sorted(latency * 1000 for latency in self.latencies)
+        return {
+            "name": self.name,
+            "size": self.size,
+            "ops": len(ms),
+            "items_per_op": self.items_per_op,
+            "elapsed_s": round(self.elapsed, 6),
+            "ops_per_s": round(len(ms) / self.elapsed, 3) if self.elapsed else None,
+            "items_per_s": round(len(ms) * self.items_per_op / self.elapsed, 3) if self.elapsed else None,
+            "mean_ms": round(statistics.fmean(ms), 4) if ms else None,
+            "p50_ms": round(percentile(ms, 50), 4),
+            "p95_ms": round(percentile(ms, 95), 4),
+            "p99_ms": round(percentile(ms, 99), 4),
+            "max_ms": round(ms[-1], 4) if ms else None,
+        }
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """The p-th percentile of already-sorted values, interpolating linearly between ranks"""
+    if not sorted_values:
+        return float("nan")
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+async def measure(name: str, size: int, ops: int, fn: Callable[[int], Awaitable[Any]], items_per_op: int = 1) -> Measurement:
+    """Awaits `fn(i)` for i in range(ops), one after another, timing each call"""
+    latencies = []
+    started = time.perf_counter()
+    
+    for i in range(ops):
+        op_started = time.perf_counter()
+        await fn(i)
+        latencies.append(time.perf_counter() - op_started)
+        
+    return Measurement(name, size, latencies, time.perf_counter() - started, items_per_op)
@@ -0,0 +1,168 @@
+"""
+MapMarkr :: Benchmarks :: suites
+
+-  each suite loads a fresh, seeded dataset into the (in-memory) storage backend, then times single-
+   Feature CRUD, paged listing, bulk import & spatial queries -- either directly on the models, or 
+   through the ASGI app (with an in-process HTTP client, so no sockets are involved).
+-  the serialization suite times reading & responding with lists of `size` Features: validated vs. trusted reads 
+   (see DetaBase.from_record), and FastAPI's response_model + jsonable_encoder vs. FeatureJSONResponse.
+-  import this module only AFTER the benchmark settings are in the environment (see __main__.py):
+   the app reads its settings once, on first use.
+"""
+import random
+import sys
+
+from typing import Any, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from httpx import ASGITransport, AsyncClient
+
+import main
+from benchmarks.datasets import random_points, synthetic_features
+from benchmarks.harness import Measurement, measure
+from mapmarks.api.geo import BBox
+from mapmarks.api.indexes import get_feature_indexes
+from mapmarks.api.models.base import get_record_cache
+from mapmarks.api.models.geojson import Feature
+from mapmarks.api.responses import FeatureJSONResponse
+from mapmarks.api.storage import MemoryStorage
+
+
+async def load_dataset(size: int, seed: int) -> List[Dict[str, Any]]:
+    """Empties the store, caches & indexes, and returns a fresh `size` dataset (for the suite to import)."""
+    MemoryStorage.reset(Feature.db_name)
+    get_record_cache().clear()
+    await get_feature_indexes().warm(Feature)
+    return list(synthetic_features(size, seed))
+
+
+async def model_suite(size: int, ops: int, seed: int, batch_size: int) -> List[Measurement]:
+    dataset = await load_dataset(size, seed)
+    batches = [dataset[i:i + batch_size] for i in range(0, size, batch_size)]
+    results = [
+        await measure("model.bulk_import", size, len(batches), lambda i: Feature.save_many([Feature(**item) for item in batches[i]]), batch_size),
+    ]
+    
+    rng = random.Random(seed)
+    keys = [item["key"] for item in rng.sample(dataset, min(ops, size))]
+    new_features = [Feature(**item) for item in synthetic_features(ops, seed + 1)]
+    found: List[Feature] = []
+    
+    async def find(i: int) -> None:
+        found.append(await Feature.find(keys[i % len(keys)]))
+    
+    get_record_cache().clear()
+    results.append(await measure("model.find", size, ops, find))
+    results.append(await measure("model.find_cached", size, ops, lambda i: Feature.find(keys[i % len(keys)])))
+    results.append(await measure("model.save", size, ops, lambda i: new_features[i].save()))
+    results.append(await measure("model.update", size, ops, lambda i: found[i].update()))
+    results.append(await measure("model.delete", size, ops, lambda i: new_features[i].delete()))
+    results += await _paging("model.fetch_page", size, ops, lambda cursor: Feature.fetch_page(cursor=cursor))
+    
+    points = list(random_points(ops, seed))
+    results.append(await measure("model.within_bbox", size, ops, lambda i: Feature.within_bbox(BBox(points[i][0], points[i][1], points[i][0] + 1.0, points[i][1] + 1.0), 25)))
+    results.append(await measure("model.near", size, ops, lambda i: Feature.near(*points[i], radius_m=25_000, limit=25)))
+    results.append(await measure("model.nearest", size, ops, lambda i: Feature.nearest([points[i]], k=10)))
+    results.append(await measure("model.nearest_batch_100", size, max(1, ops // 10), lambda i: Feature.nearest(points[:100], k=10), 100))
+    
+    return results
+
+
+async def asgi_suite(size: int, ops: int, seed: int, batch_size: int) -> List[Measurement]:
+    dataset = await load_dataset(size, seed)
+    batches = [dataset[i:i + batch_size] for i in range(0, size, batch_size)]
+    
+    async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://benchmark") as client:
+        async def request(method: str, url: str, **kwargs) -> Any:
+            response = await client.request(method, url, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text[:200]}")
+            return response
+        
+        results = [
+            await measure("asgi.bulk_import", size, len(batches), lambda i: request("POST", "/features/bulk", json={"type": "FeatureCollection", "features": batches[i]}), batch_size),
+        ]
+        
+        rng = random.Random(seed)
+        keys = [item["key"] for item in rng.sample(dataset, min(ops, size))]
+        new_features = list(synthetic_features(ops, seed + 1))
+        
+        get_record_cache().clear()
+        results.append(await measure("asgi.find", size, ops, lambda i: request("GET", f"/features/features/{keys[i % len(keys)]}")))
+        results.append(await measure("asgi.create", size, ops, lambda i: request("POST", "/features/features/new", json=new_features[i])))
+        results.append(await measure("asgi.delete_many", size, max(1, ops // 10), lambda i: request("DELETE", "/features/", json={"keys": [item["key"] for item in new_features[i * 10:(i + 1) * 10]]}), 10))
+        
+        async def list_page(cursor):
+            response = await request("GET", "/features/", params={"cursor": cursor} if cursor else {})
+            return None, response.headers.get("X-Next-Cursor")
+        results += await _paging("asgi.list_page", size, ops, list_page)
+        
+        points = list(random_points(ops, seed))
+        results.append(await measure("asgi.bbox", size, ops, lambda i: request("GET", "/features/", params={"bbox": f"{points[i][0]},{points[i][1]},{points[i][0] + 1.0},{points[i][1] + 1.0}"})))
+        results.append(await measure("asgi.near", size, ops, lambda i: request("GET", "/features/", params={"near": f"{points[i][0]},{points[i][1]}", "radius_m": 25_000})))
+        results.append(await measure("asgi.nearest", size, ops, lambda i: request("GET", "/features/nearest", params={"lon": points[i][0], "lat": points[i][1], "k": 10})))
+        
+    return results
+
+
+async def serialization_suite(size: int, ops: int, seed: int, batch_size: int) -> List[Measurement]:
+    records = [Feature(**item).to_record() for item in synthetic_features(size, seed)]
+    features = [Feature.from_record(record, trusted=False) for record in records]
+    response_field = create_response_field(name="Response_list_features", type_=List[Feature])
+    rounds = max(5, min(ops, 200_000 // size))
+    
+    async def read(trusted: bool):
+        return [Feature.from_record(record, trusted=trusted) for record in records]
+    
+    async def respond_with_response_model():
+        # what FastAPI does with a route's return value: validate it against the response_model, then jsonable_encoder() it
+        return JSONResponse(await serialize_response(field=response_field, response_content=features))
+    
+    async def respond_with_feature_json():
+        return FeatureJSONResponse(features)
+    
+    results = [
+        await measure("serialize.read_validated", size, rounds, lambda i: read(False), size),
+        await measure("serialize.read_trusted", size, rounds, lambda i: read(True), size),
+        await measure("serialize.response_model", size, rounds, lambda i: respond_with_response_model(), size),
+        await measure("serialize.feature_json", size, rounds, lambda i: respond_with_feature_json(), size),
+    ]
+    
+    read_speedup = results[0].summary()["p50_ms"] / results[1].summary()["p50_ms"]
+    respond_speedup = results[2].summary()["p50_ms"] / results[3].summary()["p50_ms"]
+    print(f"   {size} features: trusted reads are {read_speedup:.1f}x faster; FeatureJSONResponse is {respond_speedup:.1f}x faster", file=sys.stderr)
+    
+    return results
+
+
+async def _paging(name: str, size: int, pages: int, fetch_page) -> List[Measurement]:
+    """Times `pages` consecutive pages from the start -- and, if the dataset is deeper, `pages` more 
+       from its last pages; with cursor pagination, the two should cost the same."""
+    cursors = [None]
+    
+    async def next_page(i: int) -> None:
+        _, cursor = await fetch_page(cursors[-1])
+        cursors.append(cursor)
+    
+    async def first_pages(i: int) -> None:
+        if cursors[-1] is not None or i == 0:
+            await next_page(i)
+    
+    results = [await measure(f"{name}.first", size, pages, first_pages)]
+    
+    # walk (untimed) to the last `pages` pages, if there are more pages than that
+    remaining = []
+    while cursors[-1] is not None:
+        remaining.append(cursors[-1])
+        _, cursor = await fetch_page(cursors[-1])
+        cursors.append(cursor)
+    if len(remaining) > pages:
+        deep = remaining[-pages:]
+        results.append(await measure(f"{name}.deep", size, len(deep), lambda i: fetch_page(deep[i])))
+        
+    return results
+
+
+SUITES = {"model": model_suite, "asgi": asgi_suite, "serialization": serialization_suite}
@@ -2,44 +2,128 @@
 file:  /main.py
         - entry script
         - required by Deta
+        - `app` is built on first access (e.g. by the ASGI server) -- not when this module is imported
 """
+import asyncio
+import contextlib
 import logging
 import typing
 
 from datetime import datetime as dt
+from functools import lru_cache
 from uuid import UUID
-from fastapi import Depends, FastAPI
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.responses import PlainTextResponse
 
+from mapmarks.api import changes
+from mapmarks.api.clients import get_client_manager
 from mapmarks.api.config import get_app_config
+from mapmarks.api.importer import shutdown_validation_pool
+from mapmarks.api.indexes import get_feature_indexes
+from mapmarks.api.metrics import registry as metrics_registry
+from mapmarks.api.middleware import ColdStartMiddleware, MetricsMiddleware
 from mapmarks.api.tags import Tag
+from mapmarks.api.models.base import get_write_behind
 from mapmarks.api.models.geojson import Feature
 from mapmarks.logger import get_logger
 from mapmarks.api.exceptions import NotFoundHTTPException
-from mapmarks.api.routers import features as FeaturesRouter
-from mapmarks.api.routers import tags as TagsRouter
+from mapmarks.api.routers.features import features as FeaturesRouter
+from mapmarks.api.routers.live import live as LiveRouter
+from mapmarks.api.routers.stats import stats as StatsRouter
+from mapmarks.api.routers.tags import tags as TagsRouter
+from mapmarks.api.routers.tiles import tiles as TilesRouter
 
 # Configure and crank up the Logger
 logger = get_logger(__name__)
 
-# Set application configuration
-settings = get_app_config()
-logger.info(f"Configuring {settings.title} app settings ...")
-app_config = {
-    "debug": settings.debug_mode,
-    "dependencies": [Depends(get_app_config)],
-    "description": settings.description,
-    "title": settings.title,
-    "root_path": settings.root_path,
-    "version": settings.version
-}
-# initialize app
-logger.info("Instantiating FastAPI ...")
-app = FastAPI(**app_config)
-# -> initialize routers
-app.include_router(FeaturesRouter)
-app.include_router(TagsRouter)
+# Background tasks run after startup: building the in-memory Feature indexes, and pruning the change log
+background_tasks: typing.List[asyncio.Task] = []
+
+def start_background_tasks() -> None:
+    if background_tasks:
+        return
+    feature_indexes = get_feature_indexes()
+    if feature_indexes.indexes:
+        background_tasks.append(asyncio.create_task(feature_indexes.warm(Feature)))
+    if get_app_config().changes_enabled:
+        background_tasks.append(asyncio.create_task(changes.prune(Feature.db_name)))
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the pooled Deta Base client(s) on startup, and closes them on shutdown.
+    
+    -  also builds the in-memory Feature indexes -- in the background, so as not to hold up startup.
+       Until they're ready, spatial queries are answered by Deta Base itself.
+    -  ... and prunes expired entries from the change log, also in the background.
+    -  with `settings.write_behind_enabled`, starts the write-behind flush (re-queuing any writes spilled by the
+       last shutdown) -- and on shutdown, flushes the queue, or spills what's left of it to a local file.
+    -  on shutdown, indexes with a snapshot path (e.g. `settings.search_snapshot_path`) are saved, to be 
+       restored on the next startup.
+    -  with `settings.lazy_startup`, none of this happens here: clients are opened on first use, and the 
+       background tasks start once the first response has been sent (see ColdStartMiddleware).
+    """
+    settings = get_app_config()
+    client_manager = get_client_manager()
+    write_behind = get_write_behind()
+    if not settings.lazy_startup:
+        await client_manager.start(settings.db_name)
+        start_background_tasks()
+    write_behind.start()
+    yield
+    
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await write_behind.stop()
+    feature_indexes = get_feature_indexes()
+    feature_indexes.save_snapshots()
+    feature_indexes.close()
+    shutdown_validation_pool()
+    await client_manager.close()
+
+# The app's own routes
+root = APIRouter()
 
 # API Index Route
-@app.get('/')
+@root.get('/')
 async def get_api_root():
-    return {"message": "Welcome to the Execas API!"}
\ No newline at end of file
+    return {"message": "Welcome to the Execas API!"}
+
+# Prometheus scrape target
+@root.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@lru_cache
+def create_app() -> FastAPI:
+    settings = get_app_config()
+    logger.info(f"Configuring {settings.title} app settings ...")
+    app_config = {
+        "debug": settings.debug_mode,
+        "dependencies": [Depends(get_app_config)],
+        "description": settings.description,
+        "title": settings.title,
+        "root_path": settings.root_path,
+        "version": settings.version,
+        "lifespan": lifespan
+    }
+    # initialize app
+    logger.info("Instantiating FastAPI ...")
+    app = FastAPI(**app_config)
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+    app.add_middleware(ColdStartMiddleware, on_first_response=start_background_tasks if settings.lazy_startup else None)
+    # -> initialize routers
+    app.include_router(FeaturesRouter)
+    app.include_router(LiveRouter)
+    app.include_router(TagsRouter)
+    app.include_router(StatsRouter)
+    app.include_router(TilesRouter)
+    app.include_router(root)
+    return app
+
+def __getattr__(name: str):
+    """`main.app` is built lazily, on first access (and only once -- see create_app())"""
+    if name == "app":
+        return create_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,9 +4,15 @@ MapMarkr app - save your place in life
 
 __version__ = "0.0.1"
 
-# import app modules
-from deta import Deta
-from mapmarks.api.config import get_app_config
+import time
 
-# Get app config settings
-settings = get_app_config()
+# @NOTE: the earliest point at which the app's own code runs -- cold-start timings are measured from here
+STARTED_AT = time.perf_counter()
+
+
+def __getattr__(name: str):
+    """`mapmarks.settings` is built lazily, on first access (and only once -- see get_app_config())"""
+    if name == "settings":
+        from mapmarks.api.config import get_app_config
+        return get_app_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
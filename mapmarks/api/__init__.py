@@ -1,13 +1,31 @@
 """
 MapMarkr app - save your place in life
+
+-  the models re-exported here are imported lazily, on first access -- so that importing e.g. 
+   `mapmarks.api.config` doesn't pull in every model (and its dependencies) along with it.
 """
 
 __version__ = "0.0.1"
 
-# import app modules
-from mapmarks.api.config import AppSettings
-from mapmarks.api.types import Lon, Lat
-from mapmarks.api.models.geojson import Point
-from mapmarks.api.models.geojson import Props
-from mapmarks.api.models.geojson import Feature
-from mapmarks.api.models.geojson import FeatureCollection
\ No newline at end of file
+import importlib
+
+# app modules, re-exported by name
+_EXPORTS = {
+    "AppSettings": "mapmarks.api.config",
+    "Lon": "mapmarks.api.types",
+    "Lat": "mapmarks.api.types",
+    "Point": "mapmarks.api.models.geojson",
+    "Props": "mapmarks.api.models.geojson",
+    "Feature": "mapmarks.api.models.geojson",
+    "FeatureCollection": "mapmarks.api.models.geojson",
+}
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted([*globals(), *_EXPORTS])
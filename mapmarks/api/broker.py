@@ -0,0 +1,129 @@
+"""
+MapMarkr :: Live-change broker
+
+-  fans the write events of one `db_name` (see mapmarks.api.events) out to every live subscriber -- e.g. the
+   Server-Sent Events & WebSocket endpoints in mapmarks.api.routers.live.
+-  each event is encoded ONCE, however many subscribers it goes to; each subscriber has its own bounded buffer.
+-  writers never wait for subscribers: publishing is a non-blocking put into each matching buffer. A subscriber
+   which falls `buffer_size` events behind has its backlog dropped, and is sent a single `lagged` notice
+   instead -- it should catch up from the change log (GET /features/changes).
+-  subscribers filter by bbox & category. A delete carries no record, so deletes go to every subscriber.
+"""
+import asyncio
+import itertools
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from mapmarks.api import events, metrics
+from mapmarks.api.events import WriteEvent, WriteOp
+from mapmarks.api.geo import BBox
+from mapmarks.api.indexes.base import record_category, record_position
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+LAGGED = "lagged"
+
+live_subscribers = metrics.registry.register(metrics.Gauge("mapmarks_live_subscribers", "Live-change subscribers currently connected."))
+live_dropped = metrics.registry.register(metrics.Counter("mapmarks_live_dropped_events_total", "Live-change events dropped because a subscriber fell too far behind."))
+
+
+class LiveMessage(NamedTuple):
+    id: int
+    event: str      # "put", "delete" -- or "lagged"
+    data: bytes     # JSON
+
+
+class Subscription:
+    """One subscriber's filters & buffer -- iterate over it (`async for message in subscription`) to receive messages"""
+    def __init__(self, broker: "Broker", bbox: Optional[BBox], categories: Optional[Set[str]], buffer_size: int) -> None:
+        self.broker = broker
+        self.bbox = bbox
+        self.categories = categories
+        self.queue: "asyncio.Queue[LiveMessage]" = asyncio.Queue(buffer_size)
+        self.dropped = 0
+
+    def wants(self, event: WriteEvent) -> bool:
+        if event.op == WriteOp.DELETE:
+            return True
+        if self.categories is not None and record_category(event.record) not in self.categories:
+            return False
+        if self.bbox is not None:
+            position = record_position(event.record)
+            return position is not None and self.bbox.contains(*position)
+        return True
+
+    def offer(self, message: LiveMessage) -> None:
+        """Buffers `message` -- never blocks; if the buffer is full, drops the backlog for a `lagged` notice"""
+        try:
+            self.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        dropped = 0
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            dropped += 1
+        self.dropped += dropped + 1
+        live_dropped.inc(amount=dropped + 1)
+        self.queue.put_nowait(LiveMessage(message.id, LAGGED, b'{"dropped":%d}' % self.dropped))
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[LiveMessage]:
+        """The next message -- or None, if there's none within `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    class Broker -- an in-process fan-out of the write events of `db_name`
+
+    -  `encode(event)` turns a write event into the JSON sent to subscribers (once per event).
+    -  the broker only listens for write events while it has subscribers.
+    """
+    def __init__(self, db_name: str, encode: Callable[[WriteEvent], bytes], buffer_size: int, max_subscribers: int) -> None:
+        self.db_name = db_name
+        self.encode = encode
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.subscriptions: List[Subscription] = []
+        self._ids = itertools.count(1)
+
+    def subscribe(self, bbox: Optional[BBox] = None, categories: Optional[Set[str]] = None) -> Subscription:
+        """Raises OverflowError if there are already `max_subscribers`"""
+        if len(self.subscriptions) >= self.max_subscribers:
+            raise OverflowError(f"Too many live subscribers (max. {self.max_subscribers})")
+
+        subscription = Subscription(self, bbox, categories, self.buffer_size)
+        if not self.subscriptions:
+            events.add_listener(self.publish)
+        self.subscriptions.append(subscription)
+        live_subscribers.set(value=len(self.subscriptions))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+            live_subscribers.set(value=len(self.subscriptions))
+        if not self.subscriptions:
+            events.remove_listener(self.publish)
+
+    def publish(self, event: WriteEvent) -> None:
+        if event.db_name != self.db_name:
+            return
+
+        subscribers = [subscription for subscription in self.subscriptions if subscription.wants(event)]
+        if not subscribers:
+            return
+
+        message = LiveMessage(next(self._ids), event.op.value, self.encode(event))
+        for subscription in subscribers:
+            subscription.offer(message)
@@ -0,0 +1,190 @@
+"""
+MapMarkr :: Change log (delta sync)
+
+-  every write through DetaBase (save, update, delete -- and their bulk versions) is also appended to the
+   base's change log: a second Deta Base, named `<db_name>_changes`, with one entry per changed record.
+-  an entry's key sorts by the time of the write -- nanoseconds since the epoch, zero-padded, plus a random
+   suffix -- so that Deta's `last` key walks the log in write order: the changes since a point in time are
+   simply the entries after its key. Reading them costs in proportion to the number of changes.
+-  a put entry holds the record, as saved; a delete entry is a tombstone.
+-  entries older than `settings.changes_retention_days` are pruned (see `prune()`); a client whose sync token
+   is older than that has to start over, from a full download.
+"""
+import asyncio
+import base64
+import binascii
+import json
+import time
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from mapmarks.api.clients import get_client_manager
+from mapmarks.api.config import get_app_config
+from mapmarks.api.events import WriteOp
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class Tombstone(BaseModel):
+    """A deleted record"""
+    key: str
+    deleted: datetime
+
+
+def change_log_name(db_name: str) -> str:
+    return f"{db_name}_changes"
+
+
+def position(at_ns: int) -> str:
+    """The position in the log of the time `at_ns` -- every entry written later has a greater key"""
+    return f"{at_ns:020d}"
+
+
+def _entry_key(at_ns: int) -> str:
+    return position(at_ns) + uuid4().hex[:8]
+
+
+def _entry_time(key: str) -> int:
+    return int(key[:20])
+
+
+# Sync tokens
+def encode_token(after: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": after}).encode()).decode()
+
+
+def parse_since(since: str) -> str:
+    """The log position a `since` value stands for -- it's either a sync token (as returned by `read_changes()`),
+    an ISO 8601 timestamp, or seconds since the epoch. Raises ValueError for anything else.
+    """
+    try:
+        return position(int(float(since) * NS_PER_SECOND))
+    except (ValueError, OverflowError):
+        pass
+
+    try:
+        at = datetime.fromisoformat(since.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    else:
+        at = at if at.tzinfo else at.replace(tzinfo=timezone.utc)
+        return position(int(at.timestamp() * NS_PER_SECOND))
+
+    try:
+        after = json.loads(base64.urlsafe_b64decode(since.encode()))["after"]
+        _entry_time(after)
+        return after
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("`since` must be a sync token, an ISO 8601 timestamp, or seconds since the epoch")
+
+
+# Writing
+async def append(db_name: str, records: Iterable[Dict[str, Any]] = (), deleted: Iterable[str] = ()) -> None:
+    """Appends the records saved to -- and the keys deleted from -- `db_name` to its change log.
+
+    -  called once the write itself has succeeded; a failure here is logged, and doesn't fail the write.
+    """
+    at_ns = time.time_ns()
+    at = datetime.fromtimestamp(at_ns / NS_PER_SECOND, timezone.utc).isoformat()
+    entries = [{"key": _entry_key(at_ns), "target": record["key"], "op": WriteOp.PUT.value, "at": at, "record": record} for record in records]
+    entries += [{"key": _entry_key(at_ns), "target": key, "op": WriteOp.DELETE.value, "at": at} for key in deleted]
+    if not entries:
+        return
+
+    settings = get_app_config()
+    batch_size = settings.db_put_many_limit
+    semaphore = asyncio.Semaphore(settings.db_bulk_concurrency)
+
+    async def put_batch(db, batch: List[Dict[str, Any]]) -> None:
+        async with semaphore:
+            if len(batch) == 1:
+                await db.put(batch[0])
+            else:
+                await db.put_many(batch)
+
+    try:
+        async with get_client_manager().borrow(change_log_name(db_name)) as db:
+            await asyncio.gather(*(put_batch(db, entries[i:i + batch_size]) for i in range(0, len(entries), batch_size)))
+    except Exception:
+        logger.exception(f"Could not append {len(entries)} change(s) to the change log of {db_name!r}")
+
+
+# Reading
+async def read_changes(db_name: str, since: str, limit: int) -> Tuple[List[Dict[str, Any]], List[Tombstone], str, bool]:
+    """The changes to `db_name` since `since` (see `parse_since()`) -- as (saved records, tombstones, next token, more).
+
+    -  reads (at most) `limit` log entries; if there are `more`, the next token carries on right after the last of them.
+    -  a record changed more than once is reported once, in its latest state -- or as a tombstone, if that was a delete.
+    -  once the end of the log is reached, the next token holds back by `settings.changes_overlap_ms`: an entry written
+       just now, by a server whose clock runs a little behind, could still land before it. So a client may be sent
+       the same change twice (it's idempotent) -- but never misses one.
+    -  raises LookupError if `since` is older than the log's retention period.
+    """
+    settings = get_app_config()
+    after = parse_since(since)
+    horizon_ns = time.time_ns() - settings.changes_retention_days * 86400 * NS_PER_SECOND
+    if _entry_time(after) < horizon_ns:
+        raise LookupError(f"Changes are only kept for {settings.changes_retention_days} day(s); please download everything again.")
+
+    entries, last = [], after
+    async with get_client_manager().borrow(change_log_name(db_name)) as db:
+        while len(entries) < limit:
+            response = await db.fetch(None, limit=limit - len(entries), last=last)
+            entries += response.items
+            last = response.last
+            if not last:
+                break
+
+    latest: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        latest.pop(entry["target"], None)
+        latest[entry["target"]] = entry
+
+    records = [entry["record"] for entry in latest.values() if entry["op"] == WriteOp.PUT.value]
+    tombstones = [Tombstone(key=entry["target"], deleted=entry["at"]) for entry in latest.values() if entry["op"] == WriteOp.DELETE.value]
+
+    more = bool(last) and len(entries) >= limit
+    if more:
+        next_after = entries[-1]["key"]
+    else:
+        settled = position(time.time_ns() - settings.changes_overlap_ms * 1_000_000)
+        next_after = max(after, min(entries[-1]["key"], settled) if entries else settled)
+
+    return records, tombstones, encode_token(next_after), more
+
+
+async def prune(db_name: str) -> int:
+    """Deletes the change-log entries older than `settings.changes_retention_days`; returns how many"""
+    settings = get_app_config()
+    horizon = position(time.time_ns() - settings.changes_retention_days * 86400 * NS_PER_SECOND)
+    semaphore = asyncio.Semaphore(settings.db_delete_concurrency)
+    pruned, last = 0, None
+
+    async def delete_one(db, key: str) -> None:
+        async with semaphore:
+            await db.delete(key)
+
+    async with get_client_manager().borrow(change_log_name(db_name)) as db:
+        while True:
+            response = await db.fetch(None, limit=settings.db_fetch_limit, last=last)
+            expired = [entry["key"] for entry in response.items if entry["key"] < horizon]
+            await asyncio.gather(*(delete_one(db, key) for key in expired))
+            pruned += len(expired)
+
+            # entries are in key (i.e. time) order, so stop at the first one that's still current
+            last = response.last
+            if not last or len(expired) < len(response.items):
+                break
+
+    if pruned:
+        logger.info(f"Pruned {pruned} expired change(s) from the change log of {db_name!r}")
+    return pruned
@@ -0,0 +1,136 @@
+"""
+MapMarkr :: Deta Base client manager
+
+-  keeps ONE long-lived, pooled client per `db_name`, rather than building (and tearing down) a new
+   client -- and, for Deta Base, its aiohttp session -- for every save/find/fetch/delete. Re-using the 
+   session means re-using its kept-alive TCP/TLS connections.
+-  clients are opened for the configured storage backend (see mapmarks.api.storage) -- Deta Base,
+   unless `AppSettings.storage_backend` says otherwise.
+-  when `AppSettings.metrics_enabled`, each client is wrapped to record per-call metrics 
+   (see mapmarks.api.metrics).
+-  the manager is started & closed along with the FastAPI app (see the `lifespan` handler in /main.py),
+   and `mapmarks.api.models.base.async_db_client()` borrows clients from it.
+"""
+import asyncio
+import contextlib
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from mapmarks.api.config import get_app_config
+from mapmarks.api.metrics import InstrumentedStorage
+from mapmarks.api.storage import StorageBackend, open_backend
+
+
+class PoolStats(BaseModel):
+    """Usage counters for a single pooled client -- handy when sizing `AppSettings.db_pool_*`"""
+    db_name: str
+    size: int       # max. concurrent borrowers
+    in_use: int     # borrowers currently holding the client
+    idle: int       # free borrower slots
+    waits: int      # borrows which had to wait for a free slot (i.e. the pool was exhausted)
+    borrows: int    # total borrows since the client was created
+
+
+class _PooledClient:
+    """Bookkeeping for one storage client, shared by every borrower of a given `db_name`"""
+    def __init__(self, db_name: str, client: StorageBackend, size: int) -> None:
+        self.db_name = db_name
+        self.client = client
+        self.size = size
+        self.slots = asyncio.Semaphore(size)
+        self.in_use = 0
+        self.waits = 0
+        self.borrows = 0
+
+    def stats(self) -> PoolStats:
+        return PoolStats(
+            db_name=self.db_name,
+            size=self.size,
+            in_use=self.in_use,
+            idle=self.size - self.in_use,
+            waits=self.waits,
+            borrows=self.borrows,
+        )
+
+
+class DetaClientManager:
+    """
+    class DetaClientManager
+
+    -  lazily creates one client per `db_name`, the first time that name is borrowed
+    -  `borrow()` is an async context manager; at most `pool_size` callers share a client at once,
+       any others wait for a slot (and are counted in `PoolStats.waits`)
+    -  `close()` closes every client's session; it's called when the app shuts down
+    """
+    def __init__(
+        self,
+        deta: Optional[Any] = None,
+        pool_size: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+    ) -> None:
+        settings = get_app_config()
+        self._deta = deta
+        self.pool_size = pool_size or settings.db_pool_size
+        self.max_connections = settings.db_pool_max_connections if max_connections is None else max_connections
+        self.keepalive_timeout = keepalive_timeout or settings.db_pool_keepalive_timeout
+        self.instrument = settings.metrics_enabled
+        self.measure_bytes = settings.metrics_storage_bytes
+        self._clients: Dict[str, _PooledClient] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def start(self, *db_names: str) -> None:
+        """Open clients up front (e.g. on app startup), so the first request doesn't pay for it."""
+        for db_name in db_names:
+            await self._get(db_name)
+
+    async def close(self) -> None:
+        clients, self._clients = self._clients, {}
+        for pooled in clients.values():
+            await pooled.client.close()
+
+    def stats(self) -> List[PoolStats]:
+        return [pooled.stats() for pooled in self._clients.values()]
+
+    @contextlib.asynccontextmanager
+    async def borrow(self, db_name: str):
+        pooled = await self._get(db_name)
+
+        if pooled.slots.locked():
+            pooled.waits += 1
+
+        async with pooled.slots:
+            pooled.in_use += 1
+            pooled.borrows += 1
+            try:
+                yield pooled.client
+            finally:
+                pooled.in_use -= 1
+
+    async def _get(self, db_name: str) -> _PooledClient:
+        pooled = self._clients.get(db_name)
+        if pooled is not None:
+            return pooled
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            # another borrower may have created the client while we waited for the lock
+            if db_name not in self._clients:
+                client = await self._create_client(db_name)
+                self._clients[db_name] = _PooledClient(db_name, client, self.pool_size)
+
+        return self._clients[db_name]
+
+    async def _create_client(self, db_name: str) -> StorageBackend:
+        client = await open_backend(db_name, self.max_connections, self.keepalive_timeout, self._deta)
+        return InstrumentedStorage(client, self.measure_bytes) if self.instrument else client
+
+
+@lru_cache
+def get_client_manager() -> DetaClientManager:
+    return DetaClientManager()
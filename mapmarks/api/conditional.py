@@ -0,0 +1,132 @@
+"""
+MapMarkr :: Conditional GET (ETag & Last-Modified)
+
+-  a single Feature's (strong) ETag is derived from its key & `properties.version` -- which every write bumps --
+   and its Last-Modified from `properties.updated`.
+-  a list's ETag is derived from the collection version of its `db_name` -- a counter bumped by every write
+   (see mapmarks.api.events) -- plus the request's path & query string; its Last-Modified is the time of the last write.
+-  so `If-None-Match` can be answered with 304 (Not Modified) before storage is read: for a list, always; for a
+   single Feature, whenever its record is in the read-through cache.
+-  `If-Modified-Since` is only checked when there's no `If-None-Match` (as RFC 7232 has it).
+
+@NOTE: like the read-through cache, the collection version only sees writes made through THIS process. List
+       ETags carry the process's id -- so a tag issued by another instance never matches -- and expire after
+       `settings.etag_list_ttl` seconds, which bounds how long a write made elsewhere can go unnoticed. A list's
+       Last-Modified is bounded the same way: it's never older than the start of the current TTL period.
+"""
+import hashlib
+import time
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple, Union
+from uuid import UUID, uuid4
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from mapmarks.api import events
+from mapmarks.api.config import get_app_config
+from mapmarks.api.events import WriteEvent
+
+
+# Identifies this process, in the ETags of its list responses
+PROCESS_ID = uuid4().hex
+
+
+class CollectionVersions:
+    """
+    class CollectionVersions -- a version number & last-modified time per `db_name`, bumped by every write
+    """
+    def __init__(self) -> None:
+        self.versions: Dict[str, int] = {}
+        self.modified: Dict[str, float] = {}
+        self.started = time.time()
+
+    def on_write(self, event: WriteEvent) -> None:
+        self.versions[event.db_name] = self.versions.get(event.db_name, 0) + 1
+        self.modified[event.db_name] = time.time()
+
+    def version(self, db_name: str) -> int:
+        return self.versions.get(db_name, 0)
+
+    def last_modified(self, db_name: str) -> datetime:
+        return datetime.fromtimestamp(self.modified.get(db_name, self.started), timezone.utc)
+
+
+collection_versions = CollectionVersions()
+events.add_listener(collection_versions.on_write)
+
+
+# Validators
+def _digest(*parts: object) -> str:
+    return '"%s"' % hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:24]
+
+
+def feature_etag(key: Union[UUID, str], version: Optional[int]) -> str:
+    return _digest(key, version or 0)
+
+
+def _list_epoch() -> int:
+    """The current `settings.etag_list_ttl` period -- list validators all move on when it does"""
+    ttl = get_app_config().etag_list_ttl
+    return int(time.time() // ttl) if ttl > 0 else 0
+
+
+def list_etag(db_name: str, request: Request) -> str:
+    """The ETag of a list response: changes with every write to `db_name` -- and every `settings.etag_list_ttl` seconds"""
+    query = "&".join(sorted(request.url.query.split("&")))
+    return _digest(PROCESS_ID, _list_epoch(), collection_versions.version(db_name), request.url.path, query)
+
+
+def list_last_modified(db_name: str) -> datetime:
+    """The Last-Modified of a list response: the time of the last write to `db_name` -- or, if that's older, the
+       start of the current `settings.etag_list_ttl` period (so `If-Modified-Since` expires like the ETag does)"""
+    last_modified = collection_versions.last_modified(db_name)
+    ttl = get_app_config().etag_list_ttl
+    if ttl > 0:
+        last_modified = max(last_modified, datetime.fromtimestamp(_list_epoch() * ttl, timezone.utc))
+    return last_modified
+
+
+def list_validators(db_name: str, request: Request) -> Tuple[str, datetime]:
+    """(ETag, Last-Modified) of a list response -- take them BEFORE reading storage, so that a write racing
+       the read can only make them stale (costing the client a full response), never the response itself"""
+    return list_etag(db_name, request), list_last_modified(db_name)
+
+
+def http_date(value: datetime) -> str:
+    # @NOTE: naive datetimes (e.g. `Props.updated`) are in the server's local time
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]=None) -> Dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+# Preconditions
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]=None) -> bool:
+    """True if the client's copy -- as named by `If-None-Match`, or else `If-Modified-Since` -- is still current"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # the weak comparison: a client may send back our tag with a `W/` prefix (e.g. after compression)
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return last_modified.astimezone(timezone.utc).replace(microsecond=0) <= since
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]=None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
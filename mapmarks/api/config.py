@@ -11,6 +11,7 @@ import os
 from enum import Enum
 from functools import lru_cache
 from pydantic import BaseSettings, Field
+from typing import Literal, Optional
 
 
 # MapMarkr Operating Environment status
@@ -41,6 +42,118 @@ class AppSettings(BaseSettings):
     db_name: str
     db_fetch_limit: int = Field(25, const=True)    
     
+    # Storage backend (see mapmarks.api.storage): hosted Deta Base, a local SQLite file, or in-process memory
+    storage_backend: Literal["deta", "sqlite", "memory"] = "deta"
+    storage_sqlite_path: str = "mapmarks.sqlite3"
+    storage_memory_latency_ms: float = 0.0  # simulated round-trip time of each in-memory storage call
+    
+    # DB client-pool options
+    # -  one pooled `deta.AsyncBase` client (and aiohttp session) is kept per `db_name`
+    db_pool_size: int = 100                 # max. concurrent borrowers of a single client
+    db_pool_max_connections: int = 100      # max. open TCP connections per client (0 == unlimited)
+    db_pool_keepalive_timeout: float = 30.0 # seconds an idle connection is kept open for re-use
+    
+    # DB bulk-write options
+    db_put_many_limit: int = Field(25, const=True)  # max. items per `put_many()` call, as enforced by Deta
+    db_bulk_concurrency: int = 4                    # max. `put_many()` batches in flight at once
+    db_delete_concurrency: int = 16                 # max. `delete()` calls in flight at once, for bulk deletes
+    db_delete_fetch_limit: int = 1000               # keys read per page, when deleting by query
+    db_read_concurrency: int = 16                   # max. `get()` calls in flight at once, for bulk reads
+    db_claim_ttl_days: int = 30                     # Deta Base only: how long a conditional update's claim is kept
+    
+    # Read-through cache options (see mapmarks.api.models.base.RecordCache)
+    cache_enabled: bool = True
+    cache_max_entries: int = 2048   # LRU entries are evicted beyond this size
+    cache_ttl: float = 30.0         # seconds an entry may be served for, before it's re-read from Deta
+    
+    # Read-coalescing options (see mapmarks.api.models.base.SingleFlight)
+    coalesce_reads: bool = True     # concurrent identical reads share ONE storage call
+    
+    # Write-behind options (see mapmarks.api.writebehind)
+    # @NOTE: with `write_behind_enabled`, a new Feature is acknowledged as soon as it's queued -- so a crash (unlike 
+    #        a clean shutdown, which spills the queue to `write_behind_spill_path`) loses the writes not yet flushed.
+    write_behind_enabled: bool = False
+    write_behind_max_pending: int = 1000        # queued writes, before new ones have to wait for room
+    write_behind_batch_size: int = 25           # a flush starts once this many writes are queued ...
+    write_behind_flush_interval: float = 0.5    # ... or this many seconds after the last flush
+    write_behind_max_wait: float = 5.0          # seconds a write waits for room, before it's turned away (503)
+    write_behind_spill_path: Optional[str] = "mapmarks.writebehind.json"    # unflushed writes are saved here on shutdown
+    write_behind_shutdown_timeout: float = 5.0  # seconds spent flushing on shutdown, before spilling the rest
+    
+    # Conditional GET options (see mapmarks.api.conditional)
+    etag_list_ttl: float = 30.0     # seconds a list ETag stays valid, without a write through this process (0 = no limit)
+    
+    # Spatial index options (see mapmarks.api.indexes.spatial)
+    spatial_index_enabled: bool = True
+    spatial_cell_size: float = 0.1  # width & height, in degrees, of a grid cell of the in-memory index
+    geohash_precision: int = 9      # length of the geohash stored with each Feature (9 chars ~ 5m x 5m)
+    
+    # Columnar coordinate store options (see mapmarks.api.indexes.columnar)
+    columnar_index_enabled: bool = True
+    nearest_max_k: int = 100        # max. neighbours returned per query point
+    nearest_max_points: int = 500   # max. query points per (batched) nearest-neighbour request
+    
+    # Point-cluster index options (see mapmarks.api.indexes.clusters)
+    cluster_index_enabled: bool = True
+    cluster_radius_px: int = 64     # approx. on-screen width of a cluster's cell, in pixels (256px tiles)
+    cluster_max_zoom: int = 16      # above this zoom level, clusters stop splitting up
+    
+    # Facet-count index options (see mapmarks.api.indexes.facets)
+    facet_index_enabled: bool = True
+    
+    # Full-text search options (see mapmarks.api.indexes.search)
+    search_index_enabled: bool = True
+    search_min_prefix: int = 2                  # shorter query terms only match whole words
+    search_max_expansions: int = 64             # max. words a prefix term matches -- the most common ones (see X-Search-Truncated)
+    search_max_limit: int = 100                 # max. results per search
+    search_snapshot_path: Optional[str] = None  # save the index here on shutdown, and restore it on startup
+    
+    # Feature snapshot options (see mapmarks.api.indexes.snapshot)
+    # @NOTE: with a `feature_snapshot_path`, every Feature is saved there on shutdown -- and on startup, the indexes 
+    #        are built from that file (memory-mapped, then caught up), rather than by paging through Deta Base.
+    feature_snapshot_path: Optional[str] = None
+    snapshot_replay_batch_size: int = 1000  # records replayed into the other indexes between yields to the event loop
+    
+    # Vector tile options (see mapmarks.api.tiles)
+    tile_extent: int = 4096                 # tile coordinates are quantized to an extent x extent grid
+    tile_max_features: int = 10000          # max. Features encoded into a single tile
+    tile_cache_max_entries: int = 1024      # LRU tiles are evicted beyond this count
+    tile_cache_max_zoom: int = 18           # tiles above this zoom level are rendered, but never cached
+    tile_cache_dir: Optional[str] = None    # cache tiles in this (local) directory, rather than in memory
+    
+    # Read options
+    # @NOTE: records read back from storage were validated when they were written -- so, with `trusted_reads`, 
+    #        models are rebuilt from them WITHOUT re-validation (see DetaBase.from_record).
+    trusted_reads: bool = True
+    
+    # Export options
+    export_page_size: int = 1000    # records read (and held in memory) per page of a streamed export
+    
+    # Import options (see mapmarks.api.importer)
+    import_chunk_size: int = 500            # Features validated per task on the process pool
+    import_workers: Optional[int] = None    # validation processes; None = one per CPU, 0 = validate in-process
+    import_max_errors: int = 1000           # per-record errors reported in full; beyond this, they're only counted
+    
+    # Change log options (see mapmarks.api.changes)
+    changes_enabled: bool = True        # record every write in a change log, for GET /features/changes
+    changes_retention_days: int = 30    # log entries (i.e. sync tokens) expire after this many days
+    changes_overlap_ms: int = 2000      # allowance for clock skew between servers writing the log
+    changes_max_limit: int = 1000       # max. log entries read per request
+    
+    # Live-change options (see mapmarks.api.broker)
+    live_buffer_size: int = 256         # events buffered per subscriber, before its backlog is dropped
+    live_max_subscribers: int = 1000    # live subscribers per app instance
+    live_heartbeat_s: float = 15.0      # idle SSE/WebSocket connections are sent a heartbeat this often
+    
+    # Startup options
+    # @NOTE: for serverless runtimes, where every cold start counts: with `lazy_startup`, DB clients are 
+    #        opened on first use, and the Feature indexes are only built AFTER the first response is sent.
+    lazy_startup: bool = False
+    
+    # Metrics options (see mapmarks.api.metrics)
+    metrics_enabled: bool = True            # record request & storage metrics, served at /metrics
+    metrics_storage_bytes: bool = True      # also estimate the (JSON) size of records read & written, from one per call
+    
     # Logging config
     class Logging:
         encoding: str = 'utf-8'
@@ -53,7 +166,8 @@ class AppSettings(BaseSettings):
         def set_level(cls):
             """Sets `logging.LEVEL` to the value of cls.debug_mode. Hopefully, this will be helpful if/when I deploy after forgetting to set an appropriate logging severity level."""
             c = get_app_config()
-            return (cls.level := c.debug_mode)
+            cls.level = c.debug_mode
+            return cls.level
                 
     # Meta config options
     class Config:
@@ -70,14 +184,20 @@ class AppSettings(BaseSettings):
         Until it is available, OperationEnviron.production will NOT be used.
         """
 
-        if os.getenv("DETA_RUNTIME"):
-            return OpEnviron.staging.value
-        else:
-            return OpEnviron.dev.value
+        return operating_env()
             
         
         
         
+def operating_env() -> str:
+    """The app's operating environment (see AppSettings.operating_env) -- read from the environment alone, so it 
+       doesn't build the settings (e.g. for the loggers, which every module asks for on import)"""
+    if os.getenv("DETA_RUNTIME"):
+        return OpEnviron.staging.value
+    else:
+        return OpEnviron.dev.value
+
+
 @lru_cache
 def get_app_config() -> AppSettings:
     return AppSettings()
\ No newline at end of file
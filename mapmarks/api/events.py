@@ -0,0 +1,56 @@
+"""
+MapMarkr :: Write events
+
+-  `DetaBase` publishes a `WriteEvent` for every record it puts into, or deletes from, Deta Base.
+-  in-process listeners (e.g. the indexes in mapmarks.api.indexes) subscribe to keep themselves
+   in sync with the data store, without reading it back.
+-  listeners are called synchronously, in the writer's task, so they must be quick & must not block.
+"""
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+
+class WriteOp(str, Enum):
+    PUT = "put"
+    DELETE = "delete"
+
+
+class WriteEvent(NamedTuple):
+    db_name: str
+    op: WriteOp
+    key: str
+    record: Optional[Dict[str, Any]] = None    # the record, as saved; None for deletes
+
+
+Listener = Callable[[WriteEvent], None]
+_listeners: List[Listener] = []
+
+
+def add_listener(listener: Listener) -> None:
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener: Listener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def publish(db_name: str, records: Iterable[Dict[str, Any]] = (), deleted: Iterable[str] = ()) -> None:
+    """Tells every listener about records saved to -- and keys deleted from -- `db_name`"""
+    events = [WriteEvent(db_name, WriteOp.PUT, record["key"], record) for record in records]
+    events += [WriteEvent(db_name, WriteOp.DELETE, key) for key in deleted]
+
+    for event in events:
+        for listener in _listeners:
+            try:
+                listener(event)
+            except Exception:
+                # a broken listener must never fail the write that has already succeeded
+                logger.exception(f"Write listener {listener!r} failed on {event.op.value} of {event.key!r}")
@@ -34,5 +34,37 @@ class NotFoundHTTPException(HTTPException):
     """
     def __init__(self, message: Optional[str]="Requested resource was not found, regrettably.") -> None:
         super().__init__(status_code=status.HTTP_404_NOT_FOUND, detail=message)
+
+
+class ConflictHTTPException(HTTPException):
+    """
+    class ConflictHTTPException(fastapi.HTTPException)
+    
+    -  Subclass HTTPException: for writes which conflict with the current state of the resource -- e.g. 
+       an update based on a version which has since been overwritten.
+    """
+    def __init__(self, message: Optional[str]="The resource was changed by someone else. Please reload it, and try again.") -> None:
+        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=message)
+
+
+class GoneHTTPException(HTTPException):
+    """
+    class GoneHTTPException(fastapi.HTTPException)
+    
+    -  Subclass HTTPException: for resources which no longer exist -- e.g. changes older than the change log keeps.
+    """
+    def __init__(self, message: Optional[str]="The resource you requested is no longer available.") -> None:
+        super().__init__(status_code=status.HTTP_410_GONE, detail=message)
+
+
+class ServiceUnavailableHTTPException(HTTPException):
+    """
+    class ServiceUnavailableHTTPException(fastapi.HTTPException)
+    
+    -  Subclass HTTPException: for resources which are (temporarily) unavailable -- e.g. an in-memory 
+       index which is still being built, just after startup.
+    """
+    def __init__(self, message: Optional[str]="The resource you requested is not available yet. Please retry shortly.") -> None:
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=message)
         
         
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+MapMarkr :: Geo helpers
+
+-  plain-Python geometry helpers shared by the spatial indexes & routers: bounding boxes,
+   great-circle distances, and geohashes (https://en.wikipedia.org/wiki/Geohash).
+"""
+import math
+
+from typing import List, NamedTuple, Tuple
+
+
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEGREE_LAT = 111_320.0
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+class BBox(NamedTuple):
+    """A bounding box, in the GeoJSON (RFC 7946) order: west, south, east, north"""
+    min_lon: float
+    min_lat: float
+    max_lon: float
+    max_lat: float
+
+    @classmethod
+    def parse(cls, value: str) -> "BBox":
+        """Parses 'minLon,minLat,maxLon,maxLat'; raises ValueError if it isn't a valid box."""
+        parts = [float(part) for part in value.split(",")]
+        if len(parts) != 4:
+            raise ValueError("A bbox must have 4 values: minLon,minLat,maxLon,maxLat")
+
+        bbox = cls(*parts)
+        if not (-180.0 <= bbox.min_lon <= bbox.max_lon <= 180.0 and -90.0 <= bbox.min_lat <= bbox.max_lat <= 90.0):
+            raise ValueError("A bbox must lie within [-180, -90, 180, 90], with min <= max (boxes crossing the antimeridian are not supported)")
+        return bbox
+
+    @classmethod
+    def around(cls, lon: float, lat: float, radius_m: float) -> "BBox":
+        """The smallest box containing the circle of `radius_m` around (lon, lat)"""
+        d_lat = radius_m / METERS_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(lat))
+        d_lon = 180.0 if cos_lat < 1e-9 else min(180.0, d_lat / cos_lat)
+        return cls(
+            max(-180.0, lon - d_lon),
+            max(-90.0, lat - d_lat),
+            min(180.0, lon + d_lon),
+            min(90.0, lat + d_lat),
+        )
+
+    def contains(self, lon: float, lat: float) -> bool:
+        return self.min_lon <= lon <= self.max_lon and self.min_lat <= lat <= self.max_lat
+
+
+def haversine_m(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    """Great-circle distance between two points, in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def geohash_encode(lon: float, lat: float, precision: int = 9) -> str:
+    lon_range, lat_range = [-180.0, 180.0], [-90.0, 90.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        value, value_range = (lon, lon_range) if even else (lat, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits = bits << 1
+            value_range[1] = mid
+
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """The (width, height) in degrees of a geohash cell with `precision` characters"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 360.0 / (1 << lon_bits), 180.0 / (1 << lat_bits)
+
+
+def geohash_cover(bbox: BBox, max_cells: int = 16, max_precision: int = 9) -> List[str]:
+    """The geohash prefixes of the (at most `max_cells`) cells covering `bbox` -- as fine-grained as possible.
+
+    -  any point inside `bbox` has a geohash starting with one of these prefixes, so they can be sent to
+       Deta Base as an OR query -- e.g. [{"geohash?pfx": "9q8y"}, {"geohash?pfx": "9q8z"}, ...]
+    """
+    cover = [""]
+
+    for precision in range(1, max_precision + 1):
+        width, height = geohash_cell_size(precision)
+        min_x, max_x = math.floor((bbox.min_lon + 180.0) / width), math.floor((min(bbox.max_lon, 179.999999) + 180.0) / width)
+        min_y, max_y = math.floor((bbox.min_lat + 90.0) / height), math.floor((min(bbox.max_lat, 89.999999) + 90.0) / height)
+
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > max_cells:
+            break
+
+        cover = sorted({
+            # encode each cell's center point
+            geohash_encode((x + 0.5) * width - 180.0, (y + 0.5) * height - 90.0, precision)
+            for x in range(min_x, max_x + 1)
+            for y in range(min_y, max_y + 1)
+        })
+
+    return cover
@@ -0,0 +1,335 @@
+"""
+MapMarkr :: Bulk import
+
+-  `import_features()` loads a (possibly huge) GeoJSON FeatureCollection -- or newline-delimited GeoJSON --
+   into Deta Base, without ever holding all of it in memory:
+   1. the upload is parsed incrementally, one Feature at a time (see `iter_geojson()` & `iter_ndjson()`);
+   2. Features are validated in chunks of `settings.import_chunk_size`, on a process pool;
+   3. valid Features are written in `put_many()` batches (see `DetaBase.put_records()`), while later chunks validate.
+-  a Feature which fails to parse, validate or save is reported by its position in the upload -- and the run carries on.
+-  progress is reported after every chunk, as an `ImportProgress`.
+
+    python -m mapmarks.api.importer marks.geojson [--ndjson] [--chunk-size 500] [--workers 4]
+"""
+import argparse
+import asyncio
+import codecs
+import json
+import multiprocessing
+import os
+import sys
+
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from mapmarks.api.config import get_app_config
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+# (position in the upload, parsed Feature -- or None, parse error -- or None)
+ParsedFeature = Tuple[int, Any, Optional[str]]
+
+READ_SIZE = 64 * 1024
+
+
+class ImportRecordError(BaseModel):
+    """A Feature which was not imported -- identified by its (0-based) position in the upload"""
+    index: int
+    key: Optional[str] = None
+    error: str
+
+
+class ImportProgress(BaseModel):
+    """The running totals of an import -- `done` once the whole upload has been read & written"""
+    received: int = 0
+    saved: int = 0
+    failed: int = 0
+    done: bool = False
+    errors: List[ImportRecordError] = []
+    errors_truncated: int = 0   # errors counted in `failed`, but beyond `settings.import_max_errors`
+
+    def add_error(self, index: int, key: Optional[str], error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < get_app_config().import_max_errors:
+            self.errors.append(ImportRecordError(index=index, key=key, error=error))
+        else:
+            self.errors_truncated += 1
+
+
+# Incremental parsing
+class _JSONReader:
+    """Decodes JSON values one at a time from a stream of byte chunks, reading only as much as it needs to"""
+    def __init__(self, chunks: AsyncIterator[bytes]) -> None:
+        self.chunks = chunks.__aiter__()
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    async def _read(self) -> bool:
+        """Appends the next chunk to the buffer; False at the end of the stream"""
+        if self.eof:
+            return False
+        try:
+            chunk = await self.chunks.__anext__()
+        except StopAsyncIteration:
+            self.eof = True
+            self.buffer = self.buffer[self.pos:] + self.text_decoder.decode(b"", final=True)
+        else:
+            self.buffer = self.buffer[self.pos:] + self.text_decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    async def peek(self) -> str:
+        """The next non-whitespace character ('' at the end of the stream) -- without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not await self._read():
+                return ""
+
+    async def expect(self, *chars: str) -> str:
+        char = await self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {' '.join(chars)!r}, but found {char or 'the end of the upload'!r}")
+        self.pos += 1
+        return char
+
+    async def value(self) -> Any:
+        await self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not await self._read():
+                    raise
+                continue
+            # a value running up to the end of the buffer (e.g. a number) may continue in the next chunk
+            if end == len(self.buffer) and await self._read():
+                continue
+            self.pos = end
+            return value
+
+
+async def iter_geojson(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedFeature]:
+    """Yields each item of a GeoJSON FeatureCollection's `features` array, as it's parsed.
+
+    -  the collection's other members (e.g. `type`, `bbox`) are read & skipped -- in whichever order they come.
+    -  invalid JSON can't be skipped past: it's reported (as a parse error) and ends the upload.
+    """
+    reader, index = _JSONReader(chunks), 0
+    try:
+        await reader.expect("{")
+        if await reader.peek() == "}":
+            return
+        while True:
+            name = await reader.value()
+            await reader.expect(":")
+            if name != "features":
+                await reader.value()
+            elif await reader.expect("[") and await reader.peek() == "]":
+                await reader.expect("]")
+            else:
+                while True:
+                    yield index, await reader.value(), None
+                    index += 1
+                    if await reader.expect(",", "]") == "]":
+                        break
+            if await reader.expect(",", "}") == "}":
+                return
+    except ValueError as e:
+        yield index, None, f"Invalid GeoJSON: {e}"
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedFeature]:
+    """Yields the Feature on each (non-blank) line of newline-delimited GeoJSON; a line which isn't JSON is reported, and skipped"""
+    index, pending = 0, b""
+
+    def parse(lines: List[bytes]) -> List[ParsedFeature]:
+        nonlocal index
+        parsed = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                parsed.append((index, json.loads(line), None))
+            except ValueError as e:
+                parsed.append((index, None, f"Invalid JSON: {e}"))
+            index += 1
+        return parsed
+
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for parsed in parse(lines):
+            yield parsed
+
+    for parsed in parse([pending]):
+        yield parsed
+
+
+# Validation -- runs in the pool's worker processes
+def validate_chunk(chunk: List[Tuple[int, Any]]) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Tuple[int, Optional[str], str]]]:
+    """Validates a chunk of parsed Features; returns ([(index, record)], [(index, key, error)])"""
+    from mapmarks.api.models.geojson import Feature
+
+    records, errors = [], []
+    for index, raw in chunk:
+        try:
+            feature = Feature.parse_obj(raw)
+        except ValidationError as e:
+            key = raw.get("key") if isinstance(raw, dict) else None
+            errors.append((index, None if key is None else str(key), _describe(e)))
+            continue
+        feature.properties.version += 1
+        records.append((index, feature.to_record()))
+
+    return records, errors
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(loc) for loc in detail['loc'])}: {detail['msg']}" for detail in error.errors())
+
+
+def validation_workers() -> int:
+    """The number of validation processes -- `settings.import_workers`, or one per CPU if that's None (0 = validate in a thread)"""
+    workers = get_app_config().import_workers
+    return workers if workers is not None else (os.cpu_count() or 1)
+
+
+@lru_cache
+def get_validation_pool() -> Optional[Executor]:
+    """The process pool Features are validated on -- None if `settings.import_workers` is 0 (i.e. validate in a thread)"""
+    workers = validation_workers()
+    if workers == 0:
+        return None
+    # @NOTE: "spawn", not "fork" -- the app's event loop & storage threads mustn't be copied into the workers
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def shutdown_validation_pool() -> None:
+    if get_validation_pool.cache_info().currsize:
+        pool = get_validation_pool()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        get_validation_pool.cache_clear()
+
+
+# The import pipeline
+async def import_features(features: AsyncIterator[ParsedFeature], chunk_size: Optional[int] = None) -> AsyncIterator[ImportProgress]:
+    """Validates & saves parsed Features (see `iter_geojson()`), yielding the progress after each chunk is written.
+
+    -  at most a couple of chunks per worker are in flight at once, so memory use doesn't grow with the upload.
+    -  the progress yielded along the way only has the running totals; the last one yielded is `done`, 
+       and also lists the `errors`.
+    """
+    from mapmarks.api.models.geojson import Feature
+
+    settings = get_app_config()
+    chunk_size = chunk_size or settings.import_chunk_size
+    pool = get_validation_pool()
+    max_pending = 2 * max(validation_workers(), 1)
+    loop = asyncio.get_running_loop()
+
+    progress = ImportProgress()
+    pending: Deque[asyncio.Future] = deque()
+
+    async def write_next_chunk() -> None:
+        records, errors = await pending.popleft()
+        for index, key, error in errors:
+            progress.add_error(index, key, error)
+        if not records:
+            return
+
+        # @NOTE: matched up by position, not by key -- an upload may hold the same key more than once
+        result = await Feature.put_records([record for _, record in records])
+        progress.saved += result.succeeded
+        for (index, _), item in zip(records, result.items):
+            if not item.ok:
+                progress.add_error(index, item.key, item.error or "Not saved")
+
+    chunk: List[Tuple[int, Any]] = []
+    async for index, raw, error in features:
+        progress.received += 1
+        if error is not None:
+            progress.add_error(index, None, error)
+            continue
+
+        chunk.append((index, raw))
+        if len(chunk) >= chunk_size:
+            pending.append(loop.run_in_executor(pool, validate_chunk, chunk))
+            chunk = []
+            if len(pending) >= max_pending:
+                await write_next_chunk()
+                yield progress.copy(update={"errors": []})
+
+    if chunk:
+        pending.append(loop.run_in_executor(pool, validate_chunk, chunk))
+    while pending:
+        await write_next_chunk()
+        if pending:
+            yield progress.copy(update={"errors": []})
+
+    progress.done = True
+    logger.info(f"Imported {progress.saved} of {progress.received} Feature(s); {progress.failed} failed")
+    yield progress
+
+
+# Command-line interface
+async def read_file(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m mapmarks.api.importer", description="Imports Features from a GeoJSON file into Deta Base.")
+    parser.add_argument("path", help="a GeoJSON FeatureCollection -- or, with --ndjson, newline-delimited GeoJSON")
+    parser.add_argument("--ndjson", action="store_true", help="the file holds one Feature per line (also assumed for .ndjson, .jsonl & .geojsonl files)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Features per validation task (default: settings.import_chunk_size)")
+    parser.add_argument("--workers", type=int, default=None, help="validation processes; 0 = validate in-process (default: settings.import_workers)")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> ImportProgress:
+    from mapmarks.api.clients import get_client_manager
+
+    if args.workers is not None:
+        get_app_config().import_workers = args.workers
+    
+    ndjson = args.ndjson or args.path.endswith((".ndjson", ".jsonl", ".geojsonl"))
+    parse = iter_ndjson if ndjson else iter_geojson
+    client_manager = get_client_manager()
+    progress = ImportProgress()
+
+    try:
+        async for progress in import_features(parse(read_file(args.path)), args.chunk_size):
+            print(f"received={progress.received} saved={progress.saved} failed={progress.failed}", file=sys.stderr)
+    finally:
+        shutdown_validation_pool()
+        await client_manager.close()
+
+    return progress
+
+
+def cli(argv=None) -> None:
+    progress = asyncio.run(run(parse_args(argv)))
+    print(progress.json(indent=2))
+    sys.exit(1 if progress.failed else 0)
+
+
+if __name__ == "__main__":
+    cli()
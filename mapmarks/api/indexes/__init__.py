@@ -0,0 +1,72 @@
+"""
+MapMarkr :: In-process feature indexes (see mapmarks.api.indexes.base)
+
+-  each index -- and the registry which keeps them in sync -- is built on first use, from the app settings.
+"""
+from functools import lru_cache
+
+from mapmarks.api.config import get_app_config
+from mapmarks.api.indexes.base import FeatureIndex, IndexRegistry
+from mapmarks.api.indexes.clusters import ClusterIndex
+from mapmarks.api.indexes.columnar import ColumnarStore
+from mapmarks.api.indexes.facets import FacetIndex
+from mapmarks.api.indexes.search import SearchIndex
+from mapmarks.api.indexes.snapshot import FeatureSnapshot, FeatureStore
+from mapmarks.api.indexes.spatial import SpatialIndex
+
+
+@lru_cache
+def get_spatial_index() -> SpatialIndex:
+    return SpatialIndex(get_app_config().spatial_cell_size)
+
+
+@lru_cache
+def get_columnar_store() -> ColumnarStore:
+    return ColumnarStore()
+
+
+@lru_cache
+def get_cluster_index() -> ClusterIndex:
+    settings = get_app_config()
+    return ClusterIndex(settings.cluster_radius_px, settings.cluster_max_zoom)
+
+
+@lru_cache
+def get_facet_index() -> FacetIndex:
+    return FacetIndex({"category": "properties.category"})
+
+
+@lru_cache
+def get_search_index() -> SearchIndex:
+    settings = get_app_config()
+    return SearchIndex(settings.search_min_prefix, settings.search_max_expansions)
+
+
+@lru_cache
+def get_feature_store() -> FeatureStore:
+    return FeatureStore()
+
+
+@lru_cache
+def get_feature_indexes() -> IndexRegistry:
+    """The Feature indexes -- built on app startup (see /main.py), and kept in sync by DetaBase writes"""
+    # @NOTE: imported here, as the tile cache's package builds on this one
+    from mapmarks.api.tiles import get_tile_cache
+    
+    settings = get_app_config()
+    feature_indexes = IndexRegistry()
+    if settings.spatial_index_enabled:
+        feature_indexes.register(get_spatial_index())
+    if settings.columnar_index_enabled:
+        feature_indexes.register(get_columnar_store())
+    if settings.cluster_index_enabled:
+        feature_indexes.register(get_cluster_index())
+    if settings.facet_index_enabled:
+        feature_indexes.register(get_facet_index())
+    if settings.search_index_enabled:
+        feature_indexes.register(get_search_index(), snapshot_path=settings.search_snapshot_path)
+    if settings.feature_snapshot_path:
+        feature_indexes.register(get_feature_store(), snapshot_path=settings.feature_snapshot_path)
+    # the tile cache -- so that Feature writes evict stale tiles
+    feature_indexes.register(get_tile_cache())
+    return feature_indexes
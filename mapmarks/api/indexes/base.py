@@ -0,0 +1,262 @@
+"""
+MapMarkr :: In-process feature indexes
+
+-  an index mirrors some derived view of the Features in Deta Base (e.g. their positions), 
+   so that queries against it don't have to read -- and scan -- every record.
+-  the `IndexRegistry` builds its indexes once, by walking every record (see `warm()`), then 
+   keeps them in sync by listening to the `DetaBase` write events (see mapmarks.api.events).
+-  an index which supports snapshots can instead be restored from one, and caught up from the change 
+   log (see mapmarks.api.changes) -- so it's ready without waiting for the walk.
+-  with a Feature snapshot (see mapmarks.api.indexes.snapshot), there's no walk at all: every other index
+   is built from the restored (and caught up) FeatureStore.
+"""
+import asyncio
+import itertools
+import time
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from mapmarks.api import changes, events
+from mapmarks.api.config import get_app_config
+from mapmarks.api.events import WriteEvent, WriteOp
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+
+def record_position(record: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """The (lon, lat) of a raw Feature record -- or None, if it has no (valid) Point geometry."""
+    try:
+        lon, lat = record["geometry"]["coordinates"]
+        return float(lon), float(lat)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def record_category(record: Dict[str, Any]) -> Optional[str]:
+    return (record.get("properties") or {}).get("category")
+
+
+class FeatureIndex:
+    """
+    class FeatureIndex -- the interface each in-process index implements
+    
+    -  `add()` is called with every record saved (replacing any previous record with that key), 
+       `remove()` with every key deleted, and `clear()` before the index is (re)built.
+    -  an index MAY support snapshots: `save()` writes its contents to a file, stamped with a change-log
+       position; `load()` restores them, and returns that position (None if there's no usable snapshot).
+    -  a `light` index only reads a record's position & category, so it can be built from the columns of 
+       a Feature snapshot; an index which `holds_records` can `replay()` every record it holds -- in key order, 
+       from after a given key -- for the other indexes to be built from (see mapmarks.api.indexes.snapshot).
+    """
+    light: bool = False
+    holds_records: bool = False
+    
+    def add(self, key: str, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+    
+    def remove(self, key: str) -> None:
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        raise NotImplementedError
+    
+    def save(self, path: str, position: str) -> None:
+        raise NotImplementedError
+    
+    def load(self, path: str) -> Optional[str]:
+        return None
+    
+    def replay(self, light: bool = False, after: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        raise NotImplementedError
+
+
+class IndexRegistry:
+    """
+    class IndexRegistry -- builds, and then maintains, a set of FeatureIndex instances for one `db_name`
+    """
+    def __init__(self) -> None:
+        self.indexes: List[FeatureIndex] = []
+        self.db_name: Optional[str] = None
+        self.ready: bool = False
+        self.snapshots: Dict[FeatureIndex, str] = {}    # index -> the path of its snapshot file
+        self._restored: Set[FeatureIndex] = set()
+        self._warming: bool = False
+        self._written: Dict[str, Optional[Dict[str, Any]]] = {}    # key -> its latest record, written while warming (None if deleted)
+        
+    def register(self, index: FeatureIndex, snapshot_path: Optional[str]=None) -> FeatureIndex:
+        """Adds `index` -- restored from (and saved to) `snapshot_path`, if given"""
+        self.indexes.append(index)
+        if snapshot_path:
+            self.snapshots[index] = snapshot_path
+        return index
+    
+    def is_ready(self, index: FeatureIndex) -> bool:
+        """Whether `index` is registered, and built -- or restored from its snapshot & caught up"""
+        return index in self.indexes and (self.ready or index in self._restored)
+    
+    def on_write(self, event: WriteEvent) -> None:
+        if event.db_name != self.db_name:
+            return
+        
+        if self._warming:
+            self._written[event.key] = event.record
+        
+        for index in self.indexes:
+            if event.op == WriteOp.PUT:
+                index.add(event.key, event.record)
+            else:
+                index.remove(event.key)
+    
+    async def warm(self, model) -> None:
+        """(Re)builds every index from the records of `model` (a DetaBase subclass) -- e.g. on app startup.
+        
+        -  writes made while warming up are applied as they happen; the (possibly older) copies of
+           those records met while walking the data store (or the change log) are skipped.
+        -  indexes with a usable snapshot are restored from it first, and aren't rebuilt by the walk.
+        -  if a restored index `holds_records` (e.g. the FeatureStore), the rest are built from it -- not 
+           by walking the data store at all.
+        """
+        self.db_name = model.db_name
+        self.ready = False
+        self._restored = set()
+        self._warming, self._written = True, {}
+        
+        # @NOTE: cleared BEFORE the first await -- so that every write from here on lands in a built-up index
+        rebuilt = [index for index in self.indexes if index not in self.snapshots]
+        for index in rebuilt:
+            index.clear()
+        events.add_listener(self.on_write)
+        
+        try:
+            for index, path in self.snapshots.items():
+                if index not in self.indexes:
+                    continue
+                if await self._restore(index, path, model):
+                    self._restored.add(index)
+                else:
+                    # ... an index that couldn't be restored is cleared AFTER writes have landed in it: re-apply them
+                    index.clear()
+                    self._apply_written(index)
+                    rebuilt.append(index)
+            
+            count = 0
+            source = next((index for index in self.indexes if index in self._restored and index.holds_records), None)
+            if rebuilt and source is not None:
+                # @NOTE: replayed in batches, yielding to the event loop between them -- each batch resumes after the 
+                #        last key replayed (rather than carrying on a walk a write may have shifted), and skips the 
+                #        keys written meanwhile: those have already been applied, as they happened.
+                batch_size = max(get_app_config().snapshot_replay_batch_size, 1)
+                for light in (True, False):
+                    targets = [index for index in rebuilt if index.light == light]
+                    if not targets:
+                        continue
+                    after = None
+                    while True:
+                        batch = list(itertools.islice(source.replay(light, after), batch_size))
+                        for key, record in batch:
+                            if key in self._written:
+                                continue
+                            for index in targets:
+                                index.add(key, record)
+                        if len(batch) < batch_size:
+                            break
+                        after = batch[-1][0]
+                        await asyncio.sleep(0)
+                count = len(source)
+            elif rebuilt:
+                async for page in model.iter_records():
+                    for record in page:
+                        if record["key"] in self._written:
+                            continue
+                        for index in rebuilt:
+                            index.add(record["key"], record)
+                    count += len(page)
+        finally:
+            self._warming, self._written = False, {}
+        
+        self.ready = True
+        logger.info(f"Built {len(rebuilt)} index(es) over {count} record(s) of {self.db_name!r}; restored {len(self._restored)} from snapshots")
+    
+    def _apply_written(self, index: FeatureIndex) -> None:
+        for key, record in self._written.items():
+            if record is not None:
+                index.add(key, record)
+            else:
+                index.remove(key)
+    
+    async def _restore(self, index: FeatureIndex, path: str, model) -> bool:
+        """Loads `index` from its snapshot, then catches it up -- False if it couldn't be restored
+        
+        -  from the change log, if there is one (see mapmarks.api.changes) -- else, by reading back the records
+           whose `properties.updated` is later than the snapshot.
+        
+        @NOTE: without the change log, deletes made (by another instance) since the snapshot aren't seen.
+        """
+        position = index.load(path)
+        if position is None:
+            return False
+        # loading replaced whatever was written while the indexes restored before this one were catching up
+        self._apply_written(index)
+        
+        settings = get_app_config()
+        try:
+            if settings.changes_enabled:
+                replayed = await self._replay_changes(index, position)
+            else:
+                replayed = await self._replay_updated(index, position, model)
+        except Exception:
+            # e.g. the snapshot is older than the change log keeps -- so rebuild the index, instead
+            logger.exception(f"Could not catch {type(index).__name__} up with the changes to {self.db_name!r}")
+            index.clear()
+            return False
+        
+        logger.info(f"Restored {type(index).__name__} from {path}, and replayed {replayed} change(s)")
+        return True
+    
+    async def _replay_changes(self, index: FeatureIndex, position: str) -> int:
+        settings = get_app_config()
+        since, more, replayed = changes.encode_token(position), True, 0
+        while more:
+            records, tombstones, since, more = await changes.read_changes(self.db_name, since, settings.changes_max_limit)
+            for record in records:
+                if record["key"] not in self._written:
+                    index.add(record["key"], record)
+            for tombstone in tombstones:
+                if tombstone.key not in self._written:
+                    index.remove(tombstone.key)
+            replayed += len(records) + len(tombstones)
+        return replayed
+    
+    async def _replay_updated(self, index: FeatureIndex, position: str, model) -> int:
+        # `properties.updated` is a naive, local ISO timestamp (see Props) -- which sorts as a string
+        since = datetime.fromtimestamp(int(position) / changes.NS_PER_SECOND).isoformat()
+        replayed = 0
+        async for page in model.iter_records({"properties.updated?gt": since}):
+            for record in page:
+                if record["key"] not in self._written:
+                    index.add(record["key"], record)
+            replayed += len(page)
+        return replayed
+    
+    def save_snapshots(self) -> None:
+        """Saves a snapshot of every (built) index that has a snapshot path -- e.g. on app shutdown"""
+        settings = get_app_config()
+        # @NOTE: stamped a little in the past -- replaying a change twice is harmless, missing one isn't
+        position = changes.position(time.time_ns() - settings.changes_overlap_ms * 1_000_000)
+        
+        for index, path in self.snapshots.items():
+            if not self.is_ready(index):
+                continue
+            try:
+                index.save(path, position)
+            except OSError:
+                logger.exception(f"Could not save a snapshot of {type(index).__name__} to {path}")
+    
+    def close(self) -> None:
+        events.remove_listener(self.on_write)
+        self.ready = False
+        self._restored = set()
@@ -0,0 +1,156 @@
+"""
+MapMarkr :: Point-cluster index
+
+-  Features are projected onto the Web Mercator square, and grouped into grid cells which are 
+   (about) `radius_px` screen pixels wide at each zoom level. Cell sizes halve with each zoom 
+   level, so every cell nests inside exactly one cell of the zoom level below -- i.e. a level 
+   can be built by merging the cells of the level above it, rather than from the raw points.
+-  a level is built the first time it's queried, and from then on is updated incrementally, 
+   as Features are saved & deleted.
+"""
+import math
+
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from mapmarks.api.geo import BBox
+from mapmarks.api.indexes.base import FeatureIndex, record_category, record_position
+
+
+Cell = Tuple[int, int]
+TILE_SIZE_PX = 256
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def mercator(lon: float, lat: float) -> Tuple[float, float]:
+    """Projects (lon, lat) onto the unit Web Mercator square: (0, 0) is the north-west corner."""
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    sin_lat = math.sin(math.radians(lat))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+
+class ClusterCell:
+    """The running totals of one cluster: its point count, coordinate sums & per-category counts"""
+    __slots__ = ("count", "sum_lon", "sum_lat", "categories")
+    
+    def __init__(self) -> None:
+        self.count = 0
+        self.sum_lon = 0.0
+        self.sum_lat = 0.0
+        self.categories: Counter = Counter()
+        
+    @property
+    def lon(self) -> float:
+        return self.sum_lon / self.count
+    
+    @property
+    def lat(self) -> float:
+        return self.sum_lat / self.count
+    
+    def add(self, lon: float, lat: float, category: Optional[str], count: int = 1) -> None:
+        self.count += count
+        self.sum_lon += lon * count
+        self.sum_lat += lat * count
+        self.categories[category or "Other"] += count
+            
+    def remove(self, lon: float, lat: float, category: Optional[str]) -> None:
+        self.count -= 1
+        self.sum_lon -= lon
+        self.sum_lat -= lat
+        self.categories[category or "Other"] -= 1
+        if self.categories[category or "Other"] <= 0:
+            del self.categories[category or "Other"]
+        
+    def merge(self, other: "ClusterCell") -> None:
+        self.count += other.count
+        self.sum_lon += other.sum_lon
+        self.sum_lat += other.sum_lat
+        self.categories.update(other.categories)
+
+
+class ClusterIndex(FeatureIndex):
+    light = True
+    
+    def __init__(self, radius_px: int = 64, max_zoom: int = 16) -> None:
+        # cells per tile, per axis: the largest power of two whose cells are at least `radius_px` wide
+        self.cell_bits = max(0, int(math.log2(TILE_SIZE_PX / radius_px)))
+        self.max_zoom = max_zoom
+        self._points: Dict[str, Tuple[float, float, float, float, Optional[str]]] = {}
+        self._levels: Dict[int, Dict[Cell, ClusterCell]] = {}
+        
+    def add(self, key: str, record: Dict[str, Any]) -> None:
+        self.remove(key)
+        
+        position = record_position(record)
+        if position is None:
+            return
+        
+        lon, lat = position
+        point = (*mercator(lon, lat), lon, lat, record_category(record))
+        self._points[key] = point
+        for zoom, cells in self._levels.items():
+            cells.setdefault(self._cell(zoom, point[0], point[1]), ClusterCell()).add(*point[2:])
+            
+    def remove(self, key: str) -> None:
+        point = self._points.pop(key, None)
+        if point is None:
+            return
+        
+        for zoom, cells in self._levels.items():
+            cell = self._cell(zoom, point[0], point[1])
+            cells[cell].remove(*point[2:])
+            if cells[cell].count <= 0:
+                del cells[cell]
+                
+    def clear(self) -> None:
+        self._points.clear()
+        self._levels.clear()
+        
+    def clusters(self, bbox: BBox, zoom: int) -> List[ClusterCell]:
+        """The clusters at `zoom` whose cells overlap `bbox`"""
+        zoom = max(0, min(zoom, self.max_zoom))
+        cells = self._level(zoom)
+        
+        min_x, min_y = self._cell(zoom, *mercator(bbox.min_lon, bbox.max_lat))
+        max_x, max_y = self._cell(zoom, *mercator(bbox.max_lon, bbox.min_lat))
+        
+        return [cluster for _, cluster in self._overlapping_cells(cells, min_x, min_y, max_x, max_y)]
+    
+    def _level(self, zoom: int) -> Dict[Cell, ClusterCell]:
+        cells = self._levels.get(zoom)
+        if cells is not None:
+            return cells
+        
+        finer = min((z for z in self._levels if z > zoom), default=None)
+        cells = {}
+        
+        if finer is not None:
+            # merge the cells of the nearest finer level, rather than re-visiting every point
+            shift = finer - zoom
+            for (x, y), cluster in self._levels[finer].items():
+                cells.setdefault((x >> shift, y >> shift), ClusterCell()).merge(cluster)
+        else:
+            for x, y, lon, lat, category in self._points.values():
+                cells.setdefault(self._cell(zoom, x, y), ClusterCell()).add(lon, lat, category)
+                
+        self._levels[zoom] = cells
+        return cells
+    
+    def _cell(self, zoom: int, x: float, y: float) -> Cell:
+        scale = 1 << (zoom + self.cell_bits)
+        return int(x * scale), int(y * scale)
+    
+    @staticmethod
+    def _overlapping_cells(cells: Dict[Cell, ClusterCell], min_x: int, min_y: int, max_x: int, max_y: int) -> Iterator[Tuple[Cell, ClusterCell]]:
+        # visit whichever is fewer: the cells the box spans, or the (non-empty) cells of the level
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= len(cells):
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    if (x, y) in cells:
+                        yield (x, y), cells[(x, y)]
+        else:
+            for (x, y), cluster in cells.items():
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    yield (x, y), cluster
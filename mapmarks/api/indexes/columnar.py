@@ -0,0 +1,144 @@
+"""
+MapMarkr :: Columnar coordinate store
+
+-  keeps every Feature's lon, lat & category code in contiguous NumPy arrays (a row per Feature),
+   so that distance queries run as vectorized array math, rather than a Python loop over `Feature`s.
+-  k-nearest-neighbour queries compute a batched haversine distance to every row, then select the 
+   k smallest with `np.argpartition` (O(n)), sorting only those k.
+"""
+import typing
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from mapmarks.api.geo import EARTH_RADIUS_M
+from mapmarks.api.indexes.base import FeatureIndex, record_category, record_position
+from mapmarks.api.types import GeolocationCategory
+
+
+# Category codes -- the position of each category in the GeolocationCategory literal; -1 if unknown
+CATEGORIES: Tuple[str, ...] = typing.get_args(GeolocationCategory)
+CATEGORY_CODES: Dict[str, int] = {category: code for code, category in enumerate(CATEGORIES)}
+
+Neighbours = List[Tuple[str, float]]
+
+
+class ColumnarStore(FeatureIndex):
+    """
+    class ColumnarStore
+    
+    -  rows are appended (growing the arrays by doubling), and deleted by moving the last row into 
+       the gap -- so the live rows are always `[:len(self)]`, with no holes to mask out.
+    -  `max_cells` caps the size of the (query points x rows) distance matrix computed at once, 
+       when answering many query points in one call.
+    """
+    light = True
+    
+    def __init__(self, initial_capacity: int = 1024, max_cells: int = 4_000_000) -> None:
+        self.max_cells = max_cells
+        self._size = 0
+        self._rows: Dict[str, int] = {}
+        self._allocate(initial_capacity)
+        
+    def __len__(self) -> int:
+        return self._size
+    
+    def add(self, key: str, record: Dict[str, Any]) -> None:
+        position = record_position(record)
+        if position is None:
+            self.remove(key)
+            return
+        
+        row = self._rows.get(key)
+        if row is None:
+            if self._size == len(self.keys):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._rows[key] = row
+            
+        lon, lat = position
+        self.keys[row] = key
+        self.lon[row] = np.radians(lon)
+        self.lat[row] = np.radians(lat)
+        self.cos_lat[row] = np.cos(self.lat[row])
+        self.category[row] = CATEGORY_CODES.get(record_category(record), -1)
+        
+    def remove(self, key: str) -> None:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        
+        last = self._size - 1
+        if row != last:
+            for column in self._columns():
+                column[row] = column[last]
+            self._rows[self.keys[row]] = row
+            
+        self.keys[last] = None
+        self._size = last
+        
+    def clear(self) -> None:
+        self._size = 0
+        self._rows.clear()
+        self._allocate(len(self.keys))
+        
+    def nearest(self, lon: float, lat: float, k: int, category: Optional[str] = None) -> Neighbours:
+        """The `k` nearest (key, distance in meters) to (lon, lat) -- nearest first"""
+        return self.nearest_many([(lon, lat)], k, category)[0]
+    
+    def nearest_many(self, points: Sequence[Tuple[float, float]], k: int, category: Optional[str] = None) -> List[Neighbours]:
+        """The `k` nearest (key, distance in meters) to EACH of `points` -- e.g. every stop along a route"""
+        rows = np.arange(self._size)
+        if category is not None:
+            rows = rows[self.category[:self._size] == CATEGORY_CODES.get(category, -2)]
+            
+        if not len(points):
+            return []
+        if not len(rows) or k <= 0:
+            return [[] for _ in points]
+        
+        k = min(k, len(rows))
+        lon, lat, cos_lat = self.lon[rows], self.lat[rows], self.cos_lat[rows]
+        query = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        chunk_size = max(1, self.max_cells // len(rows))
+        results: List[Neighbours] = []
+        
+        for start in range(0, len(query), chunk_size):
+            q_lon = query[start:start + chunk_size, 0:1]
+            q_lat = query[start:start + chunk_size, 1:2]
+            
+            # batched haversine: one row of distances per query point
+            a = np.sin((lat - q_lat) / 2) ** 2 + np.cos(q_lat) * cos_lat * np.sin((lon - q_lon) / 2) ** 2
+            distances = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+            
+            if k < len(rows):
+                nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            else:
+                nearest = np.broadcast_to(np.arange(len(rows)), distances.shape)
+            nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+            order = np.argsort(nearest_distances, axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            nearest_distances = np.take_along_axis(nearest_distances, order, axis=1)
+            
+            for indices, dists in zip(nearest, nearest_distances):
+                results.append([(self.keys[rows[i]], float(d)) for i, d in zip(indices, dists)])
+                
+        return results
+    
+    def _columns(self):
+        return (self.keys, self.lon, self.lat, self.cos_lat, self.category)
+    
+    def _allocate(self, capacity: int) -> None:
+        self.keys = np.empty(capacity, dtype=object)
+        self.lon = np.zeros(capacity, dtype=np.float64)
+        self.lat = np.zeros(capacity, dtype=np.float64)
+        self.cos_lat = np.zeros(capacity, dtype=np.float64)
+        self.category = np.full(capacity, -1, dtype=np.int8)
+        
+    def _grow(self) -> None:
+        old = self._columns()
+        self._allocate(max(1, 2 * len(self.keys)))
+        for new_column, old_column in zip(self._columns(), old):
+            new_column[:len(old_column)] = old_column
@@ -0,0 +1,58 @@
+"""
+MapMarkr :: Facet counts
+
+-  counts the Features by the value of each facet field (e.g. `properties.category`), so that the
+   per-category counts the map shows are read in O(1) -- not counted over a fetch of every record.
+-  every write adjusts the counts by the difference it makes: each key's facet values are remembered,
+   so an update moves the key from its old value's count to its new one, and a delete takes it off.
+"""
+from collections import Counter
+from typing import Any, Dict, Hashable, Tuple
+
+from mapmarks.api.indexes.base import FeatureIndex
+from mapmarks.api.storage.base import get_path
+
+
+class FacetIndex(FeatureIndex):
+    def __init__(self, fields: Dict[str, str]) -> None:
+        """`fields` maps each facet's name to the (dotted) path of its value in a record"""
+        self.fields = fields
+        self._counts: Dict[str, "Counter[Hashable]"] = {name: Counter() for name in fields}
+        self._values: Dict[str, Tuple[Hashable, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def light(self) -> bool:
+        return all(path == "properties.category" for path in self.fields.values())
+
+    def add(self, key: str, record: Dict[str, Any]) -> None:
+        values = tuple(get_path(record, path) for path in self.fields.values())
+        if self._values.get(key) == values:
+            return
+
+        self.remove(key)
+        self._values[key] = values
+        for name, value in zip(self.fields, values):
+            self._counts[name][value] += 1
+
+    def remove(self, key: str) -> None:
+        values = self._values.pop(key, None)
+        if values is None:
+            return
+
+        for name, value in zip(self.fields, values):
+            counts = self._counts[name]
+            counts[value] -= 1
+            if counts[value] <= 0:
+                del counts[value]
+
+    def clear(self) -> None:
+        self._values.clear()
+        for counts in self._counts.values():
+            counts.clear()
+
+    def counts(self, name: str) -> Dict[Hashable, int]:
+        """The number of Features with each value of facet `name` -- values with no Features are left out"""
+        return dict(self._counts[name])
@@ -0,0 +1,238 @@
+"""
+MapMarkr :: Full-text search index
+
+-  an inverted index over each Feature's `properties.title` & `properties.note`: text is tokenized
+   (case- & accent-folded words), and each token's postings map the keys of the Features it occurs in
+   to a weight -- a title match counts for more than a note match.
+-  a query matches the Features which contain EVERY query term -- as a whole token, or (for terms of
+   at least `min_prefix` characters) as the prefix of one, so "truck st" finds "Truck Stop". Results
+   are ranked by the sum of each term's best match weight (saturating, as in BM25: repeating a word only
+   helps so much) x IDF; prefix matches count for a bit less.
+-  each term's candidates come from its postings, and the terms are intersected starting from the
+   rarest -- so a query costs O(smallest postings), not O(all Features). A bbox is given as the keys
+   inside it (from the spatial index), and intersected like one more term -- first, if it's the rarest.
+-  a prefix expands to at most `max_expansions` words: the most common ones, ties in alphabetical order.
+   `truncated_terms()` names the query terms which matched more than that.
+-  the indexed documents can be saved to (and restored from) a snapshot file, so that search is
+   available straight after a restart -- see `save()` & `load()`.
+"""
+import bisect
+import heapq
+import json
+import math
+import os
+import re
+import unicodedata
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from mapmarks.api.geo import BBox
+from mapmarks.api.indexes.base import FeatureIndex, record_position
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+# (dotted path to the text, weight of a match in it)
+FIELDS: Tuple[Tuple[str, float], ...] = (("title", 2.0), ("note", 1.0))
+PREFIX_MATCH_FACTOR = 0.8
+SATURATION = 1.2    # BM25's k1
+SNAPSHOT_FORMAT = 1
+
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Splits `text` into case- & accent-folded words: "Café Crème" -> ["cafe", "creme"]"""
+    if not text:
+        return []
+    folded = "".join(char for char in unicodedata.normalize("NFKD", text.casefold()) if not unicodedata.combining(char))
+    return WORD.findall(folded)
+
+
+def _saturate(weight: float) -> float:
+    return weight * (SATURATION + 1) / (weight + SATURATION)
+
+
+class SearchDocument(NamedTuple):
+    title: Optional[str]
+    note: Optional[str]
+    position: Optional[Tuple[float, float]]
+    tokens: Tuple[str, ...]
+
+
+class SearchIndex(FeatureIndex):
+    def __init__(self, min_prefix: int = 2, max_expansions: int = 64) -> None:
+        self.min_prefix = min_prefix
+        self.max_expansions = max_expansions    # max. tokens a prefix expands to -- the most common ones win
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []        # every token, sorted -- for prefix lookups
+        self._documents: Dict[str, SearchDocument] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, key: str, record: Dict[str, Any]) -> None:
+        self.remove(key)
+        properties = record.get("properties") or {}
+
+        weights: Dict[str, float] = {}
+        for field, weight in FIELDS:
+            for token in tokenize(properties.get(field)):
+                weights[token] = weights.get(token, 0.0) + weight
+
+        self._documents[key] = SearchDocument(
+            properties.get("title"), properties.get("note"), record_position(record), tuple(weights),
+        )
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                bisect.insort(self._vocabulary, token)
+            postings[key] = weight
+
+    def remove(self, key: str) -> None:
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+
+        for token in document.tokens:
+            postings = self._postings[token]
+            del postings[key]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._documents.clear()
+
+    def search(
+        self, query: str, limit: int, bbox: Optional[BBox] = None, within: Optional[Set[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """The (key, score) of the `limit` best matches for `query` -- among the keys `within` (e.g. a bbox's, from
+           the spatial index) or, failing that, inside `bbox`, if given -- best first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+
+        # each term's matching tokens, with the factor a match on them scores
+        expansions = [self._expand(term) for term in terms]
+        if not all(expansions):
+            return []
+
+        candidates = self._intersect(expansions, within)
+        if bbox is not None and within is None:
+            candidates = {
+                key for key in candidates
+                if self._documents[key].position is not None and bbox.contains(*self._documents[key].position)
+            }
+
+        total = len(self._documents)
+        idf = {
+            token: math.log(1 + total / len(self._postings[token]))
+            for matches in expansions for token in matches
+        }
+
+        def score(key: str) -> float:
+            return sum(
+                max(_saturate(self._postings[token].get(key, 0.0)) * factor * idf[token] for token, factor in matches.items())
+                for matches in expansions
+            )
+
+        return heapq.nlargest(limit, ((key, score(key)) for key in candidates), key=lambda match: (match[1], match[0]))
+
+    def truncated_terms(self, query: str) -> List[str]:
+        """The terms of `query` which are the prefix of more than `max_expansions` tokens -- so some matches were dropped"""
+        truncated = []
+        for term in dict.fromkeys(tokenize(query)):
+            start, end = self._prefixed(term)
+            if end - start > self.max_expansions:
+                truncated.append(term)
+        return truncated
+
+    def _prefixed(self, term: str) -> Tuple[int, int]:
+        """The slice of the vocabulary holding the tokens `term` is a (proper) prefix of -- empty, if it's too short"""
+        if len(term) < self.min_prefix:
+            return 0, 0
+        start = bisect.bisect_right(self._vocabulary, term)
+        return start, bisect.bisect_left(self._vocabulary, term + "\uffff", lo=start)
+
+    def _expand(self, term: str) -> Dict[str, float]:
+        """The tokens `term` matches: itself, and -- if it's long enough -- the tokens it's a prefix of"""
+        matches = {term: 1.0} if term in self._postings else {}
+        start, end = self._prefixed(term)
+        prefixed = self._vocabulary[start:end]
+        if len(prefixed) > self.max_expansions:
+            # (the vocabulary is sorted, and nlargest() is stable -- so ties go alphabetically)
+            prefixed = heapq.nlargest(self.max_expansions, prefixed, key=lambda token: len(self._postings[token]))
+
+        matches.update((token, PREFIX_MATCH_FACTOR) for token in prefixed)
+        return matches
+
+    def _intersect(self, expansions: List[Dict[str, float]], within: Optional[Set[str]] = None) -> Set[str]:
+        """The keys which match EVERY term (and are `within`, if given) -- starting from the smallest set of them"""
+        sizes = [sum(len(self._postings[token]) for token in matches) for matches in expansions]
+        order = sorted(range(len(expansions)), key=sizes.__getitem__)
+
+        candidates: Set[str] = set()
+        if within is not None and len(within) <= sizes[order[0]]:
+            candidates.update(within)
+        else:
+            for token in expansions[order[0]]:
+                candidates.update(self._postings[token])
+            if within is not None:
+                candidates &= within
+            order = order[1:]
+
+        for i in order:
+            if not candidates:
+                break
+            postings = [self._postings[token] for token in expansions[i]]
+            if len(postings) == 1:
+                candidates.intersection_update(postings[0])
+            else:
+                candidates = {key for key in candidates if any(key in keys for keys in postings)}
+        return candidates
+
+    # Snapshots
+    def save(self, path: str, position: str) -> None:
+        """Writes the indexed documents to `path` (atomically), stamped with the change-log `position` they're current as of"""
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "position": position,
+            "documents": [
+                [key, document.title, document.note, document.position]
+                for key, document in self._documents.items()
+            ],
+        }
+
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(temporary, path)
+        logger.info(f"Saved a search snapshot of {len(self._documents)} Feature(s) to {path}")
+
+    def load(self, path: str) -> Optional[str]:
+        """Rebuilds the index from the snapshot at `path`; returns the change-log position it's current as of --
+           or None (leaving the index empty), if there's no usable snapshot"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot.get("format") != SNAPSHOT_FORMAT:
+                return None
+            documents: Iterable[List[Any]] = snapshot["documents"]
+            position = snapshot["position"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.exception(f"Could not read the search snapshot at {path}")
+            return None
+
+        self.clear()
+        for key, title, note, coordinates in documents:
+            self.add(key, {"properties": {"title": title, "note": note}, "geometry": {"coordinates": coordinates}})
+        logger.info(f"Restored the search index from a snapshot of {len(self._documents)} Feature(s)")
+        return position
@@ -0,0 +1,292 @@
+"""
+MapMarkr :: Feature snapshot
+
+-  a compact, local binary file holding every Feature -- its record (as JSON), plus the columns the other
+   indexes are derived from: keys (sorted), coordinates & categories. The columns are fixed-width arrays,
+   so the file is memory-mapped and read in place: opening it costs O(1), and a record is only decoded
+   when it's read (see `FeatureSnapshot`).
+-  the `FeatureStore` index keeps the snapshot it was loaded from, plus every write since (as an overlay),
+   and writes the two back out, merged, as the next snapshot (see `save()`).
+-  on startup, the store is restored from its snapshot & caught up (see IndexRegistry.warm) -- and then the
+   other indexes are built from IT, rather than by walking Deta Base. Those which only need positions &
+   categories (see `FeatureIndex.light`) are built from the columns alone, without decoding a single record.
+-  once restored, the store also serves reads -- `Feature.find()`, `find_many()` & the unfiltered listings
+   (see `get()` & `page()`) -- so the first requests after a warm start don't wait on Deta Base either.
+
+Layout (little-endian): a header -- magic, row count, key width, change-log position -- then a table of
+(offset, length) for each section, then the sections, each 8-byte aligned:
+    keys            S<key width> x n    (sorted -- so a key is found by binary search)
+    coordinates     f8 x (n, 2)         (lon, lat; NaN if the Feature has no Point geometry)
+    categories      i4 x n              (an index into the category names -- -1 for none)
+    category names  JSON list
+    offsets         u8 x (n + 1)        (where each record starts & ends, in the records section)
+    records         compact JSON, one after another
+"""
+import bisect
+import heapq
+import itertools
+import json
+import math
+import mmap
+import os
+import struct
+
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from mapmarks.api.indexes.base import FeatureIndex, record_category, record_position
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+MAGIC = b"MMSNAP01"
+HEADER = struct.Struct("<8sQQ20s4x")    # magic, rows, key width, change-log position
+SECTIONS = 6
+TABLE = struct.Struct("<" + "QQ" * SECTIONS)
+ALIGNMENT = 8
+
+
+class Row(NamedTuple):
+    """A Feature, as the snapshot stores it"""
+    key: str
+    position: Optional[Tuple[float, float]]
+    category: Optional[str]
+    record: bytes   # JSON
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, separators=(",", ":")).encode()
+
+
+def _light_record(key: str, position: Optional[Tuple[float, float]], category: Optional[str]) -> Dict[str, Any]:
+    """Just enough of a record for the `light` indexes -- see FeatureIndex.light"""
+    return {
+        "key": key,
+        "geometry": {"type": "Point", "coordinates": list(position)} if position is not None else None,
+        "properties": {"category": category},
+    }
+
+
+class FeatureSnapshot:
+    """
+    class FeatureSnapshot -- a (read-only) snapshot file, memory-mapped
+    """
+    def __init__(self, path: str) -> None:
+        """Maps the snapshot at `path` -- raises ValueError if it isn't one (or is damaged), OSError if it can't be read"""
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, rows, key_width, position = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"not a Feature snapshot (or an unknown version of one): {magic!r}")
+            table = TABLE.unpack_from(self._mmap, HEADER.size)
+            sections = list(zip(table[::2], table[1::2]))
+            if any(offset + length > len(self._mmap) for offset, length in sections):
+                raise ValueError("the file is truncated")
+
+            def column(section: int, dtype: str, count: int) -> np.ndarray:
+                offset, length = sections[section]
+                if np.dtype(dtype).itemsize * count != length:
+                    raise ValueError(f"section {section} has the wrong size")
+                return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset) if count else np.empty(0, dtype)
+
+            self.log_position: str = position.decode("ascii")
+            self.keys = column(0, f"S{max(key_width, 1)}", rows)
+            self.coordinates = column(1, "<f8", rows * 2).reshape(rows, 2)
+            self.category_codes = column(2, "<i4", rows)
+            offset, length = sections[3]
+            self.category_names: List[Optional[str]] = json.loads(self._mmap[offset:offset + length])
+            self.offsets = column(4, "<u8", rows + 1)
+            self._records_at = sections[5][0]
+        except (struct.error, ValueError, TypeError):
+            self.close()
+            raise ValueError(f"{path} is not a usable Feature snapshot")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def close(self) -> None:
+        # the arrays are views of the mapping -- they must go before it can be closed
+        self.keys = self.coordinates = self.category_codes = self.offsets = np.empty(0)
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass    # a row is still in use somewhere: the mapping is closed when it's collected
+
+    def row_after(self, key: str) -> int:
+        """The first row whose key sorts after `key`"""
+        return int(np.searchsorted(self.keys, key.encode(), side="right"))
+
+    def row_of(self, key: str) -> Optional[int]:
+        encoded = key.encode()
+        row = int(np.searchsorted(self.keys, encoded))
+        return row if row < len(self.keys) and self.keys[row] == encoded else None
+
+    def key(self, row: int) -> str:
+        return self.keys[row].decode()
+
+    def position(self, row: int) -> Optional[Tuple[float, float]]:
+        lon, lat = self.coordinates[row]
+        return None if math.isnan(lon) else (float(lon), float(lat))
+
+    def category(self, row: int) -> Optional[str]:
+        code = int(self.category_codes[row])
+        return self.category_names[code] if code >= 0 else None
+
+    def encoded_record(self, row: int) -> bytes:
+        start, end = self._records_at + int(self.offsets[row]), self._records_at + int(self.offsets[row + 1])
+        return self._mmap[start:end]
+
+    def record(self, row: int) -> Dict[str, Any]:
+        return json.loads(self.encoded_record(row))
+
+    def rows(self, start: int = 0) -> Iterator[Row]:
+        for row in range(start, len(self)):
+            yield Row(self.key(row), self.position(row), self.category(row), self.encoded_record(row))
+
+
+def write_snapshot(path: str, rows: Iterator[Row], position: str) -> int:
+    """Writes `rows` -- which must be in key order -- to a snapshot at `path` (atomically); returns the number written"""
+    keys: List[bytes] = []
+    coordinates: List[Tuple[float, float]] = []
+    codes: List[int] = []
+    category_names: Dict[Optional[str], int] = {}
+    offsets: List[int] = [0]
+    records = bytearray()
+
+    for row in rows:
+        keys.append(row.key.encode())
+        coordinates.append(row.position if row.position is not None else (math.nan, math.nan))
+        codes.append(-1 if row.category is None else category_names.setdefault(row.category, len(category_names)))
+        records += row.record
+        offsets.append(len(records))
+
+    key_width = max((len(key) for key in keys), default=0)
+    sections = [
+        np.array(keys, dtype=f"S{max(key_width, 1)}").tobytes(),
+        np.array(coordinates, dtype="<f8").reshape(-1, 2).tobytes(),
+        np.array(codes, dtype="<i4").tobytes(),
+        json.dumps(list(category_names)).encode(),
+        np.array(offsets, dtype="<u8").tobytes(),
+        bytes(records),
+    ]
+
+    table, offset = [], HEADER.size + TABLE.size
+    for section in sections:
+        offset += -offset % ALIGNMENT
+        table += [offset, len(section)]
+        offset += len(section)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), key_width, position.encode("ascii")))
+        f.write(TABLE.pack(*table))
+        for section, at in zip(sections, table[::2]):
+            f.write(b"\0" * (at - f.tell()))
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return len(keys)
+
+
+class FeatureStore(FeatureIndex):
+    """
+    class FeatureStore -- every Feature: those of the snapshot it was loaded from, plus the writes since
+
+    -  the writes since are kept as an overlay, (re-)encoded as JSON -- a put replaces (or shadows) the
+       snapshot's row, a delete hides it. With no snapshot (i.e. after a full walk), it's all overlay.
+    """
+    holds_records = True
+
+    def __init__(self) -> None:
+        self._snapshot: Optional[FeatureSnapshot] = None
+        self._changed: Dict[str, Row] = {}
+        self._changed_keys: List[str] = []  # the keys of `_changed`, sorted
+        self._deleted: Set[str] = set()     # keys of the snapshot's rows which have since been deleted
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._changed:
+            return True
+        return key not in self._deleted and self._snapshot is not None and self._snapshot.row_of(key) is not None
+
+    def add(self, key: str, record: Dict[str, Any]) -> None:
+        self._size += key not in self
+        if key not in self._changed:
+            bisect.insort(self._changed_keys, key)
+        self._changed[key] = Row(key, record_position(record), record_category(record), _encode(record))
+        self._deleted.discard(key)
+
+    def remove(self, key: str) -> None:
+        if key not in self:
+            return
+        self._size -= 1
+        if self._changed.pop(key, None) is not None:
+            del self._changed_keys[bisect.bisect_left(self._changed_keys, key)]
+        if self._snapshot is not None and self._snapshot.row_of(key) is not None:
+            self._deleted.add(key)
+
+    def clear(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.close()
+        self._snapshot = None
+        self._changed.clear()
+        self._changed_keys.clear()
+        self._deleted.clear()
+        self._size = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._changed.get(key)
+        if row is not None:
+            return json.loads(row.record)
+        if key in self._deleted or self._snapshot is None:
+            return None
+        index = self._snapshot.row_of(key)
+        return self._snapshot.record(index) if index is not None else None
+
+    def rows(self, after: Optional[str] = None) -> Iterator[Row]:
+        """Every Feature (whose key sorts after `after`, if given), in key order -- the snapshot's rows merged with the overlay's"""
+        base: Iterator[Row] = iter(())
+        if self._snapshot is not None:
+            start = self._snapshot.row_after(after) if after is not None else 0
+            base = (row for row in self._snapshot.rows(start) if row.key not in self._changed and row.key not in self._deleted)
+        start = bisect.bisect_right(self._changed_keys, after) if after is not None else 0
+        changed = (self._changed[key] for key in itertools.islice(self._changed_keys, start, None))
+        return heapq.merge(base, changed, key=lambda row: row.key)
+
+    def page(self, after: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Up to `limit` records, in key order, after the key `after` -- plus the key to carry on after (None on the last page), 
+           as `fetch_records()` pages through storage"""
+        rows = list(itertools.islice(self.rows(after), limit + 1))
+        records = [json.loads(row.record) for row in rows[:limit]]
+        return records, (rows[limit - 1].key if len(rows) > limit else None)
+
+    def replay(self, light: bool = False, after: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for row in self.rows(after):
+            yield row.key, _light_record(row.key, row.position, row.category) if light else json.loads(row.record)
+
+    # Snapshots
+    def save(self, path: str, position: str) -> None:
+        count = write_snapshot(path, self.rows(), position)
+        logger.info(f"Saved a snapshot of {count} Feature(s) to {path}")
+
+    def load(self, path: str) -> Optional[str]:
+        try:
+            snapshot = FeatureSnapshot(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.exception(f"Could not read the Feature snapshot at {path}")
+            return None
+
+        self.clear()
+        self._snapshot, self._size = snapshot, len(snapshot)
+        logger.info(f"Mapped a snapshot of {len(snapshot)} Feature(s) from {path}")
+        return snapshot.log_position
@@ -0,0 +1,99 @@
+"""
+MapMarkr :: Spatial index
+
+-  a uniform grid (cells of `cell_size` x `cell_size` degrees) over the Features' positions, so that
+   bounding-box & radius queries only visit the cells they overlap -- i.e. they cost O(matches),
+   rather than O(all features).
+"""
+import math
+
+from typing import Any, Dict, Iterator, List, Tuple
+
+from mapmarks.api.geo import BBox, haversine_m
+from mapmarks.api.indexes.base import FeatureIndex, record_position
+
+
+Cell = Tuple[int, int]
+Position = Tuple[float, float]
+
+
+class SpatialIndex(FeatureIndex):
+    light = True
+    
+    def __init__(self, cell_size: float) -> None:
+        self.cell_size = cell_size
+        self._cells: Dict[Cell, Dict[str, Position]] = {}
+        self._positions: Dict[str, Position] = {}
+        
+    def __len__(self) -> int:
+        return len(self._positions)
+    
+    def add(self, key: str, record: Dict[str, Any]) -> None:
+        self.remove(key)
+        
+        position = record_position(record)
+        if position is None:
+            return
+        
+        self._positions[key] = position
+        self._cells.setdefault(self._cell(*position), {})[key] = position
+        
+    def remove(self, key: str) -> None:
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+        
+        cell = self._cell(*position)
+        points = self._cells[cell]
+        del points[key]
+        if not points:
+            del self._cells[cell]
+            
+    def clear(self) -> None:
+        self._cells.clear()
+        self._positions.clear()
+        
+    def position(self, key: str):
+        return self._positions.get(key)
+    
+    def within_bbox(self, bbox: BBox) -> List[str]:
+        """Keys of the Features inside `bbox` (edges included)"""
+        min_x, min_y = self._cell(bbox.min_lon, bbox.min_lat)
+        max_x, max_y = self._cell(bbox.max_lon, bbox.max_lat)
+        keys = []
+        
+        for (x, y), points in self._overlapping_cells(min_x, min_y, max_x, max_y):
+            if min_x < x < max_x and min_y < y < max_y:
+                # interior cells lie wholly inside the box
+                keys.extend(points)
+            else:
+                keys.extend(key for key, (lon, lat) in points.items() if bbox.contains(lon, lat))
+                
+        return keys
+    
+    def near(self, lon: float, lat: float, radius_m: float) -> List[Tuple[str, float]]:
+        """(key, distance in meters) of the Features within `radius_m` of (lon, lat), nearest first"""
+        matches = []
+        
+        for key in self.within_bbox(BBox.around(lon, lat, radius_m)):
+            distance = haversine_m(lon, lat, *self._positions[key])
+            if distance <= radius_m:
+                matches.append((key, distance))
+                
+        return sorted(matches, key=lambda match: match[1])
+    
+    def _cell(self, lon: float, lat: float) -> Cell:
+        return math.floor(lon / self.cell_size), math.floor(lat / self.cell_size)
+    
+    def _overlapping_cells(self, min_x: int, min_y: int, max_x: int, max_y: int) -> Iterator[Tuple[Cell, Dict[str, Position]]]:
+        # visit whichever is fewer: the cells the box spans, or the (non-empty) cells of the index
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= len(self._cells):
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    points = self._cells.get((x, y))
+                    if points:
+                        yield (x, y), points
+        else:
+            for (x, y), points in self._cells.items():
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    yield (x, y), points
@@ -0,0 +1,199 @@
+"""
+MapMarkr :: Metrics
+
+-  a small, dependency-free registry of counters, gauges & histograms, rendered in the Prometheus 
+   text exposition format (https://prometheus.io/docs/instrumenting/exposition_formats/) at /metrics.
+-  recording a sample is a dict lookup plus an add (a bisect, for histograms) -- cheap enough to 
+   leave on in production. Everything runs on the event loop, so no locking is needed.
+"""
+import bisect
+import json
+import time
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from mapmarks.api.storage.base import FetchResponse, Query, Record, StorageBackend
+
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    kind = "untyped"
+    
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines += list(self._samples())
+        return lines
+    
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+    
+    def _labels(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(Metric):
+    kind = "counter"
+    
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+        
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+        
+    def _samples(self) -> Iterable[str]:
+        for values, value in self._values.items():
+            yield f"{self.name}{self._labels(values)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+    
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+        
+    def set(self, *label_values: str, value: float) -> None:
+        self._values[label_values] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (non-cumulative, + the +Inf bucket), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        
+    def observe(self, value: float, *label_values: str) -> None:
+        counts, total = self._values.get(label_values) or self._values.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+        
+    def _samples(self) -> Iterable[str]:
+        for values, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{self._labels(values, le)} {cumulative}"
+            yield f"{self.name}_sum{self._labels(values)} {_number(total[0])}"
+            yield f"{self.name}_count{self._labels(values)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[Metric]]] = []
+        
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+    
+    def register_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        """`collector` is called on each render, to report values kept elsewhere (e.g. pool & cache stats)"""
+        self._collectors.append(collector)
+        
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            for metric in collector():
+                lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# The app's metrics
+registry = Registry()
+
+http_requests = registry.register(Counter("mapmarks_http_requests_total", "HTTP requests handled, by route template & status code.", ("method", "route", "status")))
+http_duration = registry.register(Histogram("mapmarks_http_request_duration_seconds", "HTTP request latency, by route template.", ("method", "route")))
+http_in_flight = registry.register(Gauge("mapmarks_http_requests_in_flight", "HTTP requests currently being handled, by route template.", ("method", "route")))
+
+cold_start = registry.register(Gauge("mapmarks_cold_start_seconds", "Time from the first import of the app's code to its first response being sent."))
+
+storage_calls = registry.register(Counter("mapmarks_storage_calls_total", "Storage (Deta Base) calls, by operation & outcome.", ("op", "db_name", "outcome")))
+storage_duration = registry.register(Histogram("mapmarks_storage_call_duration_seconds", "Storage (Deta Base) call latency, by operation.", ("op", "db_name")))
+storage_items = registry.register(Counter("mapmarks_storage_items_total", "Records read or written by storage calls.", ("op", "db_name")))
+storage_bytes = registry.register(Counter("mapmarks_storage_bytes_total", "Approx. JSON size of the records read or written by storage calls.", ("op", "db_name")))
+
+
+class InstrumentedStorage(StorageBackend):
+    """
+    class InstrumentedStorage -- wraps a storage client, recording the latency, outcome, item count 
+    & (if `measure_bytes`) payload size of every call made through it.
+    
+    -  the payload size is estimated from ONE record per call (its JSON size, times the item count) -- rather than
+       serializing a whole page or batch a second time, just to count its bytes.
+    """
+    def __init__(self, backend: StorageBackend, measure_bytes: bool = True) -> None:
+        super().__init__(backend.db_name)
+        self.backend = backend
+        self.util = backend.util
+        self.measure_bytes = measure_bytes
+        
+    async def get(self, key: str) -> Optional[Record]:
+        return await self._call("get", self.backend.get(key), _items_of_record)
+    
+    async def put(self, data: Record, key: Optional[str] = None) -> Record:
+        return await self._call("put", self.backend.put(data, key), _items_of_record, payload=[data])
+    
+    async def put_many(self, items: List[Record]) -> Dict[str, Any]:
+        return await self._call("put_many", self.backend.put_many(items), lambda _: items, payload=items)
+    
+    async def fetch(self, query: Query = None, *, limit: int = 1000, last: Optional[str] = None) -> FetchResponse:
+        return await self._call("fetch", self.backend.fetch(query, limit=limit, last=last), lambda response: response.items)
+    
+    async def update(self, updates: Dict[str, Any], key: str, expect: Optional[Dict[str, Any]] = None) -> Optional[Record]:
+        return await self._call("update", self.backend.update(updates, key, expect), lambda _: [updates])
+    
+    async def delete(self, key: str) -> None:
+        return await self._call("delete", self.backend.delete(key), lambda _: [key])
+    
+    async def close(self) -> None:
+        await self.backend.close()
+        
+    async def _call(self, op: str, call, items_of: Callable[[Any], List[Any]], payload: Optional[List[Any]] = None):
+        started = time.perf_counter()
+        try:
+            result = await call
+        except BaseException:
+            storage_calls.inc(op, self.db_name, "error")
+            raise
+        finally:
+            storage_duration.observe(time.perf_counter() - started, op, self.db_name)
+            
+        storage_calls.inc(op, self.db_name, "ok")
+        items = items_of(result)
+        storage_items.inc(op, self.db_name, amount=len(items))
+        if self.measure_bytes and items:
+            sample = (payload if payload is not None else items)[0]
+            storage_bytes.inc(op, self.db_name, amount=len(json.dumps(sample, default=str)) * len(items))
+        return result
+
+
+def _items_of_record(record: Optional[Record]) -> List[Record]:
+    return [record] if record else []
@@ -0,0 +1,118 @@
+"""
+MapMarkr :: ASGI middleware
+
+-  `MetricsMiddleware` records, for every HTTP request: its latency, its status code, and the number
+   of requests in flight -- labelled by the route's path *template* (e.g. /features/{feature_id}),
+   so that IDs in the URL don't blow up the number of series. Once dispatched, the route is read from the
+   request's scope (where the router leaves it); until then, it's looked up -- and cached, per method & path.
+-  it's a plain ASGI middleware (not a `BaseHTTPMiddleware`), so it doesn't buffer or re-wrap
+   responses -- streaming responses pass straight through.
+-  `ColdStartMiddleware` measures the time to the app's first response (see `AppSettings.lazy_startup`).
+"""
+import time
+
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import mapmarks
+
+from mapmarks.api import metrics
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+
+UNMATCHED_ROUTE = "unmatched"
+ROUTE_CACHE_SIZE = 4096     # (method, path)s whose route template is remembered
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._routes: "OrderedDict[Tuple[str, str], str]" = OrderedDict()     # (method, path) -> route template
+
+    def route_template(self, scope: Scope) -> str:
+        entry = (scope["method"], scope["path"])
+        route = self._routes.get(entry)
+        if route is None:
+            route = self._routes[entry] = route_template(scope)
+            if len(self._routes) > ROUTE_CACHE_SIZE:
+                self._routes.popitem(last=False)
+        else:
+            self._routes.move_to_end(entry)
+        return route
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], self.route_template(scope)
+        status = "500"     # unless a response is started
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        metrics.http_in_flight.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.http_in_flight.dec(method, route)
+            # the router leaves the route it dispatched to in the scope
+            route = getattr(scope.get("route"), "path", route)
+            metrics.http_duration.observe(time.perf_counter() - started, method, route)
+            metrics.http_requests.inc(method, route, status)
+
+
+def route_template(scope: Scope) -> str:
+    """The path template of the route that `scope` will be dispatched to -- matched the same way the router does."""
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    if router is None:
+        return UNMATCHED_ROUTE
+
+    partial = None
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+        if match == Match.PARTIAL and partial is None:
+            partial = route     # e.g. the path matches, but the method doesn't (405)
+
+    return getattr(partial, "path", UNMATCHED_ROUTE) if partial is not None else UNMATCHED_ROUTE
+
+
+class ColdStartMiddleware:
+    """
+    class ColdStartMiddleware -- records the time from the app's first import (`mapmarks.STARTED_AT`) to its 
+    first response being sent, as the `mapmarks_cold_start_seconds` gauge; then calls `on_first_response`.
+    """
+    def __init__(self, app: ASGIApp, on_first_response: Optional[Callable[[], None]] = None) -> None:
+        self.app = app
+        self.on_first_response = on_first_response
+        self.done = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.done or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if not self.done:
+                self.done = True
+                elapsed = time.perf_counter() - mapmarks.STARTED_AT
+                metrics.cold_start.set(value=elapsed)
+                logger.info(f"Cold start: first response sent {elapsed * 1000:.1f}ms after the app was first imported")
+                if self.on_first_response is not None:
+                    self.on_first_response()
@@ -4,41 +4,424 @@ MapMarkr :: I/O Schema
   I/O -- user input and app output, in the form of HTTPResponses, defined by 
   classes in FastAPI, or--more probably--Starlette.
 """
+import asyncio
+import base64
+import binascii
 import contextlib
+import hashlib
+import json
 import logging
+import time
 
+from collections import OrderedDict
+from functools import lru_cache
 from fastapi.encoders import jsonable_encoder
 from uuid import UUID, uuid4
 
 from aiohttp import ClientError
-from typing import Any, Callable, ClassVar, Dict, List, Tuple, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, ClassVar, Dict, List, Optional, Set, Tuple, Type, TypeVar, Union
 from pydantic import Extra
 from pydantic import Field
 from pydantic import BaseModel
 from pydantic import ValidationError
+from pydantic import root_validator
 
-from mapmarks.api.config import AppSettings
-from mapmarks.api.exceptions import NotFoundHTTPException
+from mapmarks.api import changes, events, metrics
+from mapmarks.api.clients import get_client_manager
+from mapmarks.api.config import get_app_config
+from mapmarks.api.exceptions import BadRequestHTTPException, ConflictHTTPException, NotFoundHTTPException
+from mapmarks.api.storage.base import Increment, KeyNotFoundError, PreconditionFailedError, Trim, apply_updates
+from mapmarks.api.writebehind import WriteBehindBuffer
+from mapmarks.logger import get_logger
 
 
-# init
-from deta import Deta
-deta = Deta()
+# Configure and crank up the Logger
+logger = get_logger(__name__)
 
-settings = AppSettings()
+ModelT = TypeVar("ModelT", bound=BaseModel)
 
 
 @contextlib.asynccontextmanager
-async def async_db_client(db_name: str=settings.db_name):
-    db_client = deta.AsyncBase(db_name)
+async def async_db_client(db_name: Optional[str]=None):
+    """Borrows the long-lived, pooled client for `db_name` (see mapmarks.api.clients).
     
+    -  the client is NOT closed on exit; it's returned to the pool, and closed when the app shuts down.
+    -  a client (network / HTTP) error is logged, and re-raised -- the failed call is already counted, by outcome,
+       in `mapmarks_storage_calls_total` (see mapmarks.api.metrics).
+    """
+    db_name = db_name or get_app_config().db_name
+    async with get_client_manager().borrow(db_name) as db_client:
+        try:
+            yield db_client
+        except ClientError as e:
+            logger.error(f"Storage call to {db_name!r} failed: {e!r}")
+            raise
+
+
+# Cursor pagination helpers
+# -  a cursor wraps Deta's `last` key, along with a digest of the query it was issued for, 
+#    so that it can't be (silently) replayed against a different query.
+def _query_digest(query) -> str:
+    return hashlib.sha1(json.dumps(query, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def encode_cursor(last: str, query=None) -> str:
+    payload = json.dumps({"last": last, "query": _query_digest(query)})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str, query=None) -> str:
+    """Returns the Deta `last` key wrapped by `cursor`; raises BadRequestHTTPException if it's invalid."""
     try:
-        yield db_client
-    except ClientError as e:
-        print(e)
-    finally:
-        await db_client.close()
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        last, digest = payload["last"], payload["query"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise BadRequestHTTPException("Invalid pagination cursor.")
+    
+    if digest != _query_digest(query):
+        raise BadRequestHTTPException("Pagination cursor does not belong to this query.")
+    
+    return last
+
+
+async def fetch_records(db, query=None, limit: Optional[int]=None, last: Optional[str]=None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetches (at most) exactly `limit` raw records, starting after the `last` key.
+    
+    -  Deta may return a short page for a filtered query, even though more matches remain, 
+       so keep following its `last` key -- asking only for the number of items still 
+       missing -- until the page is full, or the data runs out.
+    -  returns (records, last), where `last` is None once there is nothing left to fetch.
+    """
+    limit = limit or get_app_config().db_fetch_limit
+    items: List[Dict[str, Any]] = []
+    
+    while len(items) < limit:
+        results = await db.fetch(query, limit=limit - len(items), last=last)
+        items += results.items
+        last = results.last
+        
+        if not last:
+            break
+    
+    return items, last
+
+
+# Read-through cache
+class CacheStats(BaseModel):
+    """Counters for the read-through cache -- handy when tuning `AppSettings.cache_*`"""
+    enabled: bool
+    size: int
+    max_entries: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int      # entries dropped to keep the cache within `max_entries`
+    expirations: int    # entries dropped because they outlived the `ttl`
+    invalidations: int  # entries dropped (or replaced) because of a write
+
+
+class RecordCache:
+    """
+    class RecordCache -- an in-process LRU cache with a TTL, in front of `DetaBase.find()` & `.fetch()`
+    
+    -  find() entries hold a single raw record, keyed by (db_name, key)
+    -  fetch() entries hold a page of raw records, keyed by (db_name, query, limit, last); since 
+       ANY write could change the result of a query, every write to `db_name` drops them all.
+    -  writes replace a key's record (write-through); a record READ from Deta only replaces the cached 
+       one if its `properties.version` isn't lower -- i.e. a read that raced a write can't put a stale 
+       copy back in the cache.
+    """
+    def __init__(self, max_entries: int, ttl: float, enabled: bool=True) -> None:
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._queries: Dict[str, set] = {}
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            enabled=self.enabled,
+            size=len(self._entries),
+            max_entries=self.max_entries,
+            ttl=self.ttl,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            invalidations=self.invalidations,
+        )
+        
+    def get_record(self, db_name: str, key: str) -> Optional[Dict[str, Any]]:
+        return self._get(("find", db_name, key))
+    
+    def set_record(self, db_name: str, record: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        
+        entry_key = ("find", db_name, record["key"])
+        cached = self._entries.get(entry_key)
+        if cached is not None and _record_version(cached[1]) > _record_version(record):
+            return
+        
+        self._set(entry_key, record)
+        
+    def get_query(self, db_name: str, query, limit: int, last: Optional[str]=None) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        return self._get(("fetch", db_name, _query_digest(query), limit, last))
+    
+    def set_query(self, db_name: str, query, limit: int, last: Optional[str], result: Tuple[List[Dict[str, Any]], Optional[str]]) -> None:
+        if not self.enabled:
+            return
+        
+        entry_key = ("fetch", db_name, _query_digest(query), limit, last)
+        self._queries.setdefault(db_name, set()).add(entry_key)
+        self._set(entry_key, result)
+        
+    def invalidate(self, db_name: str, *keys: str, records: List[Dict[str, Any]]=()) -> None:
+        """Called on every write to `db_name`: drops the query entries, and the given keys' entries 
+           -- or, for written `records`, replaces them (write-through)."""
+        for entry_key in self._queries.pop(db_name, ()):
+            if self._entries.pop(entry_key, None) is not None:
+                self.invalidations += 1
+        
+        for key in keys:
+            if self._entries.pop(("find", db_name, key), None) is not None:
+                self.invalidations += 1
         
+        for record in records:
+            # a write is authoritative, whatever the version of the copy it replaces
+            if self._entries.pop(("find", db_name, record["key"]), None) is not None:
+                self.invalidations += 1
+            if self.enabled:
+                self._set(("find", db_name, record["key"]), record)
+            
+    def clear(self) -> None:
+        self._entries.clear()
+        self._queries.clear()
+        
+    def _get(self, entry_key: Tuple):
+        if not self.enabled:
+            return None
+        
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[entry_key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(entry_key)
+        self.hits += 1
+        return value
+    
+    def _set(self, entry_key: Tuple, value: Any) -> None:
+        self._entries[entry_key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(entry_key)
+        
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            if evicted_key[0] == "fetch":
+                self._queries.get(evicted_key[1], set()).discard(evicted_key)
+            self.evictions += 1
+
+
+# Read coalescing
+class CoalescingStats(BaseModel):
+    """Counters for read coalescing -- by op ("find", "fetch")"""
+    enabled: bool
+    in_flight: int
+    calls: Dict[str, int]           # reads asked for
+    deduplicated: Dict[str, int]    # ... of which were answered by another caller's storage call
+
+
+class SingleFlight:
+    """
+    class SingleFlight -- concurrent identical reads share ONE in-flight storage call
+    
+    -  the first caller for a key starts the call (as a task of its own); every caller for that key 
+       until it finishes awaits the same task, and gets the same result -- or exception.
+    -  a caller that's cancelled (e.g. its client went away) doesn't cancel the shared call.
+    -  a write drops the in-flight entries it could affect (see `forget()`), so that a read asked for 
+       AFTER a write never shares a call that started before it.
+    """
+    def __init__(self, enabled: bool=True) -> None:
+        self.enabled = enabled
+        self._in_flight: Dict[Tuple, "asyncio.Task"] = {}
+        self.calls: Dict[str, int] = {}
+        self.deduplicated: Dict[str, int] = {}
+        
+    def stats(self) -> CoalescingStats:
+        return CoalescingStats(enabled=self.enabled, in_flight=len(self._in_flight), calls=dict(self.calls), deduplicated=dict(self.deduplicated))
+    
+    async def do(self, op: str, db_name: str, key: Tuple, call: Callable[[], Awaitable[Any]]) -> Any:
+        """The result of `call()` -- or of the identical call already in flight, for (op, db_name, *key)"""
+        self.calls[op] = self.calls.get(op, 0) + 1
+        if not self.enabled:
+            return await call()
+        
+        entry_key = (op, db_name, *key)
+        task = self._in_flight.get(entry_key)
+        if task is not None:
+            self.deduplicated[op] = self.deduplicated.get(op, 0) + 1
+            coalesced_reads.inc(op, db_name)
+        else:
+            task = self._in_flight[entry_key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda done: self._in_flight.pop(entry_key, None) if self._in_flight.get(entry_key) is done else None)
+        
+        return await asyncio.shield(task)
+    
+    def forget(self, db_name: str, *keys: str) -> None:
+        """Called on every write to `db_name`: drops its in-flight fetches, and the finds of `keys` (the calls themselves carry on)"""
+        for entry_key in list(self._in_flight):
+            op, entry_db_name = entry_key[:2]
+            if entry_db_name == db_name and (op == "fetch" or entry_key[2] in keys):
+                del self._in_flight[entry_key]
+
+
+def construct_trusted(model: Type[ModelT], values: Dict[str, Any]) -> ModelT:
+    """Like `model.construct(**values)` -- but quicker, as `values` must hold EVERY field, in the model's field order."""
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__fields_set__", set(values))
+    instance._init_private_attributes()
+    return instance
+
+
+def _record_version(record: Dict[str, Any]) -> int:
+    return (record.get("properties") or {}).get("version") or 0
+
+
+@lru_cache
+def get_record_cache() -> RecordCache:
+    """The app's one read-through cache -- built on first use"""
+    settings = get_app_config()
+    return RecordCache(
+        max_entries=settings.cache_max_entries, 
+        ttl=settings.cache_ttl, 
+        enabled=settings.cache_enabled,
+    )
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    return SingleFlight(enabled=get_app_config().coalesce_reads)
+
+
+coalesced_reads = metrics.registry.register(metrics.Counter(
+    "mapmarks_coalesced_reads_total", "Reads answered by another caller's identical, in-flight storage call.", ("op", "db_name"),
+))
+
+
+async def _after_write(db_name: str, records: List[Dict[str, Any]]=(), deleted: List[str]=()) -> None:
+    """Keeps the cache, every write listener (see mapmarks.api.events) & the change log (see mapmarks.api.changes) in step with a successful write."""
+    get_record_cache().invalidate(db_name, *deleted, records=list(records))
+    get_single_flight().forget(db_name, *deleted, *(record["key"] for record in records))
+    events.publish(db_name, records=records, deleted=deleted)
+    if get_app_config().changes_enabled:
+        await changes.append(db_name, records=records, deleted=deleted)
+
+
+# Bulk-operation results
+class BulkItemResult(BaseModel):
+    """The outcome of a bulk operation (e.g. `DetaBase.save_many()`) for a single item"""
+    key: str
+    ok: bool
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    """Per-item outcomes of a bulk operation -- a failed item never aborts the rest of the batch"""
+    succeeded: int = 0
+    failed: int = 0
+    items: List[BulkItemResult] = []
+    
+    @classmethod
+    def from_items(cls, items: List[BulkItemResult]) -> "BulkResult":
+        succeeded = sum(1 for item in items if item.ok)
+        return cls(succeeded=succeeded, failed=len(items) - succeeded, items=items)
+
+
+class BulkDeleteRequest(BaseModel):
+    """Selects the items to delete in bulk: EITHER a list of keys, OR a (Deta Base) query"""
+    keys: Optional[List[str]] = None
+    query: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None
+    
+    @root_validator(allow_reuse=True)
+    def check_keys_or_query(cls, values):
+        if (values.get("keys") is None) == (values.get("query") is None):
+            raise ValueError("Provide either `keys` or `query` -- not both, and not neither.")
+        # an empty query matches EVERY item -- too easy to send by mistake, for a delete
+        if values.get("keys") == [] or values.get("query") in ({}, []):
+            raise ValueError("`keys` and `query` can't be empty.")
+        return values
+        
+
+async def put_records(db_name: str, records: List[Dict[str, Any]]) -> BulkResult:
+    """Writes already-built records to `db_name` in concurrent `put_many()` batches (see `DetaBase.put_records()`) --
+       the result's items are in the order of `records`"""
+    settings = get_app_config()
+    batch_size = settings.db_put_many_limit
+    batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+    semaphore = asyncio.Semaphore(settings.db_bulk_concurrency)
+    
+    async def put_batch(db, batch: List[Dict[str, Any]]) -> List[BulkItemResult]:
+        async with semaphore:
+            try:
+                response = await db.put_many(batch)
+            except Exception as e:
+                return [BulkItemResult(key=record["key"], ok=False, error=str(e)) for record in batch]
+        
+        # Deta reports which items were processed, and which failed
+        failed = {record["key"] for record in response.get("failed", {}).get("items", [])}
+        return [
+            BulkItemResult(key=record["key"], ok=False, error="Rejected by Deta Base") 
+            if record["key"] in failed else BulkItemResult(key=record["key"], ok=True)
+            for record in batch
+        ]
+    
+    async with async_db_client(db_name) as db:
+        results = await asyncio.gather(*(put_batch(db, batch) for batch in batches))
+    
+    result = BulkResult.from_items([item for batch in results for item in batch])
+    saved = {item.key for item in result.items if item.ok}
+    await _after_write(db_name, records=[record for record in records if record["key"] in saved])
+    return result
+
+
+async def _flush_write_behind(db_name: str, records: List[Dict[str, Any]]) -> Set[str]:
+    result = await put_records(db_name, records)
+    return {item.key for item in result.items if item.ok}
+
+
+@lru_cache
+def get_write_behind() -> WriteBehindBuffer:
+    """The app's one write-behind buffer (see mapmarks.api.writebehind) -- built on first use"""
+    settings = get_app_config()
+    return WriteBehindBuffer(
+        _flush_write_behind,
+        max_pending=settings.write_behind_max_pending,
+        batch_size=settings.write_behind_batch_size,
+        flush_interval=settings.write_behind_flush_interval,
+        max_wait=settings.write_behind_max_wait,
+        spill_path=settings.write_behind_spill_path,
+        shutdown_timeout=settings.write_behind_shutdown_timeout,
+        enabled=settings.write_behind_enabled,
+    )
+
+
+class _Setting:
+    """A class attribute which reads its value from the app settings -- on access, not at import time"""
+    def __init__(self, name: str) -> None:
+        self.name = name
+    
+    def __get__(self, instance, owner) -> Any:
+        return getattr(get_app_config(), self.name)
+
 
 # Root subclass 
 # -  simplest method to apply universal config options to all models
@@ -56,7 +439,7 @@ class DetaBase(BaseModel):
     """
     # key: str = None
     key: Union[UUID, str] = Field(default_factory=uuid4)
-    db_name: ClassVar = Field(settings.db_name)
+    db_name: ClassVar[str] = _Setting("db_name")
     
     class Config:
         """class mapmarks.api.models.base.DetaBase.Config
@@ -65,20 +448,61 @@ class DetaBase(BaseModel):
         extra: str = Extra.forbid
         # extra: str = Extra.allow
 
+    def to_record(self) -> Dict[str, Any]:
+        """Returns the (JSON-compatible) dict which is saved to Deta Base.
+        
+        -  subclasses may add storage-only fields -- e.g. Feature adds a `geohash`, for spatial queries.
+        """
+        return jsonable_encoder(self.dict())
+    
+    @classmethod
+    def from_record(cls, record: Dict[str, Any], trusted: Optional[bool]=None) -> "DetaBase":
+        """Builds an instance from a record read from Deta Base, dropping any storage-only fields.
+        
+        -  a `trusted` record (by default: any record, if `settings.trusted_reads`) was validated when we wrote it, 
+           so it's rebuilt WITHOUT validation -- see `construct_record()`. If that fails, it's validated after all.
+        """
+        fields = {name: value for name, value in record.items() if name in cls.__fields__}
+        
+        if get_app_config().trusted_reads if trusted is None else trusted:
+            try:
+                return cls.construct_record(fields)
+            except (KeyError, TypeError, ValueError):
+                pass
+        
+        return cls(**fields)
+    
+    @classmethod
+    def construct_record(cls, fields: Dict[str, Any]) -> "DetaBase":
+        """Builds an instance from a record's (already valid) fields, skipping validation.
+        
+        @NOTE: `construct()` doesn't build nested models -- subclasses with any must override this, and build them too.
+        """
+        return cls.construct(**fields)
     
-    async def save(self):
+    async def save(self) -> Optional["DetaBase"]:
+        """Saves me (as a new version) -- and returns the saved instance, rebuilt from its record WITHOUT the storage-only fields"""
         # increment version
         self.properties.version += 1 
         
+        # with write-behind, the write is acknowledged once it's queued (see mapmarks.api.writebehind)
+        if get_write_behind().running:
+            new_feature = self.to_record()
+            await get_write_behind().put(self.__class__.db_name, new_feature)
+            return self.__class__.from_record(new_feature)
+        
         # save to Deta Base
         async with async_db_client(self.__class__.db_name) as db:
-            new_feature = jsonable_encoder(self.dict())
+            new_feature = self.to_record()
             # Send to Deta to be saved:
             # -  DO NOT FORGET `await` statement! 
             # -  Upon success: Deta will return the saved item, if `db.put()` op was successful (else, no return value -- void)
             result = await db.put(new_feature) # note: using db.put() instead of db.insert(), b/c per Deta, db.put() is the faster method
 
-        return result
+        if not result:
+            return None
+        await _after_write(self.__class__.db_name, records=[result])
+        return self.__class__.from_record(result)
 
             
     async def update(self, *args, **kwargs):
@@ -91,14 +515,66 @@ class DetaBase(BaseModel):
         -  (4) send my data as JSON to Deta Base(), to save it.
         -  (5) return a new instance of myself, instantiated with data returned from Deta (hah)
         """
+        await get_write_behind().settle(self.__class__.db_name, str(self.key))
         async with async_db_client(self.__class__.db_name) as db:
-            new_data = {**self.dict(), **kwargs, "version": self.properties.version + 1}
-            self.__dict__.update(**new_data)
+            # re-validate the merged data, so nested models (e.g. `properties`) stay models, not dicts
+            updated = self.__class__(**{**self.dict(), **kwargs})
+            updated.properties.version = self.properties.version + 1
+            self.__dict__.update(updated.__dict__)
             
-            saved_data = await db.put(self.json()) # Deta.Base.put() should return new record
+            saved_data = await db.put(self.to_record()) # Deta.Base.put() should return new record
+        
+        # @NOTE: after the client's been returned to the pool -- the change log may need a client of its own
+        await _after_write(self.__class__.db_name, records=[saved_data])
+        
+        # return new instance, instantiated with the saved data returned from Deta.Base():
+        return self.__class__.from_record(saved_data)
+    
+    @classmethod
+    async def patch(cls, key: Union[UUID, str], changes: Dict[str, Any], version: int) -> "DetaBase":
+        """DetaBase.patch() class method -- changes only the given fields, in place, without a read beforehand
+        
+        -  `changes` maps (dotted) field paths to their new values -- None deletes the field. They're sent as
+           server-side update operations (set / trim), along with an increment of `properties.version`.
+        -  the update is only applied if the record is still at `version` -- else ConflictHTTPException, 
+           as someone else has written it since. NotFoundHTTPException if there's no such record.
+        -  the patched record is rebuilt from the record as it was (from the cache, or as a local backend 
+           read it for the version check) -- and only read back from storage, AFTER the update, if neither has it.
+        
+        @NOTE: on Deta Base, the version check is a claim written along with the update (see mapmarks.api.storage.deta):
+               it rejects every PATCH but one from the same version. A PATCH racing a full (PUT) save isn't caught there
+               -- only here, if the cached copy has seen that save.
+        """
+        key = str(key)
+        await get_write_behind().settle(cls.db_name, key)
+        # versions only ever go up: if the cached copy is already past `version`, so is the record
+        cached = get_record_cache().get_record(cls.db_name, key)
+        if cached is not None and _record_version(cached) > version:
+            raise ConflictHTTPException(f"Version {version} of {key!r} is out of date; it's now at version {_record_version(cached)}.")
+        
+        async with async_db_client(cls.db_name) as db:
+            updates = {path: db.util.trim() if value is None else value for path, value in changes.items()}
+            updates["properties.version"] = db.util.increment(1)
+            try:
+                previous = await db.update(updates, key, expect={"properties.version": version})
+            except KeyNotFoundError:
+                raise NotFoundHTTPException(f"No Feature() found with key: {key}")
+            except PreconditionFailedError as e:
+                # (a backend which didn't read the record -- e.g. Deta Base -- can't say which version it's at)
+                now_at = f"; it's now at version {e.found}" if e.found is not None else ""
+                raise ConflictHTTPException(f"Version {version} of {key!r} is out of date{now_at}.")
             
-            # return new instance, instantiated with the saved data returned from Deta.Base():
-            return self.__class__(**saved_data)
+            if previous is None and cached is not None and _record_version(cached) == version:
+                previous = cached
+            if previous is not None:
+                # the same operations, as the local backends apply them -- whatever the backend's own `util` builds
+                local_updates = {path: Trim() if value is None else value for path, value in changes.items()}
+                record = apply_updates(previous, {**local_updates, "properties.version": Increment(1)})
+            else:
+                record = await db.get(key)
+        
+        await _after_write(cls.db_name, records=[record])
+        return cls.from_record(record)
 
             
             
@@ -108,21 +584,69 @@ class DetaBase(BaseModel):
         -  returns simple text, "OK",  because deta.Deta.Base and deta.Deta.AsyncBase 
            always return None from their respective delete() methods.
         """
+        await get_write_behind().settle(self.__class__.db_name, str(self.key))
         async with async_db_client(self.__class__.db_name) as db:
             await db.delete(str(self.key))
         
+        await _after_write(self.__class__.db_name, deleted=[str(self.key)])
         return "OK"
             
     @classmethod
     async def find(cls, key: Union[UUID, str], exception=NotFoundHTTPException) -> Union["DetaBase", None]:
-        async with async_db_client(cls.db_name) as db:
-            instance = await db.get(str(key))
-            if instance is None and exception:
-                raise exception(f"No Feature() found with key: {key}")
-            elif instance:
-                return cls(**instance)
+        instance = cls._local_record(str(key))
+        if instance is not None:
+            return cls.from_record(instance)
+        
+        instance = await cls._get_record(str(key))
+        if instance is None and exception:
+            raise exception(f"No Feature() found with key: {key}")
+        elif instance:
+            return cls.from_record(instance)
+        else:
+            return None
+    
+    @classmethod
+    def _local_record(cls, key: str) -> Optional[Dict[str, Any]]:
+        """`key`'s record, if it's held in-process -- so it needn't be read from storage (None if it isn't).
+        
+        -  a write still queued by the write-behind buffer is newer than anything cached or stored; after that, the cache.
+        -  subclasses may add sources of their own -- e.g. Feature adds the restored FeatureStore.
+        """
+        instance = get_write_behind().get(cls.db_name, key)
+        if instance is None:
+            instance = get_record_cache().get_record(cls.db_name, key)
+        return instance
+    
+    @classmethod
+    def _local_page(cls, query, limit: int, last: Optional[str]=None) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """A page of records (see `fetch_records()`) answered in-process, without storage -- or None. Subclasses may override this."""
+        return get_record_cache().get_query(cls.db_name, query, limit, last)
+    
+    @classmethod
+    async def _get_record(cls, key: str, db=None) -> Optional[Dict[str, Any]]:
+        """Reads one raw record (over `db`, if given -- else a pooled client), and caches it; concurrent reads of `key` share one call"""
+        async def get() -> Optional[Dict[str, Any]]:
+            if db is not None:
+                instance = await db.get(key)
             else:
-                return None
+                async with async_db_client(cls.db_name) as client:
+                    instance = await client.get(key)
+            if instance:
+                get_record_cache().set_record(cls.db_name, instance)
+            return instance
+        
+        return await get_single_flight().do("find", cls.db_name, (key,), get)
+    
+    @classmethod
+    async def _fetch_records(cls, query, limit: int, last: Optional[str]=None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Fetches (and caches) one page of raw records (see `fetch_records()`); concurrent identical fetches share one call"""
+        async def fetch() -> Tuple[List[Dict[str, Any]], Optional[str]]:
+            async with async_db_client(cls.db_name) as db:
+                result = await fetch_records(db, query, limit, last)
+            get_record_cache().set_query(cls.db_name, query, limit, last, result)
+            return result
+        
+        return await get_single_flight().do("fetch", cls.db_name, (_query_digest(query), limit, last), fetch)
             
     @classmethod
     async def fetch(cls, query=None, limit:int=50) -> List["DetaBase"]:
@@ -136,44 +660,170 @@ class DetaBase(BaseModel):
         Returns:
             list[Feature]: returns a list of all items in the data store
             
-        @NOTE:  limit param -- the default value is set to 50, only so I can verify that 
-                               my settings in config.py are being read properly and applied.
-                               As you'll see, however, this is superfluous and unnecessary, 
-                               because when the 'limit' param is actually used, the MINIMUM 
-                               of the user's 'limit' argument and the limit configured in 
-                               settings.db_fetch_limit will be the value ultimately used when 
-                               sending this request to DetaBase.
+        @NOTE:  limit param -- at most `limit` items are returned (never more). To walk through
+                               a larger result set, one page at a time, use `fetch_page()`.
+        """
+        if query is not None:
+            query = jsonable_encoder(query)
+        
+        cached = cls._local_page(query, limit)
+        if cached is not None:
+            return [cls.from_record(instance) for instance in cached[0]]
+        
+        all_items, last = await cls._fetch_records(query, limit)
+        return [cls.from_record(instance) for instance in all_items]
+        
+    @classmethod
+    async def fetch_page(cls, query=None, limit:Optional[int]=None, cursor:Optional[str]=None) -> Tuple[List["DetaBase"], Optional[str]]:
+        """Feature.fetch_page() class method -- cursor-based pagination
         
-        @TODO:  (1) add pagination capability
+        params:
+            query: an optional query to filter results
+            limit: the page size; exactly `limit` items are returned, unless the data runs out
+            cursor: (optional) the opaque token returned with the previous page
+            
+        Returns:
+            (list[Feature], cursor): the page, plus a token for the next page (None on the last page)
+            
+        @NOTE:  each page costs the same, however deep the client pages -- unlike offset pagination,
+                which has to fetch every item up to the requested offset.
         """
-        async with async_db_client(cls.db_name) as db:
-            if query is not None:
-                query = jsonable_encoder(query)
-                
-            results = await db.fetch(query, limit=min(limit, settings.db_fetch_limit))
-            all_items = results.items
+        if query is not None:
+            query = jsonable_encoder(query)
+        limit = limit or get_app_config().db_fetch_limit
             
-            while len(all_items) <= limit and results.last:
-                results = await db.fetch(query, last=results.last)
-                all_items += results.items
-                
-            return [cls(**instance) for instance in all_items]
+        last = decode_cursor(cursor, query) if cursor else None
         
+        cached = cls._local_page(query, limit, last)
+        if cached is not None:
+            items, next_last = cached
+        else:
+            items, next_last = await cls._fetch_records(query, limit, last)
+        
+        last = next_last
+        next_cursor = encode_cursor(last, query) if last else None
+        return [cls.from_record(instance) for instance in items], next_cursor
+    
     @classmethod
-    async def paginate(cls, query, limit:int, offset:int, order_by:Callable[["DetaBase"], str], do_reverse:bool=False) -> Tuple[int, List[Dict[str, Any]]]:
-        if query is None:
-            query = {}
-            
-        results = await cls.fetch(query, limit + offset)
-        count = len(results)
-        top = limit + offset
-        page = sorted(results, key=order_by, reverse=do_reverse)[offset:top]
+    async def find_many(cls, keys: List[Union[UUID, str]]) -> List["DetaBase"]:
+        """Feature.find_many() class method -- looks up many keys at once
+        
+        -  records held in-process are served from there (see `_local_record()`); the rest are read concurrently, over ONE 
+           shared client, with at most settings.db_read_concurrency reads in flight at once.
+        -  returns the instances found, in the order of `keys`; missing keys are skipped.
+        """
+        keys = [str(key) for key in keys]
+        found = {}
         
-        return (count, page)
+        for key in keys:
+            instance = cls._local_record(key)
+            if instance is not None:
+                found[key] = instance
+        
+        semaphore = asyncio.Semaphore(get_app_config().db_read_concurrency)
+        
+        async def get_one(db, key: str) -> None:
+            async with semaphore:
+                instance = await cls._get_record(key, db)
+            if instance:
+                found[key] = instance
+        
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            async with async_db_client(cls.db_name) as db:
+                await asyncio.gather(*(get_one(db, key) for key in missing))
+        
+        return [cls.from_record(found[key]) for key in keys if key in found]
     
-    @staticmethod
-    async def delete_many(instances: List["DetaBase"]) -> str:
+    @classmethod
+    async def iter_records(cls, query=None, page_size: int=1000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Walks EVERY record matching `query`, following Deta's `last` key, one page of raw records at a time.
+        
+        -  only one page is held in memory at once; used to (re)build in-process indexes.
+        """
+        if query is not None:
+            query = jsonable_encoder(query)
+        
+        last = None
+        while True:
+            async with async_db_client(cls.db_name) as db:
+                items, last = await fetch_records(db, query, page_size, last)
+            
+            if items:
+                yield items
+            if not last:
+                break
+    
+    @classmethod
+    async def changes_since(cls, since: str, limit: Optional[int]=None) -> Tuple[List["DetaBase"], List[changes.Tombstone], str, bool]:
+        """The instances saved -- and tombstones of those deleted -- since `since`, with the next sync token 
+           and whether there are `more` changes (see mapmarks.api.changes.read_changes)"""
+        records, tombstones, token, more = await changes.read_changes(cls.db_name, since, limit or get_app_config().changes_max_limit)
+        return [cls.from_record(record) for record in records], tombstones, token, more
+    
+    @classmethod
+    async def stream(cls, query=None, page_size: Optional[int]=None) -> AsyncIterator[List["DetaBase"]]:
+        """Like `iter_records()` -- but yields each page as model instances (see `from_record()`)"""
+        async for page in cls.iter_records(query, page_size or get_app_config().export_page_size):
+            yield [cls.from_record(record) for record in page]
+        
+    @classmethod
+    async def save_many(cls, instances: List["DetaBase"]) -> BulkResult:
+        """DetaBase.save_many() class method -- bulk `save()`
+        
+        -  instances are sent in `put_many()` batches of (at most) settings.db_put_many_limit items, 
+           with up to settings.db_bulk_concurrency batches in flight at once, over ONE shared client.
+        -  a batch that fails outright marks each of its items as failed; the other batches carry on.
+        """
+        records = []
         for instance in instances:
-            await instance.delete()
+            instance.properties.version += 1
+            records.append(instance.to_record())
+        
+        return await cls.put_records(records)
+    
+    @classmethod
+    async def put_records(cls, records: List[Dict[str, Any]]) -> BulkResult:
+        """Writes already-built records (see `to_record()`) in concurrent `put_many()` batches -- the second half of `save_many()`"""
+        return await put_records(cls.db_name, records)
+    
+    @classmethod
+    async def delete_many(cls, instances: List[Union["DetaBase", UUID, str]]) -> BulkResult:
+        """DetaBase.delete_many() class method -- bulk `delete()`
+        
+        -  accepts instances, or their raw keys (or a mix of both)
+        -  Deta Base has no batch delete, so the deletes fan out over ONE shared client, 
+           with at most settings.db_delete_concurrency of them in flight at once.
+        """
+        keys = [str(item.key) if isinstance(item, DetaBase) else str(item) for item in instances]
+        await get_write_behind().settle(cls.db_name, *keys)
+        semaphore = asyncio.Semaphore(get_app_config().db_delete_concurrency)
+        
+        async def delete_one(db, key: str) -> BulkItemResult:
+            async with semaphore:
+                try:
+                    await db.delete(key)
+                except Exception as e:
+                    return BulkItemResult(key=key, ok=False, error=str(e))
+            return BulkItemResult(key=key, ok=True)
+        
+        async with async_db_client(cls.db_name) as db:
+            results = await asyncio.gather(*(delete_one(db, key) for key in keys))
             
-        return "OK"
\ No newline at end of file
+        await _after_write(cls.db_name, deleted=[item.key for item in results if item.ok])
+        return BulkResult.from_items(list(results))
+    
+    @classmethod
+    async def delete_matching(cls, query) -> BulkResult:
+        """Deletes every item matching `query` -- see `delete_many()`."""
+        query = jsonable_encoder(query)
+        keys, last = [], None
+        
+        async with async_db_client(cls.db_name) as db:
+            while True:
+                items, last = await fetch_records(db, query, get_app_config().db_delete_fetch_limit, last)
+                keys += [item["key"] for item in items]
+                if not last:
+                    break
+        
+        return await cls.delete_many(keys)
\ No newline at end of file
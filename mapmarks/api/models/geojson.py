@@ -8,23 +8,32 @@ GeoJSON models
 from datetime import datetime
 
 from pydantic import BaseModel
+from pydantic import Extra
 from pydantic import Field
 from pydantic import validator
+from typing import Any
+from typing import Dict
 from typing import List
 from typing import Optional
 from typing import NamedTuple
+from typing import Sequence
+from typing import Tuple
 from typing import Union
+from typing import get_args
 from uuid import UUID, uuid4
 
-from mapmarks.api.config import AppSettings
-from mapmarks.api.models.base import DetaBase, async_db_client
+from mapmarks.api.changes import Tombstone
+from mapmarks.api.config import get_app_config
+from mapmarks.api.geo import BBox, geohash_cover, geohash_encode, haversine_m
+from mapmarks.api.exceptions import ServiceUnavailableHTTPException
+from mapmarks.api.indexes import (
+    get_cluster_index, get_columnar_store, get_facet_index, get_feature_indexes, get_feature_store, get_search_index, get_spatial_index,
+)
+from mapmarks.api.models.base import BulkResult, DetaBase, construct_trusted
 from mapmarks.api.types import GeojsonType
 from mapmarks.api.types import GeolocationCategory
 from mapmarks.api.types import Lon, Lat
 
-# init 
-settings = AppSettings()
-
 class Position(NamedTuple):
     lon: Lon
     lat: Lat
@@ -108,6 +117,311 @@ class Feature(DetaBase):
             }
         }
     
+    @classmethod
+    def construct_record(cls, fields: Dict[str, Any]) -> "Feature":
+        """Builds a Feature -- and its Point & Props -- from a trusted record, skipping validation (see `DetaBase.from_record()`)"""
+        geometry, properties = fields["geometry"], fields["properties"]
+        lon, lat = geometry["coordinates"]
+        
+        return construct_trusted(cls, {
+            "key": fields["key"],
+            "type": fields.get("type", GeojsonType.FEATURE.value),
+            "geometry": construct_trusted(Point, {"type": GeojsonType(geometry["type"]), "coordinates": Position(float(lon), float(lat))}),
+            "properties": construct_trusted(Props, {
+                "title": properties["title"],
+                "note": properties.get("note"),
+                "category": properties["category"],
+                "created": _parse_datetime(properties["created"]),
+                "updated": _parse_datetime(properties["updated"]),
+                "version": properties.get("version", 0),
+            }),
+        })
+    
+    def to_record(self) -> Dict[str, Any]:
+        """Adds the Feature's `geohash` to the saved record, so Deta Base can be queried by area (see `within_bbox()`)"""
+        record = super().to_record()
+        record["geohash"] = geohash_encode(*self.geometry.coordinates, precision=get_app_config().geohash_precision)
+        return record
+    
+    @classmethod
+    async def patch(cls, key: Union[UUID, str], changes: Dict[str, Any], version: int) -> "Feature":
+        """Also stamps `properties.updated` -- and, if the Feature moves, re-computes its `geohash` (see `DetaBase.patch()`)"""
+        changes = {**changes, "properties.updated": datetime.now().isoformat()}
+        if "geometry.coordinates" in changes:
+            changes["geohash"] = geohash_encode(*changes["geometry.coordinates"], precision=get_app_config().geohash_precision)
+        return await super().patch(key, changes, version)
+    
+    @classmethod
+    def _local_record(cls, key: str) -> Optional[Dict[str, Any]]:
+        """... and, once it's restored, from the FeatureStore (see mapmarks.api.indexes.snapshot)
+        
+        @NOTE: like the indexes, the store only sees writes made through THIS process (plus those caught up on at startup) -- 
+               a key it's missing is still looked for in Deta Base.
+        """
+        instance = super()._local_record(key)
+        feature_store = get_feature_store()
+        if instance is None and get_feature_indexes().is_ready(feature_store):
+            instance = feature_store.get(key)
+        return instance
+    
+    @classmethod
+    def _local_page(cls, query, limit: int, last: Optional[str]=None) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """... and, once it's restored, unfiltered pages from the FeatureStore -- in key order, like Deta Base's"""
+        cached = super()._local_page(query, limit, last)
+        feature_store = get_feature_store()
+        if cached is None and query is None and get_feature_indexes().is_ready(feature_store):
+            cached = feature_store.page(last, limit)
+        return cached
+    
+    @classmethod
+    def _spatial_index_ready(cls) -> bool:
+        return get_feature_indexes().is_ready(get_spatial_index())
+    
+    @classmethod
+    async def within_bbox(cls, bbox: BBox, limit: int) -> List["Feature"]:
+        """Feature.within_bbox() class method -- (at most `limit`) Features inside `bbox`
+        
+        -  served from the in-memory spatial index; until that's built (e.g. just after a cold start), 
+           Deta Base is queried for the geohash prefixes covering `bbox`, instead.
+        """
+        if cls._spatial_index_ready():
+            return await cls.find_many(get_spatial_index().within_bbox(bbox)[:limit])
+        
+        found = []
+        async for page in cls.iter_records(cls._geohash_query(bbox)):
+            found += [record for record in page if bbox.contains(*record["geometry"]["coordinates"])]
+            if len(found) >= limit:
+                break
+        
+        return [cls.from_record(record) for record in found[:limit]]
+    
+    @classmethod
+    async def near(cls, lon: float, lat: float, radius_m: float, limit: int) -> List["Feature"]:
+        """Feature.near() class method -- (at most `limit`) Features within `radius_m` of (lon, lat), nearest first"""
+        if cls._spatial_index_ready():
+            return await cls.find_many([key for key, _ in get_spatial_index().near(lon, lat, radius_m)[:limit]])
+        
+        found = []
+        async for page in cls.iter_records(cls._geohash_query(BBox.around(lon, lat, radius_m))):
+            for record in page:
+                distance = haversine_m(lon, lat, *record["geometry"]["coordinates"])
+                if distance <= radius_m:
+                    found.append((distance, record))
+        
+        found.sort(key=lambda match: match[0])
+        return [cls.from_record(record) for _, record in found[:limit]]
+    
+    @classmethod
+    async def nearest(cls, points: Sequence[Position], k: int, category: Optional[GeolocationCategory]=None) -> List[List["NearbyFeature"]]:
+        """Feature.nearest() class method -- the `k` nearest Features to EACH of `points`, nearest first
+        
+        -  answered by the columnar coordinate store (see mapmarks.api.indexes.columnar), in one 
+           vectorized pass; only the matching Features are then loaded.
+        """
+        if not get_feature_indexes().is_ready(get_columnar_store()):
+            raise ServiceUnavailableHTTPException("The nearest-neighbour index is still being built. Please retry shortly.")
+        
+        neighbours = get_columnar_store().nearest_many(points, k, category)
+        found = {
+            str(feature.key): feature 
+            for feature in await cls.find_many(list({key for matches in neighbours for key, _ in matches}))
+        }
+        
+        return [
+            [NearbyFeature(distance_m=distance, feature=found[key]) for key, distance in matches if key in found]
+            for matches in neighbours
+        ]
+    
+    @classmethod
+    async def search(cls, query: str, limit: int, bbox: Optional[BBox]=None) -> List["SearchResult"]:
+        """Feature.search() class method -- the `limit` best matches for `query` in their titles & notes, best first
+        
+        -  answered by the in-memory search index (see mapmarks.api.indexes.search); only the matching Features are loaded.
+        -  a `bbox` is intersected with the text matches as the set of keys inside it, from the spatial index (if it's ready).
+        """
+        indexes = get_feature_indexes()
+        if not indexes.is_ready(get_search_index()):
+            raise ServiceUnavailableHTTPException("The search index is still being built. Please retry shortly.")
+        
+        within = None
+        if bbox is not None and indexes.is_ready(get_spatial_index()):
+            within = set(get_spatial_index().within_bbox(bbox))
+        matches = get_search_index().search(query, limit, bbox, within)
+        found = {str(feature.key): feature for feature in await cls.find_many([key for key, _ in matches])}
+        return [SearchResult(score=score, feature=found[key]) for key, score in matches if key in found]
+    
+    @staticmethod
+    def filter_query(
+        categories: Optional[Sequence[GeolocationCategory]]=None, 
+        title_prefix: Optional[str]=None, 
+        note_contains: Optional[str]=None,
+    ) -> Union[Dict[str, str], List[Dict[str, str]], None]:
+        """A Deta Base query for the Features matching EVERY filter given -- or None, if there are none.
+        
+        -  it's evaluated by the storage backend (by Deta Base itself; by an indexed column, for SQLite's 
+           `category`), so a filtered listing only reads the matching records.
+        """
+        condition = {}
+        if title_prefix:
+            condition["properties.title?pfx"] = title_prefix
+        if note_contains:
+            condition["properties.note?contains"] = note_contains
+        
+        if categories:
+            # a list of conditions is an OR -- so each category repeats the other filters
+            return [{**condition, "properties.category": category} for category in dict.fromkeys(categories)]
+        return condition or None
+    
+    @staticmethod
+    def _geohash_query(bbox: BBox) -> List[Dict[str, str]]:
+        return [{"geohash?pfx": prefix} for prefix in geohash_cover(bbox, max_precision=get_app_config().geohash_precision)]
+    
+
+
+def _parse_datetime(value: Union[datetime, str]) -> datetime:
+    """Parses the ISO 8601 datetimes saved by `to_record()`; raises ValueError for anything else"""
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+class PropsPatch(BaseModel):
+    """The `properties` a FeaturePatch can change; only those sent are changed -- and a `note` sent as null is deleted"""
+    title: Optional[str]
+    note: Optional[str]
+    category: Optional[GeolocationCategory]
+    
+    class Config:
+        anystr_strip_whitespace: bool = True
+        extra: str = Extra.forbid
+        use_enum_values: bool = True
+    
+    @validator("title", "category", pre=True, allow_reuse=True)
+    def check_required(cls, v, field):
+        if v is None:
+            raise ValueError(f"`{field.name}` can be changed, but not deleted")
+        return v
+
+
+class FeaturePatch(BaseModel):
+    """A partial update of a Feature (see `Feature.patch()`): the fields to change, and the `version` they're based on"""
+    version: int                # the Feature's version, as last read -- the patch is rejected if it's been written since
+    geometry: Optional[Point]
+    properties: Optional[PropsPatch]
+    
+    class Config:
+        extra: str = Extra.forbid
+    
+    @validator("geometry", pre=True, allow_reuse=True)
+    def check_geometry(cls, v):
+        if v is None:
+            raise ValueError("`geometry` can be changed, but not deleted")
+        return v
+    
+    def to_changes(self) -> Dict[str, Any]:
+        """The changed fields, by (dotted) path -- None for a field to delete"""
+        changes: Dict[str, Any] = {}
+        if self.geometry is not None:
+            changes["geometry.coordinates"] = list(self.geometry.coordinates)
+        if self.properties is not None:
+            for name in self.properties.__fields_set__:
+                changes[f"properties.{name}"] = getattr(self.properties, name)
+        return changes
+
+
+class FeatureChanges(BaseModel):
+    """The Features changed since a sync token (see `Feature.changes_since()`)"""
+    changed: List[Feature]      # created or updated -- in their latest state
+    deleted: List[Tombstone]
+    next: str                   # pass this as `since`, to get the changes after these
+    more: bool                  # True if more changes are waiting -- ask again straight away
+
+
+class NearbyFeature(BaseModel):
+    """A Feature, and its (great-circle) distance from a query point"""
+    distance_m: float
+    feature: Feature
+    
+
+class SearchResult(BaseModel):
+    """A Feature matching a search, and its relevance score -- higher is better"""
+    score: float
+    feature: Feature
+
+
+class NearestQuery(BaseModel):
+    """A batched nearest-neighbour query -- e.g. the stops along a planned route"""
+    points: List[Position]
+    k: int = Field(5, gt=0)
+    category: Optional[GeolocationCategory] = None
+    
+    @validator("points", allow_reuse=True)
+    def check_points(cls, v):
+        max_points = get_app_config().nearest_max_points
+        if len(v) > max_points:
+            raise ValueError(f"At most {max_points} points can be queried at once.")
+        return v
+    
+    @validator("k", allow_reuse=True)
+    def check_k(cls, v):
+        max_k = get_app_config().nearest_max_k
+        if v > max_k:
+            raise ValueError(f"ensure this value is less than or equal to {max_k}")
+        return v
+    
+
+class FeatureFacets(BaseModel):
+    """The number of Features -- in all, and by category (see mapmarks.api.indexes.facets)"""
+    total: int
+    category: Dict[str, int]
+    
+    @classmethod
+    def current(cls) -> "FeatureFacets":
+        """The counts, as kept up to date by every write -- read in O(1), not counted"""
+        if not get_feature_indexes().is_ready(get_facet_index()):
+            raise ServiceUnavailableHTTPException("The facet counts are still being built. Please retry shortly.")
+        
+        facet_index = get_facet_index()
+        counts = facet_index.counts("category")
+        return cls(total=len(facet_index), category={category: counts.get(category, 0) for category in get_args(GeolocationCategory)})
+
+
+class ClusterProps(BaseModel):
+    """The `properties` of a cluster point: how many Features it stands for, by GeolocationCategory"""
+    count: int
+    categories: Dict[str, int]
+
+
+class Cluster(BaseModel):
+    """A GeoJSON Feature standing for a cluster of nearby Features, placed at their centroid"""
+    type: GeojsonType = Field(GeojsonType.FEATURE, const=True)
+    geometry: Point
+    properties: ClusterProps
+    
+    class Config:
+        use_enum_values: bool = True # Use Enum.ITEM.value, rather than the raw Enum
+
+
+class ClusterCollection(BaseModel):
+    """A GeoJSON FeatureCollection of cluster points (see mapmarks.api.indexes.clusters)"""
+    type: GeojsonType = Field(GeojsonType.FEATURE_COLLECTION, const=True)
+    features: List[Cluster]
+    
+    class Config:
+        title: str = "Cluster Collection"
+        use_enum_values: bool = True # Use Enum.ITEM.value, rather than the raw Enum
+        
+    @classmethod
+    def within_bbox(cls, bbox: BBox, zoom: int) -> "ClusterCollection":
+        """The clusters of Features inside `bbox`, as they should be shown at map zoom level `zoom`"""
+        if not get_feature_indexes().is_ready(get_cluster_index()):
+            raise ServiceUnavailableHTTPException("The cluster index is still being built. Please retry shortly.")
+        
+        return cls(features=[
+            Cluster(
+                geometry=Point(coordinates=(cluster.lon, cluster.lat)),
+                properties=ClusterProps(count=cluster.count, categories=dict(cluster.categories)),
+            )
+            for cluster in get_cluster_index().clusters(bbox, zoom)
+        ])
 
 
 class FeatureCollection(BaseModel):
@@ -142,22 +456,13 @@ class FeatureCollection(BaseModel):
         use_enum_values: bool = True # Use Enum.ITEM.value, rather than the raw Enum
         
 
-    async def save(self) -> List[Feature]:
+    async def save(self) -> BulkResult:
         """Save this instance to Deta Base
         
         @note: it is necessary to overload the `save()` method in this class, because 
                the `super().save()` method is designed to deal with a single instance 
-               per call, whereas the FeatureCollection class needs to iterate through
-               the `Feature()` instances in their respective `features` list & save each
-               one.
+               per call, whereas the FeatureCollection class needs to save each of the 
+               `Feature()` instances in its `features` list -- which it does in concurrent 
+               `put_many()` batches, via `Feature.save_many()`.
         """
-        async with async_db_client(settings.db_name) as db:
-            saved_items = []
-            
-            for instance in self.features:
-                instance.properties.version += 1
-                saved_data = await db.put(instance.json())
-                saved_items.append(Feature(**saved_data))
-                
-            return saved_items
-    
\ No newline at end of file
+        return await Feature.save_many(self.features)
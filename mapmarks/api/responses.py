@@ -0,0 +1,114 @@
+"""
+MapMarkr :: Responses
+
+-  `FeatureJSONResponse` serializes Features & FeatureCollections (or lists of them) straight to JSON,
+   skipping FastAPI's response-model validation and `jsonable_encoder` -- both of which walk every field,
+   again, of models we've only just built (or read back) ourselves.
+-  routes RETURN it (FastAPI passes a returned `Response` through untouched), and keep their `response_model`,
+   so that the OpenAPI schema still documents the response.
+-  uses `orjson` for the final encoding step, if it's installed; the stdlib `json` otherwise.
+-  `UploadStreamingResponse` streams a response while the request body is still being read (e.g. import progress).
+-  `geojson_stream()` & `ndjson_stream()` encode pages of Features, as they arrive, for a `StreamingResponse`.
+"""
+import json
+
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, List
+from uuid import UUID
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:     # pragma: no cover
+    orjson = None
+
+
+def encode(value: Any) -> Any:
+    """Converts models -- and the enums, datetimes & UUIDs in them -- to JSON-compatible values.
+
+    -  gives the same result as `jsonable_encoder()` for the app's models, but only knows about the types they use.
+    -  the encoder for each type is looked up once, then cached by exact type (see `_encoder_for()`).
+    """
+    encoder = _encoders.get(type(value))
+    if encoder is None:
+        encoder = _encoders[type(value)] = _encoder_for(type(value))
+    return encoder(value)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _encoder_for(cls: type) -> Callable[[Any], Any]:
+    if issubclass(cls, BaseModel):
+        return lambda value: {name: encode(field) for name, field in value.__dict__.items()}
+    if issubclass(cls, Enum):
+        return lambda value: encode(value.value)
+    if issubclass(cls, (str, int, float)) or cls is type(None):
+        return _identity
+    if issubclass(cls, (list, tuple)):
+        return lambda value: [encode(item) for item in value]
+    if issubclass(cls, dict):
+        return lambda value: {str(key): encode(item) for key, item in value.items()}
+    if issubclass(cls, (datetime, date, time)):
+        return cls.isoformat
+    if issubclass(cls, UUID):
+        return str
+    raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+
+
+_encoders: Dict[type, Callable[[Any], Any]] = {}
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(encode(content))
+    return json.dumps(encode(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FeatureJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Media types for streamed exports
+GEOJSON_MEDIA_TYPE = "application/geo+json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_MEDIA_TYPES = (NDJSON_MEDIA_TYPE, "application/ndjson", "application/x-ndjson+geo")
+
+
+async def geojson_stream(pages: AsyncIterator[List[BaseModel]]) -> AsyncIterator[bytes]:
+    """Encodes pages of Features as ONE GeoJSON FeatureCollection, one chunk per page.
+    
+    -  the opening `{"type":"FeatureCollection","features":[` is sent before the first page is read.
+    """
+    yield b'{"type":"FeatureCollection","features":['
+    separator = b""
+    async for page in pages:
+        if page:
+            yield separator + b",".join(dumps(feature) for feature in page)
+            separator = b","
+    yield b"]}"
+
+
+async def ndjson_stream(pages: AsyncIterator[List[BaseModel]]) -> AsyncIterator[bytes]:
+    """Encodes pages of Features as newline-delimited GeoJSON -- one Feature per line, one chunk per page"""
+    async for page in pages:
+        if page:
+            yield b"".join(dumps(feature) + b"\n" for feature in page)
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """A StreamingResponse for routes which are STILL READING the request body (e.g. via `request.stream()`).
+    
+    @NOTE: StreamingResponse also listens for the client disconnecting -- by reading ASGI messages, 
+           which would swallow the body chunks the route is waiting for. This one doesn't listen.
+    """
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
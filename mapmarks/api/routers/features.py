@@ -33,6 +33,22 @@ class APIRouter(routing.Router):
 """
 import fastapi
 import logging
+import typing
+
+from uuid import UUID
+
+from mapmarks.api.conditional import feature_etag, is_not_modified, list_validators, not_modified_response, validator_headers
+from mapmarks.api.config import get_app_config
+from mapmarks.api.exceptions import BadRequestHTTPException, GoneHTTPException, NotFoundHTTPException
+from mapmarks.api.geo import BBox
+from mapmarks.api.indexes import get_search_index
+from mapmarks.api.importer import ImportProgress, import_features, iter_geojson, iter_ndjson
+from mapmarks.api.models.base import BulkDeleteRequest, BulkResult, get_record_cache
+from mapmarks.api.models.geojson import ClusterCollection, Feature, FeatureChanges, FeatureCollection, FeatureFacets, FeaturePatch, NearbyFeature, NearestQuery, SearchResult
+from mapmarks.api.responses import GEOJSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, NDJSON_MEDIA_TYPES, FeatureJSONResponse, UploadStreamingResponse, geojson_stream, ndjson_stream
+from mapmarks.api.types import GeolocationCategory
+from mapmarks.api.tags import Tag
+from mapmarks.logger import get_logger
 
 
 # Configure and crank up the Logger
@@ -46,41 +62,312 @@ router_config = {
 }
 features = fastapi.APIRouter(**router_config)
 
+def check_limit(value: typing.Optional[int], maximum: int, name: str = "limit") -> int:
+    """`value` -- or `maximum`, if it's None; raises BadRequestHTTPException if it's over `maximum` (a setting, read per request)"""
+    if value is None:
+        return maximum
+    if value > maximum:
+        raise BadRequestHTTPException(f"`{name}` can be at most {maximum}.")
+    return value
+
 # Feature Routing
 @features.get("/", response_model=list[Feature])
-async def get_root():
-    logger.info(f"Got a Request for this `APIRouter()'s` index route: /{}")
+async def get_root(
+    request: fastapi.Request,
+    limit: typing.Optional[int] = fastapi.Query(None, gt=0, description="the page size: at most (and by default) `settings.db_fetch_limit`"),
+    cursor: typing.Optional[str] = None,
+    bbox: typing.Optional[str] = fastapi.Query(None, description="minLon,minLat,maxLon,maxLat"),
+    near: typing.Optional[str] = fastapi.Query(None, description="lon,lat"),
+    radius_m: typing.Optional[float] = fastapi.Query(None, gt=0),
+    category: typing.Optional[typing.List[GeolocationCategory]] = fastapi.Query(None),
+    title: typing.Optional[str] = fastapi.Query(None, description="titles starting with this prefix"),
+    note: typing.Optional[str] = fastapi.Query(None, description="notes containing this text"),
+):
+    """Lists one page of Features. 
+    
+    -  when more Features remain, the `X-Next-Cursor` response header holds the `cursor` for the next page.
+    -  `bbox` lists (up to `limit`) Features inside a bounding box; `near` + `radius_m` lists the 
+       Features within `radius_m` meters of a point, nearest first. Neither takes a `cursor`.
+    -  `category` (repeatable), `title` & `note` filter the listing; they're evaluated by the data store 
+       itself, so only matching Features are read. They can't (yet) be combined with `bbox` or `near`.
+    -  Features are serialized by FeatureJSONResponse, rather than re-validated against the `response_model`.
+    -  a page sent with `If-None-Match` (or `If-Modified-Since`), when no Feature has been written since, 
+       is answered with 304 -- without reading Deta (see mapmarks.api.conditional).
+    """
+    logger.info(f"Got a Request for this `APIRouter()'s` index route: {features.prefix}/")
+    limit = check_limit(limit, get_app_config().db_fetch_limit)
+    
+    etag, last_modified = list_validators(Feature.db_name, request)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    headers = validator_headers(etag, last_modified)
+    
+    query = Feature.filter_query(category, title, note)
+    if bbox is not None or near is not None:
+        if query is not None:
+            raise BadRequestHTTPException("`category`, `title` & `note` can't be combined with `bbox` or `near`.")
+        return FeatureJSONResponse(await _spatial_query(limit, bbox, near, radius_m), headers=headers)
+    
     logger.info("Retrieving list of MapMarkr Features currently saved to DB.")
-    feature_list = await Feature.fetch()
-    return feature_list
+    feature_list, next_cursor = await Feature.fetch_page(query=query, limit=limit, cursor=cursor)
+    
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return FeatureJSONResponse(feature_list, headers=headers)
+    
+async def _spatial_query(limit: int, bbox: typing.Optional[str], near: typing.Optional[str], radius_m: typing.Optional[float]) -> typing.List[Feature]:
+    if bbox is not None and near is not None:
+        raise BadRequestHTTPException("Query by either `bbox`, or `near` & `radius_m` -- not both.")
+    
+    if bbox is not None:
+        try:
+            area = BBox.parse(bbox)
+        except ValueError as e:
+            raise BadRequestHTTPException(f"Invalid bbox: {e}")
+        return await Feature.within_bbox(area, limit)
+    
+    if radius_m is None:
+        raise BadRequestHTTPException("A `near` query also needs a `radius_m`.")
+    try:
+        lon, lat = (float(part) for part in near.split(","))
+    except ValueError:
+        raise BadRequestHTTPException("Invalid near: expected lon,lat")
+    return await Feature.near(lon, lat, radius_m, limit)
+
+@features.get("/nearest", response_model=list[NearbyFeature], tags=[Tag.geolocations])
+async def get_nearest_features(
+    request: fastapi.Request,
+    lon: float = fastapi.Query(..., ge=-180.0, le=180.0),
+    lat: float = fastapi.Query(..., ge=-90.0, le=90.0),
+    k: int = fastapi.Query(5, gt=0, description="at most `settings.nearest_max_k`"),
+    category: typing.Optional[GeolocationCategory] = None,
+):
+    """Lists the `k` Features nearest to (lon, lat) -- optionally, only those of one `category` -- nearest first."""
+    k = check_limit(k, get_app_config().nearest_max_k, "k")
+    etag, last_modified = list_validators(Feature.db_name, request)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    
+    nearest = await Feature.nearest([(lon, lat)], k, category)
+    return FeatureJSONResponse(nearest[0], headers=validator_headers(etag, last_modified))
+
+@features.post("/nearest", response_model=list[list[NearbyFeature]], tags=[Tag.geolocations])
+async def get_nearest_features_batch(query: NearestQuery):
+    """Lists the `k` nearest Features to EACH of many points (e.g. along a route), in one call."""
+    return FeatureJSONResponse(await Feature.nearest(query.points, query.k, query.category))
+
+@features.get("/clusters", response_model=ClusterCollection, tags=[Tag.geolocations])
+async def get_clusters(
+    bbox: str = fastapi.Query(..., description="minLon,minLat,maxLon,maxLat"),
+    zoom: int = fastapi.Query(..., ge=0, le=24),
+):
+    """Lists the clusters of Features inside `bbox`, sized for map zoom level `zoom`, with per-category counts."""
+    try:
+        area = BBox.parse(bbox)
+    except ValueError as e:
+        raise BadRequestHTTPException(f"Invalid bbox: {e}")
+    
+    return ClusterCollection.within_bbox(area, zoom)
+
+@features.get("/search", response_model=list[SearchResult], tags=[Tag.geolocations])
+async def search_features(
+    request: fastapi.Request,
+    q: str = fastapi.Query(..., min_length=1, description="words to find in the Features' titles & notes; the last may be a prefix"),
+    bbox: typing.Optional[str] = fastapi.Query(None, description="minLon,minLat,maxLon,maxLat"),
+    limit: int = fastapi.Query(20, gt=0, description="at most `settings.search_max_limit`"),
+):
+    """Finds the Features whose title or note contains every word of `q` (or words starting with them) -- 
+    optionally, only those inside `bbox` -- best match first.
+    
+    -  a word only matches the `settings.search_max_expansions` most common words starting with it; the words
+       of `q` which started more than that are listed in the `X-Search-Truncated` response header.
+    """
+    limit = check_limit(limit, get_app_config().search_max_limit)
+    try:
+        area = BBox.parse(bbox) if bbox is not None else None
+    except ValueError as e:
+        raise BadRequestHTTPException(f"Invalid bbox: {e}")
+    
+    etag, last_modified = list_validators(Feature.db_name, request)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    results = await Feature.search(q, limit, area)
+    headers = validator_headers(etag, last_modified)
+    truncated = get_search_index().truncated_terms(q)
+    if truncated:
+        headers["X-Search-Truncated"] = ",".join(truncated)
+    return FeatureJSONResponse(results, headers=headers)
+
+@features.get("/facets", response_model=FeatureFacets, tags=[Tag.geolocations])
+async def get_facets():
+    """Counts the Features -- in all, and by category. The counts are kept up to date by every write, so this reads nothing."""
+    return FeatureFacets.current()
+
+@features.get("/changes", response_model=FeatureChanges, tags=[Tag.geolocations])
+async def get_feature_changes(
+    since: str = fastapi.Query(..., description="a sync token (the `next` of a previous response), an ISO 8601 timestamp, or seconds since the epoch"),
+    limit: typing.Optional[int] = fastapi.Query(None, gt=0, description="at most (and by default) `settings.changes_max_limit`"),
+):
+    """Lists the Features created, updated or deleted (as tombstones) since `since` -- for clients keeping a local copy in sync.
+    
+    -  start from a full download (e.g. GET /features/export), passing the time it started as `since`; 
+       after that, pass the `next` token of each response. A change may be sent twice, but is never missed.
+    -  responds with 410 (Gone) if `since` is older than the change log keeps: download everything again.
+    """
+    settings = get_app_config()
+    if not settings.changes_enabled:
+        raise NotFoundHTTPException("The change log is disabled.")
+    limit = check_limit(limit, settings.changes_max_limit)
     
-@features.get("/features")
-async def list_features():
-    return await Feature.fetch()
+    try:
+        changed, deleted, token, more = await Feature.changes_since(since, limit)
+    except LookupError as e:
+        raise GoneHTTPException(str(e))
+    except ValueError as e:
+        raise BadRequestHTTPException(str(e))
+    
+    return FeatureJSONResponse(FeatureChanges.construct(changed=changed, deleted=deleted, next=token, more=more))
+
+@features.get("/export", tags=[Tag.geolocations], responses={
+    200: {"content": {GEOJSON_MEDIA_TYPE: {}, NDJSON_MEDIA_TYPE: {}}, "description": "Every Feature, streamed."},
+})
+async def export_features(accept: typing.Optional[str] = fastapi.Header(None)):
+    """Streams EVERY Feature -- as one GeoJSON FeatureCollection, or as newline-delimited GeoJSON 
+    (one Feature per line) if the `Accept` header asks for `application/x-ndjson`.
+    
+    -  Features are read from Deta Base a page at a time (following its `last` key), and sent as each page arrives,
+       so memory use is bounded by the page size (`settings.export_page_size`), whatever the size of the dataset.
+    """
+    pages = Feature.stream()
+    
+    if accept and any(media_type in accept for media_type in NDJSON_MEDIA_TYPES):
+        return fastapi.responses.StreamingResponse(ndjson_stream(pages), media_type=NDJSON_MEDIA_TYPE)
+    return fastapi.responses.StreamingResponse(geojson_stream(pages), media_type=GEOJSON_MEDIA_TYPE)
+
+@features.post("/bulk", response_model=BulkResult, tags=[Tag.geolocations])
+async def create_features(collection: FeatureCollection, response: fastapi.Response):
+    """Saves every Feature in a GeoJSON FeatureCollection, in concurrent batches.
+    
+    -  responds with 207 (Multi-Status) if any Feature failed to save; see the per-item results.
+    """
+    result = await collection.save()
+    if result.failed:
+        response.status_code = fastapi.status.HTTP_207_MULTI_STATUS
+    return result
+
+@features.post("/import", response_model=ImportProgress, tags=[Tag.geolocations], responses={
+    200: {"content": {NDJSON_MEDIA_TYPE: {}}, "description": "The import's final report -- or, with `Accept: application/x-ndjson`, its progress after each chunk."},
+})
+async def import_features_upload(request: fastapi.Request, accept: typing.Optional[str] = fastapi.Header(None)):
+    """Imports a (large) GeoJSON FeatureCollection -- or, sent as `Content-Type: application/x-ndjson`, one Feature per line.
+    
+    -  the upload is parsed as it arrives, validated in chunks on a process pool, and saved in batches;
+       Features which fail are reported (by their position in the upload), without stopping the import.
+    -  responds with 207 (Multi-Status) if any Feature failed to import.
+    -  with `Accept: application/x-ndjson`, the progress is streamed instead: one JSON line per chunk written, then the final report.
+    """
+    content_type = request.headers.get("content-type", "")
+    parse = iter_ndjson if any(media_type in content_type for media_type in NDJSON_MEDIA_TYPES) else iter_geojson
+    progress = import_features(parse(request.stream()))
+    
+    if accept and any(media_type in accept for media_type in NDJSON_MEDIA_TYPES):
+        async def progress_lines():
+            async for report in progress:
+                yield report.json().encode() + b"\n"
+        return UploadStreamingResponse(progress_lines(), media_type=NDJSON_MEDIA_TYPE)
+    
+    async for report in progress:
+        pass
+    return fastapi.responses.JSONResponse(
+        fastapi.encoders.jsonable_encoder(report),
+        status_code=fastapi.status.HTTP_207_MULTI_STATUS if report.failed else fastapi.status.HTTP_200_OK,
+    )
+
+@features.patch("/{feature_id}", response_model=Feature, tags=[Tag.geolocations], responses={
+    409: {"description": "The Feature has been written since `version` -- reload it, and try again."},
+})
+async def patch_feature(feature_id: typing.Union[UUID, str], patch: FeaturePatch):
+    """Changes only the fields sent -- e.g. `{"version": 3, "properties": {"note": "Closed on Sundays"}}`; a `note` 
+    sent as null is deleted. 
+    
+    -  the changes are applied in place, by server-side update operations, without reading the Feature first.
+    -  `version` is the Feature's version as last read: responds with 409 (Conflict) if it's been written since.
+    """
+    changes = patch.to_changes()
+    if not changes:
+        raise BadRequestHTTPException("Nothing to change: send `geometry` and/or `properties`.")
+    
+    patched = await Feature.patch(feature_id, changes, patch.version)
+    return FeatureJSONResponse(patched, headers=validator_headers(feature_etag(feature_id, patched.properties.version), patched.properties.updated))
+
+@features.delete("/", response_model=BulkResult, tags=[Tag.geolocations])
+async def delete_features(selection: BulkDeleteRequest, response: fastapi.Response):
+    """Deletes the Features named by `keys`, or every Feature matching `query`.
+    
+    -  responds with 207 (Multi-Status) if any Feature failed to delete; see the per-item results.
+    """
+    if selection.keys is not None:
+        result = await Feature.delete_many(selection.keys)
+    else:
+        result = await Feature.delete_matching(selection.query)
+        
+    if result.failed:
+        response.status_code = fastapi.status.HTTP_207_MULTI_STATUS
+    return result
+
+@features.get("/features", response_model=list[Feature])
+async def list_features(request: fastapi.Request):
+    etag, last_modified = list_validators(Feature.db_name, request)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    return FeatureJSONResponse(await Feature.fetch(), headers=validator_headers(etag, last_modified))
 
 @features.get("/features/{feature_id}", response_model=Feature, tags=[Tag.geolocations])
-async def find_feature(feature_id: typing.Union[UUID, str]):
+async def find_feature(feature_id: typing.Union[UUID, str], request: fastapi.Request):
+    """Finds one Feature by key. Its ETag is derived from its key & version; a request whose `If-None-Match` 
+    names the current version is answered with 304 -- without reading Deta, if the record is cached."""
+    if request.headers.get("if-none-match") is not None:
+        cached = get_record_cache().get_record(Feature.db_name, str(feature_id))
+        if cached is not None:
+            etag = feature_etag(feature_id, (cached.get("properties") or {}).get("version"))
+            if is_not_modified(request, etag):
+                return not_modified_response(etag)
+    
     found_feature = await Feature.find(key=feature_id)
     if found_feature is None:
         raise NotFoundHTTPException
-    return found_feature
+    
+    etag, last_modified = feature_etag(feature_id, found_feature.properties.version), found_feature.properties.updated
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    return FeatureJSONResponse(found_feature, headers=validator_headers(etag, last_modified))
     
 @features.post("/features/new", tags=[Tag.geolocations])
 async def create_feature(feature: Feature):
     new_feature = await feature.save()
-    if new_feature is None or new_feature == '':
+    if new_feature is None:
         raise NotFoundHTTPException
-    return new_feature
+    return FeatureJSONResponse(new_feature)
 
-@features.post("/features/{feature_id}/edit", tags=[Tag.geolocations])
-async def update_feature(feature_id: int, payload: Feature):
-    old_feature = await Feature.find(feature_id)
+@features.post("/features/{feature_id}/edit", response_model=Feature, tags=[Tag.geolocations])
+async def update_feature(feature_id: typing.Union[UUID, str], payload: Feature):
+    """Replaces a Feature's `geometry` & `properties` with those sent -- its key, `created` time & version are kept.
     
-    if old_feature is None:
-        raise NotFoundHTTPException
-    
-    old_feature.update(**payload.dict())
+    -  applied as a PATCH (see `patch_feature()`) of every field, from the version just read -- so a write landing in 
+       between answers 409 (Conflict), rather than being overwritten.
+    """
+    old_feature = await Feature.find(feature_id)
+    patch = FeaturePatch(
+        version=old_feature.properties.version,
+        geometry=payload.geometry,
+        properties=payload.properties.dict(include={"title", "note", "category"}),
+    )
+    updated = await Feature.patch(feature_id, patch.to_changes(), patch.version)
+    return FeatureJSONResponse(updated, headers=validator_headers(feature_etag(feature_id, updated.properties.version), updated.properties.updated))
     
-@features.delete("/features{feature_id}/delete", tags=[Tag.geolocations])
-async def delete_feature(feature_id: int) -> None:
-    return await Feature.delete()
\ No newline at end of file
+@features.delete("/features/{feature_id}/delete", status_code=fastapi.status.HTTP_204_NO_CONTENT, tags=[Tag.geolocations])
+async def delete_feature(feature_id: typing.Union[UUID, str]) -> fastapi.Response:
+    """Deletes one Feature by key -- 404 if there's no such Feature. For many at once, see DELETE /features/."""
+    found_feature = await Feature.find(feature_id)
+    await found_feature.delete()
+    return fastapi.Response(status_code=fastapi.status.HTTP_204_NO_CONTENT)
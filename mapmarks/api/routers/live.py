@@ -0,0 +1,139 @@
+"""
+@file:  mapmarks.api.routers.live.py
+@desc:  Builds a router which pushes Feature changes to subscribers as they're written -- over Server-Sent Events 
+        or a WebSocket -- rather than having map clients poll for them (see mapmarks.api.broker).
+        
+        Each message is a put (with the Feature, as saved), a delete (with its key), or `lagged` -- sent in place 
+        of the events dropped from a subscriber which fell too far behind. After a `lagged` message, catch up via
+        GET /features/changes.
+"""
+import asyncio
+import typing
+
+from functools import lru_cache
+
+import fastapi
+
+from starlette.background import BackgroundTask
+
+from mapmarks.api.broker import Broker, LiveMessage, Subscription
+from mapmarks.api.config import get_app_config
+from mapmarks.api.events import WriteEvent, WriteOp
+from mapmarks.api.exceptions import BadRequestHTTPException, ServiceUnavailableHTTPException
+from mapmarks.api.geo import BBox
+from mapmarks.api.models.geojson import Feature
+from mapmarks.api.responses import dumps
+from mapmarks.api.tags import Tag
+from mapmarks.api.types import GeolocationCategory
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def encode_event(event: WriteEvent) -> bytes:
+    if event.op == WriteOp.DELETE:
+        return dumps({"key": event.key})
+    return dumps({"key": event.key, "feature": Feature.from_record(event.record)})
+
+
+@lru_cache
+def get_feature_broker() -> Broker:
+    """The broker for Feature changes -- built on first use"""
+    settings = get_app_config()
+    return Broker(Feature.db_name, encode_event, settings.live_buffer_size, settings.live_max_subscribers)
+
+
+# Define Live Router
+router_config = {
+    "prefix": "/features/live",
+    "tags": ['live'],
+}
+live = fastapi.APIRouter(**router_config)
+
+
+def subscribe(bbox: typing.Optional[str], category: typing.Optional[typing.List[str]]) -> Subscription:
+    try:
+        area = BBox.parse(bbox) if bbox is not None else None
+    except ValueError as e:
+        raise BadRequestHTTPException(f"Invalid bbox: {e}")
+    
+    try:
+        return get_feature_broker().subscribe(area, set(category) if category else None)
+    except OverflowError as e:
+        raise ServiceUnavailableHTTPException(str(e))
+
+
+def sse_frame(message: LiveMessage) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (message.id, message.event.encode(), message.data)
+
+
+# Live Routing
+@live.get("/", tags=[Tag.geolocations], response_class=fastapi.responses.StreamingResponse, responses={200: {"content": {SSE_MEDIA_TYPE: {}}}})
+async def stream_changes(
+    bbox: typing.Optional[str] = fastapi.Query(None, description="minLon,minLat,maxLon,maxLat"),
+    category: typing.Optional[typing.List[GeolocationCategory]] = fastapi.Query(None),
+):
+    """Pushes Feature changes as Server-Sent Events (`event: put | delete | lagged`), optionally only those inside 
+    `bbox` and/or of the given `category` (repeatable). Deletes are sent to every subscriber."""
+    subscription = subscribe(bbox, category)
+    heartbeat = get_app_config().live_heartbeat_s
+    
+    async def frames():
+        try:
+            while True:
+                message = await subscription.get(timeout=heartbeat)
+                yield sse_frame(message) if message is not None else b": heartbeat\n\n"
+        finally:
+            subscription.close()
+    
+    # @NOTE: if the client goes away before the body starts, `frames()` never runs (nor its `finally`) -- so the
+    #        subscription is also released once the response is done, however it ends
+    return fastapi.responses.StreamingResponse(frames(), media_type=SSE_MEDIA_TYPE, headers={"Cache-Control": "no-cache"},
+                                               background=BackgroundTask(subscription.close))
+
+@live.websocket("/ws")
+async def websocket_changes(
+    websocket: fastapi.WebSocket,
+    bbox: typing.Optional[str] = None,
+    category: typing.Optional[typing.List[GeolocationCategory]] = fastapi.Query(None),
+):
+    """Pushes Feature changes over a WebSocket, as JSON text messages: {"id", "event", "data"} -- filtered as for SSE."""
+    try:
+        subscription = subscribe(bbox, category)
+    except fastapi.HTTPException as e:
+        await websocket.close(code=1008 if e.status_code == 400 else 1013, reason=str(e.detail))
+        return
+    
+    await websocket.accept()
+    heartbeat = get_app_config().live_heartbeat_s
+    # the client never needs to send anything; reading only tells us when it goes away
+    closed = asyncio.create_task(_wait_for_close(websocket))
+    try:
+        while True:
+            getter = asyncio.create_task(subscription.get(timeout=heartbeat))
+            await asyncio.wait({getter, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if closed.done():
+                getter.cancel()
+                break
+            
+            message = getter.result()
+            if message is None:
+                await websocket.send_text('{"event":"heartbeat"}')
+            else:
+                await websocket.send_text('{"id":%d,"event":"%s","data":%s}' % (message.id, message.event, message.data.decode()))
+    except (fastapi.WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        closed.cancel()
+        subscription.close()
+
+async def _wait_for_close(websocket: fastapi.WebSocket) -> None:
+    try:
+        while True:
+            await websocket.receive_text()
+    except (fastapi.WebSocketDisconnect, RuntimeError):
+        pass
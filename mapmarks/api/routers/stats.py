@@ -0,0 +1,64 @@
+"""
+@file:  mapmarks.api.routers.stats.py
+@desc:  Builds a router which reports runtime statistics -- e.g. DB client-pool usage, or read-through cache hits & misses -- 
+        so that the app's settings (see mapmarks.api.config.AppSettings) can be tuned.
+        The same numbers are also exported as gauges at /metrics (see mapmarks.api.metrics).
+"""
+import fastapi
+
+from mapmarks.api import metrics
+from mapmarks.api.clients import PoolStats, get_client_manager
+from mapmarks.api.models.base import CacheStats, CoalescingStats, get_record_cache, get_single_flight, get_write_behind
+from mapmarks.api.writebehind import WriteBehindStats
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+# Define Stats Router
+router_config = {
+    "prefix": "/stats",
+    "tags": ['stats'],
+}
+stats = fastapi.APIRouter(**router_config)
+
+# Stats Routing
+@stats.get("/pool", response_model=list[PoolStats])
+async def get_pool_stats():
+    return get_client_manager().stats()
+
+@stats.get("/cache", response_model=CacheStats)
+async def get_cache_stats():
+    return get_record_cache().stats()
+
+@stats.get("/coalescing", response_model=CoalescingStats)
+async def get_coalescing_stats():
+    return get_single_flight().stats()
+
+@stats.get("/write-behind", response_model=WriteBehindStats)
+async def get_write_behind_stats():
+    return get_write_behind().stats()
+
+
+def _collect_stats():
+    """Reports pool, cache, read-coalescing & write-behind stats to /metrics, as gauges"""
+    pool = metrics.Gauge("mapmarks_db_pool", "DB client-pool usage, by db_name.", ("db_name", "stat"))
+    for pool_stats in get_client_manager().stats():
+        for stat in ("size", "in_use", "idle", "waits", "borrows"):
+            pool.set(pool_stats.db_name, stat, value=getattr(pool_stats, stat))
+    
+    cache = metrics.Gauge("mapmarks_record_cache", "Read-through record cache counters.", ("stat",))
+    for stat, value in get_record_cache().stats().dict(exclude={"enabled", "ttl"}).items():
+        cache.set(stat, value=value)
+    
+    coalescing = metrics.Gauge("mapmarks_reads_in_flight", "Distinct find/fetch storage reads in flight (see /stats/coalescing).")
+    coalescing.set(value=get_single_flight().stats().in_flight)
+    
+    buffer = metrics.Gauge("mapmarks_write_behind", "Write-behind buffer counters.", ("stat",))
+    for stat, value in get_write_behind().stats().dict(exclude={"enabled", "running", "max_pending"}).items():
+        buffer.set(stat, value=value)
+    
+    return [pool, cache, coalescing, buffer]
+
+metrics.registry.register_collector(_collect_stats)
@@ -34,6 +34,8 @@ class APIRouter(routing.Router):
 import fastapi
 import logging
 
+from mapmarks.logger import get_logger
+
 
 # Configure and crank up the Logger
 logger = get_logger(__name__)
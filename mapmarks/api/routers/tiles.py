@@ -0,0 +1,73 @@
+"""
+@file:  mapmarks.api.routers.tiles.py
+@desc:  Builds a router which serves the Features as Mapbox Vector Tiles (see mapmarks.api.tiles)
+"""
+import fastapi
+
+from mapmarks.api.config import get_app_config
+from mapmarks.api.exceptions import BadRequestHTTPException, ServiceUnavailableHTTPException
+from mapmarks.api.indexes import get_feature_indexes, get_spatial_index
+from mapmarks.api.models.geojson import Feature
+from mapmarks.api.tiles import encode_tile, get_tile_cache, tile_bbox
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+# Define Tiles Router
+router_config = {
+    "prefix": "/tiles",
+    "tags": ['tiles'],
+}
+tiles = fastapi.APIRouter(**router_config)
+
+# Tile Routing
+@tiles.get("/{z}/{x}/{y}.mvt", response_class=fastapi.Response, responses={200: {"content": {MVT_MEDIA_TYPE: {}}}})
+async def get_tile(z: int, x: int, y: int):
+    """Serves tile z/x/y -- a single `features` layer of points, with each Feature's `properties` as attributes."""
+    if not 0 <= z <= 24 or not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        raise BadRequestHTTPException(f"There is no tile {z}/{x}/{y}.")
+    
+    tile_cache = get_tile_cache()
+    tile = tile_cache.get(z, x, y)
+    if tile is None:
+        stamp = tile_cache.begin(z, x, y)
+        try:
+            tile = await render_tile(z, x, y)
+            tile_cache.set(z, x, y, tile, stamp)
+        finally:
+            tile_cache.end(z, x, y)
+        
+    return fastapi.Response(content=tile, media_type=MVT_MEDIA_TYPE)
+
+
+async def render_tile(z: int, x: int, y: int) -> bytes:
+    settings = get_app_config()
+    spatial_index = get_spatial_index()
+    if not get_feature_indexes().is_ready(spatial_index):
+        raise ServiceUnavailableHTTPException("The spatial index is still being built. Please retry shortly.")
+    
+    keys = spatial_index.within_bbox(tile_bbox(z, x, y))
+    if len(keys) > settings.tile_max_features:
+        logger.warning(f"Tile {z}/{x}/{y} holds {len(keys)} Features; encoding the first {settings.tile_max_features}")
+        keys = keys[:settings.tile_max_features]
+    
+    points = [
+        (
+            *feature.geometry.coordinates,
+            {
+                "key": str(feature.key),
+                "title": feature.properties.title,
+                "note": feature.properties.note,
+                "category": feature.properties.category,
+                "version": feature.properties.version,
+                "updated": feature.properties.updated.isoformat(),
+            },
+        )
+        for feature in await Feature.find_many(keys)
+    ]
+    
+    return encode_tile("features", points, z, x, y, extent=settings.tile_extent)
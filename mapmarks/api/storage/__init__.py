@@ -0,0 +1,28 @@
+"""
+MapMarkr :: Storage backends (see mapmarks.api.storage.base)
+
+-  the backend is chosen by `AppSettings.storage_backend`: "deta" (the default -- hosted Deta Base), 
+   "sqlite" (a local file, at `AppSettings.storage_sqlite_path`), or "memory" (in-process).
+"""
+from typing import Any, Optional
+
+from mapmarks.api.config import get_app_config
+from mapmarks.api.storage.base import (
+    FetchResponse, KeyNotFoundError, PreconditionFailedError, StorageBackend, StorageError, Util,
+)
+from mapmarks.api.storage.memory import MemoryStorage
+from mapmarks.api.storage.sqlite import SQLiteStorage
+
+
+async def open_backend(db_name: str, max_connections: int, keepalive_timeout: float, deta: Optional[Any] = None) -> StorageBackend:
+    """Opens a client of the configured backend for `db_name` (see mapmarks.api.clients)"""
+    settings = get_app_config()
+    
+    if settings.storage_backend == "memory":
+        return MemoryStorage(db_name, latency=settings.storage_memory_latency_ms / 1000)
+    if settings.storage_backend == "sqlite":
+        return SQLiteStorage(db_name, settings.storage_sqlite_path)
+    
+    # only import the Deta SDK when it's actually used
+    from mapmarks.api.storage.deta import DetaStorage
+    return await DetaStorage.open(db_name, max_connections, keepalive_timeout, deta)
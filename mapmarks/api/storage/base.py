@@ -0,0 +1,221 @@
+"""
+MapMarkr :: Storage backend interface
+
+-  `StorageBackend` is what `mapmarks.api.models.base.async_db_client()` hands to the models: 
+   one client for one `db_name`. Its methods mirror those of `deta.AsyncBase` -- get, put, 
+   put_many, fetch (with a `last`-key cursor), update & delete -- so that Deta Base is just one 
+   implementation of it (see mapmarks.api.storage.deta), next to the local SQLite & in-memory ones.
+-  the local backends share the helpers below, which implement Deta Base's query language 
+   (https://docs.deta.sh/docs/base/queries) and update operations on plain dicts.
+"""
+import copy
+
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+
+Record = Dict[str, Any]
+Query = Union[Dict[str, Any], List[Dict[str, Any]], None]
+
+
+class FetchResponse(NamedTuple):
+    """One page of `fetch()` results: `last` is the key to continue after, or None on the last page"""
+    count: int
+    last: Optional[str]
+    items: List[Record]
+
+
+class StorageError(Exception):
+    pass
+
+
+class KeyNotFoundError(StorageError):
+    def __init__(self, key: str) -> None:
+        super().__init__(f"Key '{key}' not found")
+        self.key = key
+
+
+class PreconditionFailedError(StorageError):
+    """Raised by `update()` when the record doesn't hold the values it was `expect`ed to -- i.e. a conflicting write"""
+    def __init__(self, key: str, path: str, expected: Any, found: Any) -> None:
+        super().__init__(f"Key '{key}': expected {path} == {expected!r}, but found {found!r}")
+        self.key = key
+        self.path = path
+        self.expected = expected
+        self.found = found
+
+
+# Update operations -- see `StorageBackend.update()`
+class UpdateOp:
+    pass
+
+
+class Increment(UpdateOp):
+    def __init__(self, value: Union[int, float] = 1) -> None:
+        self.value = value
+
+
+class Append(UpdateOp):
+    def __init__(self, value: Any) -> None:
+        self.value = value if isinstance(value, list) else [value]
+
+
+class Prepend(UpdateOp):
+    def __init__(self, value: Any) -> None:
+        self.value = value if isinstance(value, list) else [value]
+
+
+class Trim(UpdateOp):
+    pass
+
+
+class Util:
+    """Builds update operations -- the same interface as `deta.AsyncBase.util`"""
+    def increment(self, value: Union[int, float] = 1) -> Increment:
+        return Increment(value)
+    
+    def append(self, value: Any) -> Append:
+        return Append(value)
+    
+    def prepend(self, value: Any) -> Prepend:
+        return Prepend(value)
+    
+    def trim(self) -> Trim:
+        return Trim()
+
+
+class StorageBackend:
+    """
+    class StorageBackend -- a client for one `db_name` of a key/value document store
+    
+    -  records are JSON-compatible dicts, each with a unique string `key`
+    -  `fetch()` returns matching records in ascending `key` order, at most `limit` of them, 
+       starting after the `last` key
+    -  `update()` takes a dict of (dotted) field paths to new values -- or to the operations 
+       built by `util`, e.g. `{"properties.version": db.util.increment(1)}`; with `expect`, it only 
+       applies them if the record holds the expected values (e.g. `{"properties.version": 3}`).
+    """
+    util = Util()
+    
+    def __init__(self, db_name: str) -> None:
+        self.db_name = db_name
+    
+    async def get(self, key: str) -> Optional[Record]:
+        raise NotImplementedError
+    
+    async def put(self, data: Record, key: Optional[str] = None) -> Record:
+        raise NotImplementedError
+    
+    async def put_many(self, items: List[Record]) -> Dict[str, Any]:
+        """Returns Deta Base's put_many() response: {"processed": {"items": [...]}, "failed": {"items": [...]}}"""
+        raise NotImplementedError
+    
+    async def fetch(self, query: Query = None, *, limit: int = 1000, last: Optional[str] = None) -> FetchResponse:
+        raise NotImplementedError
+    
+    async def update(self, updates: Dict[str, Any], key: str, expect: Optional[Dict[str, Any]] = None) -> Optional[Record]:
+        """Returns the record as it was BEFORE the update, if the backend read it anyway (e.g. to check `expect`) -- else None.
+        
+        -  raises KeyNotFoundError if there's no record with `key`, PreconditionFailedError if it doesn't hold an `expect`ed value.
+        """
+        raise NotImplementedError
+    
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+    
+    async def close(self) -> None:
+        pass
+
+
+# Helpers for the local backends
+def with_key(data: Record, key: Optional[str] = None) -> Record:
+    record = copy.deepcopy(data)
+    record["key"] = str(key or record.get("key") or "")
+    if not record["key"]:
+        raise StorageError("Records saved to a local backend need a `key`")
+    return record
+
+
+def get_path(record: Record, path: str) -> Any:
+    value: Any = record
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def matches(record: Record, query: Query) -> bool:
+    """Whether `record` satisfies a Deta Base query: a dict is an AND of its conditions, a list an OR of dicts"""
+    if not query:
+        return True
+    if isinstance(query, list):
+        return any(matches(record, condition) for condition in query)
+    
+    for field, expected in query.items():
+        path, _, op = field.partition("?")
+        value = get_path(record, path)
+        if not _compare(value, op, expected):
+            return False
+        
+    return True
+
+
+def _compare(value: Any, op: str, expected: Any) -> bool:
+    try:
+        if op == "":
+            return value == expected
+        if op == "ne":
+            return value != expected
+        if op == "pfx":
+            return isinstance(value, str) and value.startswith(expected)
+        if op == "contains":
+            return value is not None and expected in value
+        if op == "not_contains":
+            return value is None or expected not in value
+        if value is None:
+            return False
+        if op == "lt":
+            return value < expected
+        if op == "gt":
+            return value > expected
+        if op == "lte":
+            return value <= expected
+        if op == "gte":
+            return value >= expected
+        if op == "r":
+            return expected[0] <= value <= expected[1]
+    except TypeError:
+        return False
+    
+    raise StorageError(f"Unsupported query operator: ?{op}")
+
+
+def check_expected(record: Record, expect: Optional[Dict[str, Any]]) -> None:
+    """Raises PreconditionFailedError unless `record` holds each of the `expect`ed values"""
+    for path, expected in (expect or {}).items():
+        found = get_path(record, path)
+        if found != expected:
+            raise PreconditionFailedError(record["key"], path, expected, found)
+
+
+def apply_updates(record: Record, updates: Dict[str, Any]) -> Record:
+    record = copy.deepcopy(record)
+    
+    for path, value in updates.items():
+        *parents, name = path.split(".")
+        target = record
+        for part in parents:
+            target = target.setdefault(part, {})
+            
+        if isinstance(value, Trim):
+            target.pop(name, None)
+        elif isinstance(value, Increment):
+            target[name] = (target.get(name) or 0) + value.value
+        elif isinstance(value, Append):
+            target[name] = list(target.get(name) or []) + value.value
+        elif isinstance(value, Prepend):
+            target[name] = value.value + list(target.get(name) or [])
+        else:
+            target[name] = copy.deepcopy(value)
+    
+    return record
@@ -0,0 +1,138 @@
+"""
+MapMarkr :: Deta Base storage backend
+
+-  the hosted Deta Base (https://docs.deta.sh/docs/base/about), via `deta.AsyncBase`
+-  Deta Base has no conditional update -- but `insert()` is conditional: it fails (409) if the key exists. So an
+   `update()` with `expect` first inserts a *claim* on the expected values (e.g. "<key>:properties.version=3"), in
+   a second Base (`<db_name>_claims`), then applies the update: two updates from the same version can't both
+   claim it, and nothing is read beforehand. See `DetaStorage.update()` for what this does NOT catch.
+"""
+import json
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from deta import Deta
+
+from mapmarks.api.config import get_app_config
+from mapmarks.api.storage.base import FetchResponse, KeyNotFoundError, PreconditionFailedError, Query, Record, StorageBackend
+
+
+@lru_cache
+def get_deta() -> Deta:
+    """The app's one `Deta` instance -- built on first use (it reads the project key from the environment)"""
+    return Deta()
+
+
+def _session_settings(session: aiohttp.ClientSession) -> Dict[str, Any]:
+    """The constructor arguments `session` was built with -- all but its connector"""
+    return {
+        "headers": session.headers,
+        "skip_auto_headers": session.skip_auto_headers,
+        "auth": session.auth,
+        "json_serialize": session.json_serialize,
+        "cookie_jar": session.cookie_jar,
+        "raise_for_status": session.raise_for_status,
+        "timeout": session.timeout,
+        "auto_decompress": session.auto_decompress,
+        "trust_env": session.trust_env,
+        "requote_redirect_url": session.requote_redirect_url,
+        "trace_configs": session.trace_configs,
+        "version": session.version,
+    }
+
+
+async def _use_connector(client: Any, connector: aiohttp.TCPConnector, owner: bool) -> None:
+    """Swaps the aiohttp session of a `deta.AsyncBase` for one over `connector`
+    
+    @NOTE: `deta.AsyncBase` builds its aiohttp session with a default connector, which can't be
+           configured through the Deta SDK -- so swap it for one that uses our pool settings, and 
+           is otherwise built EXACTLY like the SDK's (e.g. its error handling relies on `raise_for_status`).
+           `_session` is private to the (pinned, alpha) SDK: if a new version drops it, fail loudly.
+    """
+    default_session = getattr(client, "_session", None)
+    if not isinstance(default_session, aiohttp.ClientSession):
+        raise RuntimeError(
+            f"This version of the Deta SDK has no `{type(client).__name__}._session` aiohttp session to configure "
+            "-- see DetaStorage.open()."
+        )
+    
+    client._session = aiohttp.ClientSession(connector=connector, connector_owner=owner, **_session_settings(default_session))
+    await default_session.close()
+
+
+def _claim_key(key: str, expect: Dict[str, Any]) -> str:
+    return f"{key}:" + "&".join(f"{path}={json.dumps(value)}" for path, value in sorted(expect.items()))
+
+
+class DetaStorage(StorageBackend):
+    def __init__(self, db_name: str, client: Any, claims: Any) -> None:
+        super().__init__(db_name)
+        self.client = client
+        self.claims = claims    # the claims of conditional updates -- see `update()`
+        self.util = client.util
+        
+    @classmethod
+    async def open(cls, db_name: str, max_connections: int, keepalive_timeout: float, deta: Optional[Deta] = None) -> "DetaStorage":
+        deta = deta or get_deta()
+        client, claims = deta.AsyncBase(db_name), deta.AsyncBase(f"{db_name}_claims")
+        
+        # both Bases share one connection pool
+        connector = aiohttp.TCPConnector(limit=max_connections, keepalive_timeout=keepalive_timeout)
+        await _use_connector(client, connector, owner=True)
+        await _use_connector(claims, connector, owner=False)
+        
+        return cls(db_name, client, claims)
+    
+    async def get(self, key: str) -> Optional[Record]:
+        return await self.client.get(key)
+    
+    async def put(self, data: Record, key: Optional[str] = None) -> Record:
+        return await self.client.put(data, key)
+    
+    async def put_many(self, items: List[Record]) -> Dict[str, Any]:
+        return await self.client.put_many(items)
+    
+    async def fetch(self, query: Query = None, *, limit: int = 1000, last: Optional[str] = None) -> FetchResponse:
+        results = await self.client.fetch(query, limit=limit, last=last)
+        return FetchResponse(results.count, results.last, results.items)
+    
+    async def update(self, updates: Dict[str, Any], key: str, expect: Optional[Dict[str, Any]] = None) -> Optional[Record]:
+        """Applies `updates` without reading the record first -- so it always returns None.
+        
+        -  with `expect`, the expected values are claimed first (see the module docs): if another update from the same
+           values has claimed them already, PreconditionFailedError (its `found` is None: the record isn't read).
+        
+        @NOTE: claims only order the conditional updates. An update expecting values that an UNconditional write (e.g.
+               a `put()`) has since replaced still goes through -- callers should check what they know first (see
+               `DetaBase.patch()`). Claims expire after `settings.db_claim_ttl_days`.
+        """
+        if expect:
+            claim = _claim_key(key, expect)
+            try:
+                await self.claims.insert({"key": claim}, expire_in=get_app_config().db_claim_ttl_days * 86400)
+            except aiohttp.ClientResponseError as e:
+                if e.status != 409:
+                    raise
+                path, expected = next(iter(expect.items()))
+                raise PreconditionFailedError(key, path, expected, None)
+        
+        try:
+            await self.client.update(updates, key)
+        except Exception as e:
+            # the update didn't happen: give the claim back, so a retry from the same values isn't turned away
+            if expect:
+                await self.claims.delete(claim)
+            if isinstance(e, aiohttp.ClientResponseError) and e.status == 404:
+                raise KeyNotFoundError(key)
+            raise
+        return None
+    
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+        
+    async def close(self) -> None:
+        # the claims' session doesn't own the (shared) connector -- close it first
+        await self.claims.close()
+        await self.client.close()
@@ -0,0 +1,90 @@
+"""
+MapMarkr :: In-memory storage backend
+
+-  keeps every record in a per-`db_name` dict (plus a sorted list of its keys, for `fetch()`'s
+   key-ordered cursor), shared by every client in the process. Nothing is persisted.
+-  meant for tests, benchmarks & load tests -- i.e. measuring the app, without the network. To stand 
+   in for a remote store, every call can be delayed by a simulated round-trip `latency` (in seconds).
+"""
+import asyncio
+import bisect
+import copy
+
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+
+from mapmarks.api.storage.base import (
+    FetchResponse, KeyNotFoundError, Query, Record, StorageBackend, apply_updates, check_expected, matches, with_key,
+)
+
+
+class MemoryStorage(StorageBackend):
+    _databases: ClassVar[Dict[str, Tuple[Dict[str, Record], List[str]]]] = {}
+    
+    def __init__(self, db_name: str, latency: float = 0.0) -> None:
+        super().__init__(db_name)
+        self.latency = latency
+        self._records, self._keys = self._databases.setdefault(db_name, ({}, []))
+        
+    @classmethod
+    def reset(cls, db_name: Optional[str] = None) -> None:
+        """Drops every record of `db_name` -- or of every db, if no name is given."""
+        for name, (records, keys) in cls._databases.items():
+            if db_name is None or name == db_name:
+                records.clear()
+                keys.clear()
+                
+    async def get(self, key: str) -> Optional[Record]:
+        await self._round_trip()
+        record = self._records.get(key)
+        return copy.deepcopy(record) if record is not None else None
+    
+    async def put(self, data: Record, key: Optional[str] = None) -> Record:
+        await self._round_trip()
+        record = with_key(data, key)
+        self._store(record)
+        return copy.deepcopy(record)
+    
+    async def put_many(self, items: List[Record]) -> Dict[str, Any]:
+        await self._round_trip()
+        records = [with_key(item) for item in items]
+        for record in records:
+            self._store(record)
+        return {"processed": {"items": copy.deepcopy(records)}}
+    
+    async def fetch(self, query: Query = None, *, limit: int = 1000, last: Optional[str] = None) -> FetchResponse:
+        await self._round_trip()
+        start = bisect.bisect_right(self._keys, last) if last else 0
+        items = []
+        
+        for position in range(start, len(self._keys)):
+            record = self._records[self._keys[position]]
+            if matches(record, query):
+                items.append(copy.deepcopy(record))
+                if len(items) == limit:
+                    more = position + 1 < len(self._keys)
+                    return FetchResponse(len(items), record["key"] if more else None, items)
+                
+        return FetchResponse(len(items), None, items)
+    
+    async def update(self, updates: Dict[str, Any], key: str, expect: Optional[Dict[str, Any]] = None) -> Optional[Record]:
+        await self._round_trip()
+        record = self._records.get(key)
+        if record is None:
+            raise KeyNotFoundError(key)
+        check_expected(record, expect)
+        self._records[key] = apply_updates(record, updates)
+        return record
+        
+    async def delete(self, key: str) -> None:
+        await self._round_trip()
+        if self._records.pop(key, None) is not None:
+            del self._keys[bisect.bisect_left(self._keys, key)]
+            
+    async def _round_trip(self) -> None:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+            
+    def _store(self, record: Record) -> None:
+        if record["key"] not in self._records:
+            bisect.insort(self._keys, record["key"])
+        self._records[record["key"]] = record
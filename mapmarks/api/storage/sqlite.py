@@ -0,0 +1,160 @@
+"""
+MapMarkr :: SQLite storage backend
+
+-  stores every `db_name`'s records in one local SQLite file, as JSON, alongside a few columns 
+   copied out of each record -- its category, geohash & position -- which are indexed, so that 
+   category & spatial (geohash-prefix) queries are answered from an index, not a table scan.
+-  the parts of a query which those columns can't answer are evaluated in Python, on the rows 
+   the index lookup returns (see `_pushdown()`).
+-  sqlite3 is blocking, so each call runs on a worker thread, one at a time per file.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+
+from mapmarks.api.storage.base import (
+    FetchResponse, KeyNotFoundError, Query, Record, StorageBackend, apply_updates, check_expected, get_path, matches, with_key,
+)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    db_name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    category TEXT,
+    geohash TEXT,
+    lon REAL,
+    lat REAL,
+    PRIMARY KEY (db_name, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS records_category ON records (db_name, category, key);
+CREATE INDEX IF NOT EXISTS records_geohash ON records (db_name, geohash);
+CREATE INDEX IF NOT EXISTS records_position ON records (db_name, lat, lon);
+"""
+
+# Query fields which map onto (indexed) columns
+COLUMNS = {"key": "key", "properties.category": "category", "geohash": "geohash"}
+OPERATORS = {"": "=", "lt": "<", "gt": ">", "lte": "<=", "gte": ">="}
+
+
+class SQLiteStorage(StorageBackend):
+    _connections: ClassVar[Dict[str, Tuple[sqlite3.Connection, threading.Lock]]] = {}
+    
+    def __init__(self, db_name: str, path: str) -> None:
+        super().__init__(db_name)
+        if path not in self._connections:
+            connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._connections[path] = (connection, threading.Lock())
+        self._connection, self._lock = self._connections[path]
+        
+    async def get(self, key: str) -> Optional[Record]:
+        rows = await self._run("SELECT data FROM records WHERE db_name = ? AND key = ?", (self.db_name, key))
+        return json.loads(rows[0][0]) if rows else None
+    
+    async def put(self, data: Record, key: Optional[str] = None) -> Record:
+        record = with_key(data, key)
+        await self._run_many(self._upsert_sql(), [self._row(record)])
+        return record
+    
+    async def put_many(self, items: List[Record]) -> Dict[str, Any]:
+        records = [with_key(item) for item in items]
+        await self._run_many(self._upsert_sql(), [self._row(record) for record in records])
+        return {"processed": {"items": records}}
+    
+    async def fetch(self, query: Query = None, *, limit: int = 1000, last: Optional[str] = None) -> FetchResponse:
+        where, params = self._pushdown(query)
+        batch_size = max(limit, 100)
+        items: List[Record] = []
+        
+        while True:
+            rows = await self._run(
+                f"SELECT key, data FROM records WHERE db_name = ? AND key > ? AND ({where}) ORDER BY key LIMIT ?",
+                (self.db_name, last or "", *params, batch_size),
+            )
+            for position, (key, data) in enumerate(rows):
+                last = key
+                record = json.loads(data)
+                if matches(record, query):
+                    items.append(record)
+                    if len(items) == limit:
+                        more = position + 1 < len(rows) or await self._has_rows_after(key, where, params)
+                        return FetchResponse(len(items), key if more else None, items)
+                    
+            if len(rows) < batch_size:
+                return FetchResponse(len(items), None, items)
+    
+    async def update(self, updates: Dict[str, Any], key: str, expect: Optional[Dict[str, Any]] = None) -> Optional[Record]:
+        # @NOTE: the read, the check & the write all happen under the connection's lock -- so they're atomic
+        def update_record(connection: sqlite3.Connection) -> Record:
+            row = connection.execute("SELECT data FROM records WHERE db_name = ? AND key = ?", (self.db_name, key)).fetchone()
+            if row is None:
+                raise KeyNotFoundError(key)
+            record = json.loads(row[0])
+            check_expected(record, expect)
+            connection.execute(self._upsert_sql(), self._row(apply_updates(record, updates)))
+            return record
+            
+        return await asyncio.to_thread(self._locked, update_record)
+        
+    async def delete(self, key: str) -> None:
+        await self._run("DELETE FROM records WHERE db_name = ? AND key = ?", (self.db_name, key))
+        
+    async def _has_rows_after(self, key: str, where: str, params: List[Any]) -> bool:
+        rows = await self._run(
+            f"SELECT 1 FROM records WHERE db_name = ? AND key > ? AND ({where}) LIMIT 1",
+            (self.db_name, key, *params),
+        )
+        return bool(rows)
+    
+    @staticmethod
+    def _pushdown(query: Query) -> Tuple[str, List[Any]]:
+        """Translates the parts of `query` on indexed columns into SQL -- a superset of the matches."""
+        conditions = query if isinstance(query, list) else [query or {}]
+        clauses, params = [], []
+        
+        for condition in conditions:
+            terms = []
+            for field, expected in condition.items():
+                path, _, op = field.partition("?")
+                column = COLUMNS.get(path)
+                if column is None or isinstance(expected, (dict, list)):
+                    continue
+                if op in OPERATORS:
+                    terms.append(f"{column} {OPERATORS[op]} ?")
+                    params.append(expected)
+                elif op == "pfx" and isinstance(expected, str) and expected:
+                    terms.append(f"{column} >= ? AND {column} < ?")
+                    params += [expected, expected[:-1] + chr(ord(expected[-1]) + 1)]
+            clauses.append(" AND ".join(terms) or "1")
+            
+        return " OR ".join(f"({clause})" for clause in clauses) or "1", params
+    
+    def _row(self, record: Record) -> Tuple:
+        coordinates = get_path(record, "geometry.coordinates") or (None, None)
+        lon, lat = coordinates if len(coordinates) == 2 else (None, None)
+        return (self.db_name, record["key"], json.dumps(record), get_path(record, "properties.category"), record.get("geohash"), lon, lat)
+    
+    @staticmethod
+    def _upsert_sql() -> str:
+        return "INSERT OR REPLACE INTO records (db_name, key, data, category, geohash, lon, lat) VALUES (?, ?, ?, ?, ?, ?, ?)"
+    
+    async def _run(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        return await asyncio.to_thread(self._locked, lambda connection: connection.execute(sql, params).fetchall())
+    
+    async def _run_many(self, sql: str, rows: List[Tuple]) -> None:
+        def run(connection: sqlite3.Connection) -> None:
+            with connection:
+                connection.execute("BEGIN")
+                connection.executemany(sql, rows)
+                
+        await asyncio.to_thread(self._locked, run)
+        
+    def _locked(self, fn):
+        with self._lock:
+            return fn(self._connection)
@@ -0,0 +1,15 @@
+"""
+MapMarkr :: Vector tiles (see mapmarks.api.tiles.mvt & mapmarks.api.tiles.cache)
+"""
+from functools import lru_cache
+
+from mapmarks.api.config import get_app_config
+from mapmarks.api.tiles.cache import TileCache
+from mapmarks.api.tiles.mvt import encode_tile, tile_bbox, tile_of
+
+
+@lru_cache
+def get_tile_cache() -> TileCache:
+    """The tile cache -- registered with the Feature indexes (see mapmarks.api.indexes), so that Feature writes evict stale tiles"""
+    settings = get_app_config()
+    return TileCache(settings.tile_cache_max_entries, settings.tile_cache_max_zoom, settings.tile_cache_dir)
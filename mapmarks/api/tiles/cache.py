@@ -0,0 +1,140 @@
+"""
+MapMarkr :: Vector tile cache
+
+-  an LRU cache of encoded tiles, kept in memory -- or, if a `directory` is given, on local disk 
+   (as {directory}/{z}/{x}/{y}.mvt), with only the LRU bookkeeping held in memory.
+-  it's also a FeatureIndex (see mapmarks.api.indexes): it remembers where every Feature is, so 
+   that when a Feature is saved, moved or deleted, the tiles containing its old and new positions 
+   are evicted -- at every cached zoom level -- and re-rendered on their next request.
+-  a tile is rendered across awaits, so a write can land in it mid-render: take a `begin()` stamp before
+   rendering, and pass it to `set()` -- which drops the (already stale) tile if it was invalidated since.
+"""
+import os
+
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from mapmarks.api.indexes.base import FeatureIndex, record_position
+from mapmarks.api.tiles.mvt import tile_of
+
+
+TileId = Tuple[int, int, int]
+
+
+class TileCache(FeatureIndex):
+    light = True
+    
+    def __init__(self, max_entries: int, max_zoom: int, directory: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.max_zoom = max_zoom
+        self.directory = Path(directory) if directory else None
+        self._tiles: "OrderedDict[TileId, Optional[bytes]]" = OrderedDict()
+        self._positions: Dict[str, Tuple[float, float]] = {}
+        self._stamp = 0                                 # bumped by every invalidation
+        self._rendering: "Counter[TileId]" = Counter()  # tiles being rendered -> renders in flight
+        self._invalidated: Dict[TileId, int] = {}       # ... -> the stamp of their latest invalidation
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        
+    def get(self, z: int, x: int, y: int) -> Optional[bytes]:
+        tile_id = (z, x, y)
+        tile = None
+        if tile_id in self._tiles:
+            if self.directory is None:
+                tile = self._tiles[tile_id]
+            else:
+                try:
+                    tile = self._path(tile_id).read_bytes()
+                except FileNotFoundError:
+                    # e.g. the cache directory was cleaned up under us -- so it's a miss
+                    del self._tiles[tile_id]
+        
+        if tile is None:
+            self.misses += 1
+            return None
+        
+        self._tiles.move_to_end(tile_id)
+        self.hits += 1
+        return tile
+    
+    def begin(self, z: int, x: int, y: int) -> int:
+        """Call before rendering tile z/x/y -- returns the stamp to `set()` it with; call `end()` once done"""
+        self._rendering[(z, x, y)] += 1
+        return self._stamp
+    
+    def end(self, z: int, x: int, y: int) -> None:
+        tile_id = (z, x, y)
+        self._rendering[tile_id] -= 1
+        if self._rendering[tile_id] <= 0:
+            del self._rendering[tile_id]
+            self._invalidated.pop(tile_id, None)
+    
+    def set(self, z: int, x: int, y: int, tile: bytes, stamp: Optional[int] = None) -> None:
+        """Caches tile z/x/y -- unless it was invalidated after `stamp` (see `begin()`), i.e. it's stale already"""
+        if z > self.max_zoom:
+            return
+        
+        tile_id = (z, x, y)
+        if stamp is not None and self._invalidated.get(tile_id, -1) > stamp:
+            return
+        if self.directory is None:
+            self._tiles[tile_id] = tile
+        else:
+            path = self._path(tile_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(tile)
+            self._tiles[tile_id] = None
+        self._tiles.move_to_end(tile_id)
+        
+        while len(self._tiles) > self.max_entries:
+            evicted, _ = self._tiles.popitem(last=False)
+            self._unlink(evicted)
+            self.evictions += 1
+            
+    def invalidate(self, lon: float, lat: float) -> None:
+        """Evicts the tile containing (lon, lat), at every zoom level"""
+        if not self._tiles and not self._rendering:
+            return  # nothing to evict -- e.g. while the indexes are warming up
+        self._stamp += 1
+        for z in range(self.max_zoom + 1):
+            tile_id = (z, *tile_of(lon, lat, z))
+            if tile_id in self._rendering:
+                self._invalidated[tile_id] = self._stamp
+            if tile_id in self._tiles:
+                del self._tiles[tile_id]
+                self._unlink(tile_id)
+                self.invalidations += 1
+    
+    # FeatureIndex interface
+    def add(self, key: str, record: Dict[str, Any]) -> None:
+        self.remove(key)
+        
+        position = record_position(record)
+        if position is not None:
+            self._positions[key] = position
+            self.invalidate(*position)
+            
+    def remove(self, key: str) -> None:
+        position = self._positions.pop(key, None)
+        if position is not None:
+            self.invalidate(*position)
+            
+    def clear(self) -> None:
+        for tile_id in self._tiles:
+            self._unlink(tile_id)
+        self._tiles.clear()
+        self._positions.clear()
+        # ... and any tile being rendered now may predate the rebuild
+        self._stamp += 1
+        self._invalidated.update(dict.fromkeys(self._rendering, self._stamp))
+        
+    def _path(self, tile_id: TileId) -> Path:
+        z, x, y = tile_id
+        return self.directory / str(z) / str(x) / f"{y}.mvt"
+    
+    def _unlink(self, tile_id: TileId) -> None:
+        if self.directory is not None:
+            try:
+                os.remove(self._path(tile_id))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,271 @@
+"""
+MapMarkr :: Write-behind buffer
+
+-  with `settings.write_behind_enabled`, `DetaBase.save()` doesn't wait for its `put()`: the record is queued,
+   and the write acknowledged, straight away. A background task flushes the queue in `put_many()` batches -- as
+   soon as `batch_size` writes are queued, or `flush_interval` seconds after the last flush.
+-  the queue is bounded: once `max_pending` writes are waiting, new ones wait for room (backpressure) -- and are
+   turned away with a 503 if there's still none after `max_wait` seconds.
+-  a queued write is read back by `DetaBase.find()` until it's flushed (read-your-writes). Writes to the same
+   key are merged: only the latest is flushed.
+-  updates & deletes of a queued key first wait for its write to be flushed (see `settle()`), so an older
+   queued write never overtakes them. A batch which fails is re-queued, and retried after `flush_interval`.
+-  on shutdown, whatever can't be flushed in time is spilled to `spill_path`, and re-queued on the next startup.
+
+@NOTE: write events (and so the indexes, the change log & live subscribers) follow the flush, not the ack. A
+       crash -- as opposed to a clean shutdown -- loses the writes which were still queued.
+"""
+import asyncio
+import contextlib
+import json
+import os
+
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from mapmarks.api.exceptions import ServiceUnavailableHTTPException
+from mapmarks.api.storage.base import Record
+from mapmarks.logger import get_logger
+
+
+# Configure and crank up the Logger
+logger = get_logger(__name__)
+
+SPILL_FORMAT = 1
+
+# Writes `records` to `db_name`; returns the keys of those which were saved
+Flush = Callable[[str, List[Record]], Awaitable[Set[str]]]
+Entry = Tuple[str, str]     # (db_name, key)
+
+
+class WriteBehindStats(BaseModel):
+    """Write-behind buffer counters -- see /stats/write-behind"""
+    enabled: bool
+    running: bool
+    pending: int            # writes acknowledged, but not yet flushed
+    max_pending: int
+    flushed: int            # writes flushed to storage
+    flushes: int
+    retried: int            # writes re-queued after their batch failed
+    waits: int              # writes which had to wait for room in the queue
+    rejected: int           # writes turned away, as the queue stayed full
+    spilled: int            # writes saved to the spill file on shutdown
+    restored: int           # writes re-queued from the spill file on startup
+
+
+class WriteBehindBuffer:
+    """
+    class WriteBehindBuffer -- acknowledges writes once queued, and flushes them to storage in the background
+    """
+    def __init__(self, flush: Flush, max_pending: int, batch_size: int, flush_interval: float, max_wait: float,
+                 spill_path: Optional[str], shutdown_timeout: float, enabled: bool=True) -> None:
+        self.enabled = enabled
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_wait = max_wait
+        self.spill_path = spill_path
+        self.shutdown_timeout = shutdown_timeout
+        self._write = flush
+        self._pending: "OrderedDict[Entry, Record]" = OrderedDict()    # queued, in write order
+        self._flushing: Dict[Entry, Record] = {}                        # taken by the flush in progress
+        self._task: Optional["asyncio.Task"] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flushed: Optional[asyncio.Event] = None                   # set (& replaced) after every flush
+        self._spill_pending = False                                     # the spill file holds writes not yet flushed
+        self.flushed = self.flushes = self.retried = self.waits = self.rejected = self.spilled = self.restored = 0
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._flushing)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def stats(self) -> WriteBehindStats:
+        return WriteBehindStats(
+            enabled=self.enabled, running=self.running, pending=len(self), max_pending=self.max_pending,
+            flushed=self.flushed, flushes=self.flushes, retried=self.retried, waits=self.waits,
+            rejected=self.rejected, spilled=self.spilled, restored=self.restored,
+        )
+
+    # Lifecycle
+    def start(self) -> None:
+        """Re-queues any writes spilled by the last shutdown, and starts the background flush"""
+        if not self.enabled or self._task is not None:
+            return
+        # @NOTE: asyncio primitives are made here, in the running loop -- not at import time
+        self._wakeup, self._flushed = asyncio.Event(), asyncio.Event()
+        self._restore()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the background flush, tries one last flush -- and spills whatever's left to `spill_path`"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        if self._pending:
+            try:
+                await asyncio.wait_for(self._flush(), self.shutdown_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Could not flush {len(self)} queued write(s) within {self.shutdown_timeout}s of shutdown")
+            except Exception:
+                logger.exception(f"Could not flush {len(self)} queued write(s) on shutdown")
+        if self._pending:
+            self._spill()
+
+    # Writes & reads
+    async def put(self, db_name: str, record: Record) -> None:
+        """Queues `record` to be written to `db_name` -- waiting for room, if the queue is full"""
+        entry = (db_name, record["key"])
+        if entry not in self._pending and len(self) >= self.max_pending:
+            self.waits += 1
+            deadline = asyncio.get_running_loop().time() + self.max_wait
+            while len(self) >= self.max_pending:
+                if not await self._wait_for_flush(deadline):
+                    self.rejected += 1
+                    raise ServiceUnavailableHTTPException("Too many writes are waiting to be saved. Please retry shortly.")
+
+        self._pending[entry] = record
+        self._pending.move_to_end(entry)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def get(self, db_name: str, key: str) -> Optional[Record]:
+        """The latest queued (i.e. not yet flushed) write of `key` -- or None"""
+        entry = (db_name, key)
+        record = self._pending.get(entry)
+        return record if record is not None else self._flushing.get(entry)
+
+    async def settle(self, db_name: str, *keys: str) -> None:
+        """Waits until none of `keys` has a write queued -- call it before updating or deleting them"""
+        entries = [(db_name, key) for key in keys]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while self.running and any(entry in self._pending or entry in self._flushing for entry in entries):
+            if not await self._wait_for_flush(deadline):
+                raise ServiceUnavailableHTTPException("An earlier write is still waiting to be saved. Please retry shortly.")
+
+    async def _wait_for_flush(self, deadline: float) -> bool:
+        """Asks for a flush, and waits for it to finish -- False if `deadline` passes first (or the buffer stops)"""
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0 or not self.running:
+            return False
+        flushed = self._flushed
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(flushed.wait(), remaining)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # Flushing
+    async def _run(self) -> None:
+        while True:
+            if len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+            if not await self._flush():
+                # storage is failing: back off, rather than retrying straight away
+                await asyncio.sleep(self.flush_interval)
+
+    async def _flush(self) -> bool:
+        """Writes every queued record; returns False if any of them failed (they're re-queued)"""
+        if not self._pending:
+            return True
+
+        self._flushing, self._pending = dict(self._pending), OrderedDict()
+        by_db: Dict[str, List[Record]] = {}
+        for (db_name, _), record in self._flushing.items():
+            by_db.setdefault(db_name, []).append(record)
+
+        ok = True
+        try:
+            for db_name, records in by_db.items():
+                try:
+                    saved = await self._write(db_name, records)
+                except Exception:
+                    logger.exception(f"Write-behind flush of {len(records)} record(s) to {db_name!r} failed")
+                    saved = set()
+
+                for record in records:
+                    if record["key"] in saved:
+                        del self._flushing[(db_name, record["key"])]
+                        self.flushed += 1
+                    else:
+                        ok = False
+        finally:
+            # re-queue whatever wasn't saved (e.g. a failed batch, or a cancelled flush) -- ahead of any newer writes,
+            # unless the key has been written again since
+            for entry, record in reversed(list(self._flushing.items())):
+                if entry not in self._pending:
+                    self._pending[entry] = record
+                    self._pending.move_to_end(entry, last=False)
+                    self.retried += 1
+            self._flushing = {}
+            self.flushes += 1
+            self._flushed.set()
+            self._flushed = asyncio.Event()
+
+        if self._spill_pending and not self._pending:
+            self._remove_spill()
+        return ok
+
+    # Spilling
+    def _spill(self) -> None:
+        """Saves the queued writes to `spill_path` -- atomically, and synced to disk"""
+        if not self.spill_path:
+            logger.error(f"{len(self._pending)} queued write(s) are lost on shutdown: no `write_behind_spill_path` is set")
+            return
+
+        spill = {"format": SPILL_FORMAT, "writes": [[db_name, record] for (db_name, _), record in self._pending.items()]}
+        temporary = f"{self.spill_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(spill, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.spill_path)
+        self.spilled += len(self._pending)
+        logger.warning(f"Spilled {len(self._pending)} queued write(s) to {self.spill_path}")
+
+    def _restore(self) -> None:
+        """Re-queues the writes spilled by the last shutdown. The file is only removed once they've been flushed."""
+        if not self.spill_path:
+            return
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                spill = json.load(f)
+            if spill.get("format") != SPILL_FORMAT:
+                raise ValueError(f"unknown spill format: {spill.get('format')!r}")
+            writes = [(db_name, record) for db_name, record in spill["writes"]]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError):
+            # @NOTE: moved aside (not deleted), to be recovered by hand -- the next shutdown may spill over it
+            logger.exception(f"Could not read the write-behind spill file at {self.spill_path}; moving it to {self.spill_path}.bad")
+            with contextlib.suppress(OSError):
+                os.replace(self.spill_path, f"{self.spill_path}.bad")
+            return
+
+        for db_name, record in writes:
+            self._pending.setdefault((db_name, record["key"]), record)
+        self.restored += len(writes)
+        self._spill_pending = True
+        if not self._pending:
+            self._remove_spill()
+        logger.info(f"Re-queued {len(writes)} write(s) from {self.spill_path}")
+
+    def _remove_spill(self) -> None:
+        try:
+            os.remove(self.spill_path)
+        except FileNotFoundError:
+            pass
+        self._spill_pending = False
@@ -0,0 +1,55 @@
+"""
+MapMarkr :: Test fixtures
+
+-  every test runs against the in-memory storage backend (see mapmarks.api.storage.memory) -- emptied,
+   along with the record cache, before each test -- and talks to the app over httpx's ASGITransport.
+-  the app's lifespan runs around each test; `client` only yields once the in-memory indexes are built.
+-  async tests run on anyio's pytest plugin (shipped with anyio, which Starlette depends on).
+"""
+import asyncio
+import os
+
+# @NOTE: set before the app's settings are first read -- which happens on first use, not on import
+os.environ["DETA_DB_NAME"] = "mapmarks_test"
+os.environ["DETA_STORAGE_BACKEND"] = "memory"
+os.environ["DETA_IMPORT_WORKERS"] = "0"         # validate imports in a thread, not on a process pool
+
+import httpx
+import pytest
+
+from main import create_app
+from mapmarks.api.indexes import get_feature_indexes
+from mapmarks.api.models.base import get_record_cache
+from mapmarks.api.storage.memory import MemoryStorage
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    MemoryStorage.reset()
+    get_record_cache().clear()
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        while not get_feature_indexes().ready:
+            await asyncio.sleep(0.01)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+
+def make_feature(lon: float = 0.0, lat: float = 0.0, title: str = "Truck Stop", category: str = "Other", **properties) -> dict:
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": {"title": title, "category": category, **properties},
+    }
+
+
+async def create_feature(client: httpx.AsyncClient, **kwargs) -> dict:
+    response = await client.post("/features/features/new", json=make_feature(**kwargs))
+    assert response.status_code == 200, response.text
+    return response.json()
@@ -0,0 +1,148 @@
+import pytest
+
+from tests.conftest import create_feature
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_cursor_paging_reaches_the_end_without_duplicates(client):
+    created = {(await create_feature(client, lon=i / 10, title=f"Stop {i}"))["key"] for i in range(23)}
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 5, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/features/", params=params)
+        assert response.status_code == 200
+        seen += [feature["key"] for feature in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        assert pages < 10, "paging never ended"
+
+    assert len(seen) == len(set(seen))
+    assert set(seen) == created
+    assert pages == 5
+
+
+async def test_a_cursor_is_rejected_for_a_different_query(client):
+    for i in range(3):
+        await create_feature(client, lon=i / 10)
+    response = await client.get("/features/", params={"limit": 1})
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await client.get("/features/", params={"limit": 1, "cursor": cursor, "category": "Reefer"})
+    assert response.status_code == 400
+
+
+async def test_patch_from_a_stale_version_is_a_conflict(client):
+    feature = await create_feature(client)
+    key, version = feature["key"], feature["properties"]["version"]
+
+    response = await client.patch(f"/features/{key}", json={"version": version, "properties": {"title": "Renamed"}})
+    assert response.status_code == 200
+    assert response.json()["properties"]["version"] == version + 1
+
+    response = await client.patch(f"/features/{key}", json={"version": version, "properties": {"title": "Lost update"}})
+    assert response.status_code == 409
+
+    response = await client.get(f"/features/features/{key}")
+    assert response.json()["properties"]["title"] == "Renamed"
+
+
+async def test_patch_of_a_missing_feature_is_not_found(client):
+    response = await client.patch("/features/no-such-key", json={"version": 1, "properties": {"title": "Renamed"}})
+    assert response.status_code == 404
+
+
+async def test_update_is_seen_by_reads_and_indexes(client):
+    feature = await create_feature(client, lon=10, lat=10, title="Harbour Depot", category="Reefer")
+    key = feature["key"]
+    assert (await client.get(f"/features/features/{key}")).status_code == 200    # now cached
+
+    response = await client.patch(f"/features/{key}", json={
+        "version": feature["properties"]["version"],
+        "geometry": {"type": "Point", "coordinates": [-20, -20]},
+        "properties": {"title": "Airport Depot", "category": "Tobacco"},
+    })
+    assert response.status_code == 200
+
+    found = (await client.get(f"/features/features/{key}")).json()
+    assert found["properties"]["title"] == "Airport Depot"
+    assert found["geometry"]["coordinates"] == [-20, -20]
+
+    assert (await client.get("/features/search", params={"q": "harbour"})).json() == []
+    matches = (await client.get("/features/search", params={"q": "airport"})).json()
+    assert [match["feature"]["key"] for match in matches] == [key]
+
+    assert (await client.get("/features/", params={"bbox": "5,5,15,15"})).json() == []
+    inside = (await client.get("/features/", params={"bbox": "-25,-25,-15,-15"})).json()
+    assert [feature["key"] for feature in inside] == [key]
+
+    facets = (await client.get("/features/facets")).json()
+    assert "Reefer" not in facets["category"] or facets["category"]["Reefer"] == 0
+    assert facets["category"]["Tobacco"] == 1
+
+
+async def test_delete_is_seen_by_reads_and_indexes(client):
+    feature = await create_feature(client, lon=10, lat=10, title="Harbour Depot")
+    key = feature["key"]
+    assert (await client.get(f"/features/features/{key}")).status_code == 200    # now cached
+
+    response = await client.request("DELETE", "/features/", json={"keys": [key]})
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 1
+
+    assert (await client.get(f"/features/features/{key}")).status_code == 404
+    assert (await client.get("/features/search", params={"q": "harbour"})).json() == []
+    assert (await client.get("/features/", params={"bbox": "5,5,15,15"})).json() == []
+
+
+async def test_edit_and_delete_routes(client):
+    feature = await create_feature(client, title="Harbour Depot", note="Open late")
+    key = feature["key"]
+
+    response = await client.post(f"/features/features/{key}/edit", json={
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [1, 1]},
+        "properties": {"title": "Airport Depot", "category": "Other"},
+    })
+    assert response.status_code == 200
+    edited = response.json()
+    assert edited["key"] == key
+    assert edited["properties"]["title"] == "Airport Depot"
+    assert edited["properties"]["note"] is None
+    assert edited["properties"]["created"] == feature["properties"]["created"]
+    assert edited["properties"]["version"] == feature["properties"]["version"] + 1
+
+    assert (await client.delete(f"/features/features/{key}/delete")).status_code == 204
+    assert (await client.get(f"/features/features/{key}")).status_code == 404
+    assert (await client.delete(f"/features/features/{key}/delete")).status_code == 404
+
+
+async def test_etag_answers_304_until_the_feature_changes(client):
+    feature = await create_feature(client)
+    key = feature["key"]
+
+    response = await client.get(f"/features/features/{key}")
+    etag = response.headers["ETag"]
+    response = await client.get(f"/features/features/{key}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    await client.patch(f"/features/{key}", json={"version": feature["properties"]["version"], "properties": {"note": "New"}})
+    response = await client.get(f"/features/features/{key}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test_list_etag_answers_304_until_a_write(client):
+    await create_feature(client)
+
+    response = await client.get("/features/")
+    etag = response.headers["ETag"]
+    assert (await client.get("/features/", headers={"If-None-Match": etag})).status_code == 304
+
+    await create_feature(client, title="Another")
+    assert (await client.get("/features/", headers={"If-None-Match": etag})).status_code == 200
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from mapmarks.api.models.base import BulkItemResult, BulkResult
+from mapmarks.api.models.geojson import Feature
+from tests.conftest import make_feature
+
+
+pytestmark = pytest.mark.anyio
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def ndjson(*lines) -> bytes:
+    return b"\n".join(line if isinstance(line, bytes) else json.dumps(line).encode() for line in lines)
+
+
+async def test_import_reports_each_failure_by_position(client):
+    body = ndjson(
+        make_feature(title="First"),
+        b"{not json",
+        make_feature(title="Third"),
+        {"type": "Feature", "properties": {"title": "No geometry", "category": "Other"}},
+        make_feature(title="Fifth"),
+    )
+    response = await client.post("/features/import", content=body, headers=NDJSON)
+    assert response.status_code == 207
+
+    report = response.json()
+    assert report["done"]
+    assert (report["received"], report["saved"], report["failed"]) == (5, 3, 2)
+    assert [error["index"] for error in report["errors"]] == [1, 3]
+    assert report["errors"][0]["error"].startswith("Invalid JSON")
+    assert "geometry" in report["errors"][1]["error"]
+
+    titles = {feature["properties"]["title"] for feature in (await client.get("/features/")).json()}
+    assert titles == {"First", "Third", "Fifth"}
+
+
+async def test_import_reports_every_position_of_a_repeated_key(client, monkeypatch):
+    async def reject_all(records):
+        return BulkResult.from_items([BulkItemResult(key=record["key"], ok=False, error="Rejected") for record in records])
+    monkeypatch.setattr(Feature, "put_records", reject_all)
+
+    body = ndjson(*({**make_feature(), "key": "same-key"} for _ in range(3)))
+    response = await client.post("/features/import", content=body, headers=NDJSON)
+    assert response.status_code == 207
+
+    errors = response.json()["errors"]
+    assert [(error["index"], error["key"]) for error in errors] == [(0, "same-key"), (1, "same-key"), (2, "same-key")]
+
+
+async def test_import_of_a_feature_collection(client):
+    body = json.dumps({"type": "FeatureCollection", "features": [make_feature(title=f"Stop {i}") for i in range(4)]})
+    response = await client.post("/features/import", content=body, headers={"Content-Type": "application/geo+json"})
+    assert response.status_code == 200
+    assert response.json()["saved"] == 4
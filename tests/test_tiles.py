@@ -0,0 +1,49 @@
+import pytest
+
+from mapmarks.api.tiles import get_tile_cache
+from tests.conftest import create_feature
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def get_tile(client, z: int, x: int, y: int) -> bytes:
+    response = await client.get(f"/tiles/{z}/{x}/{y}.mvt")
+    assert response.status_code == 200
+    return response.content
+
+
+async def test_a_new_feature_evicts_its_cached_tiles(client):
+    await create_feature(client, lon=-90, lat=45, title="First Stop")
+    tile = await get_tile(client, 1, 0, 0)
+    assert b"First Stop" in tile
+    assert get_tile_cache().get(1, 0, 0) == tile
+
+    await create_feature(client, lon=-91, lat=46, title="Second Stop")
+    assert get_tile_cache().get(1, 0, 0) is None
+
+    tile = await get_tile(client, 1, 0, 0)
+    assert b"First Stop" in tile and b"Second Stop" in tile
+
+
+async def test_a_moved_feature_evicts_the_tiles_it_left_and_entered(client):
+    feature = await create_feature(client, lon=-90, lat=45, title="Roaming Stop")
+    left, entered = await get_tile(client, 1, 0, 0), await get_tile(client, 1, 1, 1)
+    assert b"Roaming Stop" in left and b"Roaming Stop" not in entered
+
+    response = await client.patch(f"/features/{feature['key']}", json={
+        "version": feature["properties"]["version"],
+        "geometry": {"type": "Point", "coordinates": [90, -45]},
+    })
+    assert response.status_code == 200
+
+    assert b"Roaming Stop" not in await get_tile(client, 1, 0, 0)
+    assert b"Roaming Stop" in await get_tile(client, 1, 1, 1)
+
+
+async def test_a_deleted_feature_evicts_its_cached_tiles(client):
+    feature = await create_feature(client, lon=-90, lat=45, title="Closing Stop")
+    assert b"Closing Stop" in await get_tile(client, 0, 0, 0)
+
+    await client.request("DELETE", "/features/", json={"keys": [feature["key"]]})
+    assert b"Closing Stop" not in await get_tile(client, 0, 0, 0)